@@ -0,0 +1,18 @@
+import os
+
+MAX_REQUEST_BODY_BYTES = 16 * 1024 * 1024  # Largest request body accepted after gzip decompression
+
+# Response cache of the generation endpoints
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")  # "memory", or "sqlite" to share it on disk
+RESPONSE_CACHE_PATH = "data/cache/responses.sqlite"  # Database of the "sqlite" backend
+RESPONSE_CACHE_SIZE = 1024  # Responses kept; the least recently used one is evicted beyond it
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))  # Lifetime of a cached response
+RESPONSE_CACHE_ACCESS_BATCH = 64  # Hits of the "sqlite" backend whose access time is written in one transaction
+RESPONSE_CACHE_SEMANTIC = os.getenv("RESPONSE_CACHE_SEMANTIC", "false").lower() == "true"  # Match paraphrases too
+RESPONSE_CACHE_SIMILARITY = float(
+    os.getenv("RESPONSE_CACHE_SIMILARITY", "0.95")
+)  # Cosine similarity from which a cached query counts as the same question
+
+# Concurrent identical generation requests share one LLM call
+GENERATE_COALESCE_TIMEOUT_SECONDS = 90.0  # Longest a shared generation is waited for; above LLM_REQUEST_TIMEOUT
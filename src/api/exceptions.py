@@ -0,0 +1,4 @@
+class ResponseCacheError(Exception):
+    """Custom exception for errors of the response cache."""
+
+    pass
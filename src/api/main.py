@@ -1,6 +1,9 @@
 from fastapi import FastAPI
-from api.routes import router
+from fastapi.responses import PlainTextResponse
+from api.middleware import GzipRequestMiddleware, TracingMiddleware
+from api.routes import router, llm_integration
 from utils.logger import setup_logger
+from utils.tracing import metrics
 import logging
 
 # Initialize logger
@@ -9,6 +12,11 @@ api_logger = setup_logger(name="api_logger", log_file="logs/api.log", level=logg
 # Initialize the FastAPI application
 app = FastAPI(title="LLaMA API", version="1.0.0")
 
+# Accept gzip-compressed request bodies from the UI client
+app.add_middleware(GzipRequestMiddleware)
+# Added last so it wraps everything else and times the whole request
+app.add_middleware(TracingMiddleware)
+
 # Include the router to add routes to the application
 app.include_router(router, prefix="/api")
 
@@ -20,6 +28,7 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     api_logger.info("API server is shutting down...")
+    await llm_integration.aclose()
 
 @app.get("/")
 async def root():
@@ -29,6 +38,14 @@ async def root():
     return {"message": "Welcome to the LLaMA API! Visit /docs for the API documentation."}
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Latency histograms of the HTTP requests and traced stages, in the Prometheus text format.
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     import uvicorn
     
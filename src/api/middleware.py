@@ -0,0 +1,123 @@
+import time
+import zlib
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from api.config import MAX_REQUEST_BODY_BYTES
+from utils.tracing import TRACE_HEADER, metrics, trace_context, tracing_logger
+
+
+class GzipRequestMiddleware:
+    """
+    ASGI middleware decompressing request bodies sent with `Content-Encoding: gzip`.
+
+    Bodies larger than `max_body_bytes` once decompressed are rejected with 413, so a small
+    compressed payload cannot exhaust the memory of the server.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_bytes: int = MAX_REQUEST_BODY_BYTES):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        if headers.get(b"content-encoding", b"").lower() != b"gzip":
+            await self.app(scope, receive, send)
+            return
+
+        # wbits=16+MAX_WBITS selects the gzip container format
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            try:
+                body += decompressor.decompress(message.get("body", b""), self.max_body_bytes + 1 - len(body))
+            except zlib.error:
+                await self._reject(send, 400, b"Invalid gzip body")
+                return
+            if len(body) > self.max_body_bytes:
+                await self._reject(send, 413, b"Request body too large")
+                return
+            more_body = message.get("more_body", False)
+
+        scope = dict(scope)
+        scope["headers"] = [
+            (name, value) for name, value in scope["headers"] if name not in (b"content-encoding", b"content-length")
+        ] + [(b"content-length", str(len(body)).encode())]
+
+        body_sent = False
+
+        async def receive_decompressed() -> Message:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": bytes(body), "more_body": False}
+            return await receive()
+
+        await self.app(scope, receive_decompressed, send)
+
+    @staticmethod
+    async def _reject(send: Send, status: int, detail: bytes) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": detail})
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware running each request under the trace ID of its `X-Trace-Id` header (or a new one),
+    echoing it in the response and recording the request latency in `http_request_duration_seconds`.
+
+    The duration covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._header = TRACE_HEADER.lower().encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(self._header, b"").decode("latin-1")
+        # Only accept IDs that are safe to log and to use as metric exemplars
+        trace_id = incoming if incoming.isalnum() and len(incoming) <= 64 else None
+        status = 500
+        start = time.perf_counter()
+
+        with trace_context(trace_id) as trace_id:
+
+            async def send_with_trace(message: Message) -> None:
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(self._header, trace_id.encode("latin-1"))]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_trace)
+            finally:
+                duration = time.perf_counter() - start
+                # Unmatched paths share one label so that scanners cannot inflate the number of series
+                path = scope["path"] if status != 404 else "unmatched"
+                metrics.observe(
+                    "http_request_duration_seconds",
+                    duration,
+                    "Latency of HTTP requests, including streamed bodies.",
+                    method=scope["method"],
+                    path=path,
+                    status=str(status),
+                )
+                tracing_logger.debug(
+                    "trace=%s %s %s status=%s duration_ms=%.2f",
+                    trace_id,
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    duration * 1000,
+                )
@@ -0,0 +1,468 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from api.config import (
+    RESPONSE_CACHE_ACCESS_BATCH,
+    RESPONSE_CACHE_BACKEND,
+    RESPONSE_CACHE_PATH,
+    RESPONSE_CACHE_SEMANTIC,
+    RESPONSE_CACHE_SIMILARITY,
+    RESPONSE_CACHE_SIZE,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from api.exceptions import ResponseCacheError
+from utils.cache import TTLCache
+from utils.tracing import metrics
+
+# Query embeddings kept between the lookup of a query and the storage of its response
+_QUERY_EMBEDDING_CACHE_SIZE = 256
+# Fields locating a document in its source, which the prompt depends on besides its text
+_SPAN_KEYS = ("source", "start_index", "end_index")
+
+
+@dataclass
+class CachedResponse:
+    """
+    A generated response, the scope it is valid in and the embedding of the query that produced it.
+    """
+
+    response: str
+    scope: str  # Hash of the document set and generation parameters
+    embedding: Optional[np.ndarray] = None
+
+
+class InMemoryResponseStore:
+    """
+    Thread-safe, process-local store of cached responses with LRU and TTL eviction.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        ttl: Optional[float] = RESPONSE_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            maxsize (int): Maximum number of responses; the least recently used one is evicted beyond it.
+            ttl (Optional[float]): Seconds after which a response expires, or None to never expire.
+            clock (Callable[[], float]): Time source, in seconds.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data: "OrderedDict[str, Tuple[CachedResponse, Optional[float]]]" = OrderedDict()
+        # Keys of the responses of each scope, for the semantic lookup
+        self._scopes: Dict[str, Dict[str, None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Return the response stored under a key, or None if it is missing or expired.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= self.clock():
+                self._remove(key)
+                return None
+            self._data.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: str, cached: CachedResponse) -> None:
+        """
+        Store a response, evicting the least recently used ones if the store is full.
+        """
+        if self.maxsize <= 0:
+            return
+        expires = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._remove(key)
+            self._data[key] = (cached, expires)
+            self._scopes.setdefault(cached.scope, {})[key] = None
+            while len(self._data) > self.maxsize:
+                self._remove(next(iter(self._data)))
+
+    def scope_embeddings(self, scope: str) -> List[Tuple[str, np.ndarray]]:
+        """
+        Return the key and query embedding of the unexpired responses of a scope that have one.
+        """
+        now = self.clock()
+        with self._lock:
+            entries = [(key, self._data[key]) for key in self._scopes.get(scope, {})]
+        return [
+            (key, cached.embedding)
+            for key, (cached, expires) in entries
+            if cached.embedding is not None and (expires is None or expires > now)
+        ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._scopes.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str) -> None:
+        cached, _ = self._data.pop(key)
+        keys = self._scopes.get(cached.scope, {})
+        keys.pop(key, None)
+        if not keys:
+            self._scopes.pop(cached.scope, None)
+
+
+class SQLiteResponseStore:
+    """
+    Store of cached responses in a SQLite database, shared by the workers of a host and kept
+    across restarts, with LRU and TTL eviction.
+
+    A hit only reads the database: the access times of the responses served are kept in memory and
+    written in the transaction of the next `set`, which evicts by them, or once `access_batch` are pending.
+    The LRU order thus lags behind the hits served by the other workers until they write theirs.
+    """
+
+    def __init__(
+        self,
+        path: str = RESPONSE_CACHE_PATH,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        ttl: Optional[float] = RESPONSE_CACHE_TTL_SECONDS,
+        clock: Callable[[], float] = time.time,
+        access_batch: int = RESPONSE_CACHE_ACCESS_BATCH,
+    ):
+        """
+        Open or create the database.
+
+        Args:
+            path (str): Path of the SQLite database, or ":memory:" for a process-local store.
+            maxsize (int): Maximum number of responses; the least recently used ones are evicted beyond it.
+            ttl (Optional[float]): Seconds after which a response expires, or None to never expire.
+            clock (Callable[[], float]): Time source, in seconds since the epoch.
+            access_batch (int): Number of pending access times from which a hit writes them.
+
+        Raises:
+            ResponseCacheError: If the database cannot be opened.
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.access_batch = access_batch
+        # Access times of the responses served since the last write, by key
+        self._accessed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        try:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, scope TEXT NOT NULL, response TEXT NOT NULL, "
+                "embedding BLOB, expires REAL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_scope ON responses (scope)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+            self._conn.commit()
+        except sqlite3.Error as e:
+            raise ResponseCacheError(f"Failed to open response cache '{path}': {e}")
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Return the response stored under a key, or None if it is missing or expired.
+        """
+        now = self.clock()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT scope, response, embedding, expires FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                scope, response, blob, expires = row
+                if expires is not None and expires <= now:
+                    self._accessed.pop(key, None)
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    return None
+                self._accessed[key] = now
+                if len(self._accessed) >= self.access_batch:
+                    self._write_accesses()
+                    self._conn.commit()
+        except sqlite3.Error as e:
+            raise ResponseCacheError(f"Failed to read the response cache: {e}")
+        embedding = np.frombuffer(blob, dtype=np.float32) if blob is not None else None
+        return CachedResponse(response=response, scope=scope, embedding=embedding)
+
+    def set(self, key: str, cached: CachedResponse) -> None:
+        """
+        Store a response, then evict expired and least recently used responses beyond `maxsize`.
+        """
+        if self.maxsize <= 0:
+            return
+        now = self.clock()
+        expires = now + self.ttl if self.ttl is not None else None
+        blob = (
+            np.ascontiguousarray(cached.embedding, dtype=np.float32).tobytes() if cached.embedding is not None else None
+        )
+        try:
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, cached.scope, cached.response, blob, expires, now),
+                )
+                self._write_accesses()
+                self._conn.execute("DELETE FROM responses WHERE expires IS NOT NULL AND expires <= ?", (now,))
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                    (self.maxsize,),
+                )
+                self._conn.commit()
+        except sqlite3.Error as e:
+            raise ResponseCacheError(f"Failed to write the response cache: {e}")
+
+    def scope_embeddings(self, scope: str) -> List[Tuple[str, np.ndarray]]:
+        """
+        Return the key and query embedding of the unexpired responses of a scope that have one.
+        """
+        try:
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT key, embedding FROM responses WHERE scope = ? AND embedding IS NOT NULL "
+                    "AND (expires IS NULL OR expires > ?)",
+                    (scope, self.clock()),
+                ).fetchall()
+        except sqlite3.Error as e:
+            raise ResponseCacheError(f"Failed to read the response cache: {e}")
+        return [(key, np.frombuffer(blob, dtype=np.float32)) for key, blob in rows]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def _write_accesses(self) -> None:
+        """
+        Write the pending access times, without committing.
+        """
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE responses SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+
+class ResponseCache:
+    """
+    Cache of generated responses, so that repeated questions about the same documents skip the LLM.
+
+    A response is valid in a scope: the set of documents it was generated from, with their source and span,
+    the model, the temperature and max_tokens. An exact hit needs the same normalized query (case, whitespace,
+    Unicode form and trailing punctuation are ignored) in the same scope. With `semantic`, a query that misses is also
+    embedded and matches the most similar cached query of its scope, if their cosine similarity reaches
+    `similarity_threshold`.
+    """
+
+    def __init__(
+        self,
+        store: Optional[Any] = None,
+        semantic: bool = RESPONSE_CACHE_SEMANTIC,
+        similarity_threshold: float = RESPONSE_CACHE_SIMILARITY,
+        embedder: Optional[Any] = None,
+    ):
+        """
+        Args:
+            store (Optional[Any]): An InMemoryResponseStore or SQLiteResponseStore, in memory by default.
+            semantic (bool): Whether paraphrased queries may hit.
+            similarity_threshold (float): Cosine similarity from which two queries count as the same question.
+            embedder (Optional[Any]): Object with a `generate_embeddings(texts)` method embedding the queries,
+                the shared EmbeddingGenerator of the default model by default.
+        """
+        self.store = store if store is not None else InMemoryResponseStore()
+        self.semantic = semantic
+        self.similarity_threshold = similarity_threshold
+        self._embedder = embedder
+        self._embeddings = TTLCache(maxsize=_QUERY_EMBEDDING_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL_SECONDS)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @property
+    def embedder(self) -> Any:
+        if self._embedder is None:
+            # Imported lazily: the exact cache does not need the embedding model
+            from utils.registry import get_embedding_generator
+
+            self._embedder = get_embedding_generator()
+        return self._embedder
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        return " ".join(unicodedata.normalize("NFKC", query).casefold().split()).rstrip("?!. ")
+
+    @staticmethod
+    def scope_key(documents: Sequence[Dict[str, Any]], model: str, temperature: float, max_tokens: int) -> str:
+        """
+        Hash the document set and generation parameters a response depends on.
+
+        The documents are hashed as a set, so their order does not matter. Their source and span are hashed
+        with their text: the prompt cites sources and merges the overlapping spans of a source.
+        """
+        digest = hashlib.sha256(f"{model}\x00{float(temperature)!r}\x00{int(max_tokens)}".encode("utf-8"))
+        document_hashes = (
+            hashlib.sha256(
+                "\x00".join([*(repr(document.get(key)) for key in _SPAN_KEYS), document["text"]]).encode("utf-8")
+            ).digest()
+            for document in documents
+        )
+        for document_hash in sorted(document_hashes):
+            digest.update(document_hash)
+        return digest.hexdigest()
+
+    def make_key(self, query: str, scope: str) -> str:
+        return hashlib.sha256(f"{scope}\x00{self.normalize_query(query)}".encode("utf-8")).hexdigest()
+
+    def get(
+        self, query: str, documents: Sequence[Dict[str, Any]], model: str, temperature: float, max_tokens: int
+    ) -> Optional[str]:
+        """
+        Look up the response to a query.
+
+        Args:
+            query (str): The user's question.
+            documents (Sequence[Dict[str, Any]]): The documents of the prompt, with a 'text' key.
+            model (str): Name of the LLM.
+            temperature (float): Sampling temperature of the generation.
+            max_tokens (int): Maximum tokens of the response.
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss.
+
+        Raises:
+            ResponseCacheError: If the store cannot be read or the query cannot be embedded.
+        """
+        scope = self.scope_key(documents, model, temperature, max_tokens)
+        cached = self.store.get(self.make_key(query, scope))
+        result = "exact" if cached is not None else "miss"
+        if cached is None and self.semantic:
+            cached = self._closest(query, scope)
+            result = "semantic" if cached is not None else "miss"
+        with self._lock:
+            if cached is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.semantic_hits += result == "semantic"
+        metrics.increment("response_cache_lookups_total", help_text="Response cache lookups.", result=result)
+        return cached.response if cached is not None else None
+
+    def set(
+        self,
+        query: str,
+        documents: Sequence[Dict[str, Any]],
+        model: str,
+        temperature: float,
+        max_tokens: int,
+        response: str,
+    ) -> None:
+        """
+        Cache the response to a query. Empty responses are not cached.
+
+        Raises:
+            ResponseCacheError: If the store cannot be written or the query cannot be embedded.
+        """
+        if not response:
+            return
+        scope = self.scope_key(documents, model, temperature, max_tokens)
+        embedding = self._embed(query) if self.semantic else None
+        self.store.set(self.make_key(query, scope), CachedResponse(response=response, scope=scope, embedding=embedding))
+
+    def clear(self) -> None:
+        """
+        Remove every response and reset the statistics.
+        """
+        self.store.clear()
+        self._embeddings.clear()
+        with self._lock:
+            self.hits = self.semantic_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the hits, semantic hits, misses, hit rate and number of cached responses.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.store),
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _embed(self, query: str) -> np.ndarray:
+        """
+        Embed a normalized query as a unit float32 vector, reusing the embedding of a recent lookup.
+        """
+        normalized = self.normalize_query(query)
+        embedding = self._embeddings.get(normalized)
+        if embedding is None:
+            try:
+                vector = np.asarray(self.embedder.generate_embeddings([normalized])[0], dtype=np.float32)
+            except Exception as e:
+                raise ResponseCacheError(f"Failed to embed the query: {e}")
+            norm = float(np.linalg.norm(vector))
+            embedding = vector / norm if norm else vector
+            self._embeddings.set(normalized, embedding)
+        return embedding
+
+    def _closest(self, query: str, scope: str) -> Optional[CachedResponse]:
+        """
+        Return the cached response of the query of a scope most similar to `query`, if similar enough.
+        """
+        candidates = self.store.scope_embeddings(scope)
+        if not candidates:
+            return None
+        embedding = self._embed(query)
+        similarities = np.stack([candidate for _, candidate in candidates]) @ embedding
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            return None
+        return self.store.get(candidates[best][0])
+
+
+def build_response_cache(backend: str = RESPONSE_CACHE_BACKEND) -> ResponseCache:
+    """
+    Build the response cache of the configured backend.
+
+    Args:
+        backend (str): "memory" for a process-local store, or "sqlite" for a store on disk at RESPONSE_CACHE_PATH.
+
+    Returns:
+        ResponseCache: The response cache.
+
+    Raises:
+        ResponseCacheError: If the backend is unknown or its store cannot be opened.
+    """
+    if backend == "memory":
+        return ResponseCache(InMemoryResponseStore())
+    if backend == "sqlite":
+        return ResponseCache(SQLiteResponseStore())
+    raise ResponseCacheError(f"Unknown response cache backend '{backend}', expected 'memory' or 'sqlite'")
@@ -1,36 +1,299 @@
-from fastapi import APIRouter, HTTPException
+import asyncio
+import json
+import logging
+from contextlib import aclosing
+from typing import AsyncIterator, Awaitable, List, Optional, Tuple, TypeVar, Union
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from llm_integration.exceptions import LLMTimeoutError
 from llm_integration.llm_chain import LLMIntegrationWithLLaMA
-from api.schemas import GenerateRequest, GenerateResponse
+from retriever.retriever import Retriever
+from utils.exceptions import SingleFlightTimeoutError
+from utils.singleflight import AsyncSingleFlight
+from api.config import GENERATE_COALESCE_TIMEOUT_SECONDS, RESPONSE_CACHE_ENABLED
+from api.exceptions import ResponseCacheError
+from api.response_cache import ResponseCache, build_response_cache
+from api.schemas import (
+    GenerateRequest,
+    GenerateResponse,
+    QueryResult,
+    RetrieveBatchRequest,
+    RetrieveBatchResponse,
+    RetrievedDocument,
+)
 
 # Initialize the router to manage API routes
 router = APIRouter()
 
+# Interval at which a pending generation checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+api_logger = logging.getLogger("api_logger")
+
 # Create an instance of the LLaMA integration
 llm_integration = LLMIntegrationWithLLaMA()
 
+# The retriever loads its embedding model and vector store on the first request
+retriever = Retriever()
+
+# Responses to repeated questions about the same documents, served without calling the LLM
+response_cache: Optional[ResponseCache] = build_response_cache() if RESPONSE_CACHE_ENABLED else None
+
+# Concurrent identical generation requests wait for one LLM call instead of each making their own
+generation_flights = AsyncSingleFlight("generate", timeout=GENERATE_COALESCE_TIMEOUT_SECONDS)
+
+
+class ClientDisconnectedError(Exception):
+    """Raised when the client goes away before its response is ready."""
+
+    pass
+
+
+async def run_until_disconnected(raw_request: Request, awaitable: Awaitable[T]) -> T:
+    """
+    Await a coroutine, cancelling it if the client disconnects first.
+
+    Args:
+        raw_request (Request): The incoming HTTP request.
+        awaitable (Awaitable[T]): The work done for this request.
+
+    Returns:
+        T: The result of the awaitable.
+
+    Raises:
+        ClientDisconnectedError: If the client disconnected and the work was cancelled.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await raw_request.is_disconnected():
+                raise ClientDisconnectedError("Client disconnected before the response was ready")
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+async def cached_response(request: GenerateRequest) -> Optional[str]:
+    """
+    Return the cached response to a generation request, or None on a miss or if the cache fails.
+    """
+    if response_cache is None:
+        return None
+    try:
+        return await run_in_threadpool(
+            response_cache.get,
+            request.query,
+            [doc.model_dump() for doc in request.documents],
+            llm_integration.model,
+            request.temperature,
+            request.max_tokens,
+        )
+    except ResponseCacheError as e:
+        api_logger.warning(f"Response cache lookup failed: {e}")
+        return None
+
+
+async def cache_response(request: GenerateRequest, response: str) -> None:
+    """
+    Cache the response to a generation request; a failure of the cache is only logged.
+    """
+    if response_cache is None:
+        return
+    try:
+        await run_in_threadpool(
+            response_cache.set,
+            request.query,
+            [doc.model_dump() for doc in request.documents],
+            llm_integration.model,
+            request.temperature,
+            request.max_tokens,
+            response,
+        )
+    except ResponseCacheError as e:
+        api_logger.warning(f"Response cache update failed: {e}")
+
+
+def generation_key(request: GenerateRequest) -> Tuple[str, str]:
+    """
+    Identify the requests that must get the same response: the response cache's scope and normalized query.
+    """
+    scope = ResponseCache.scope_key(
+        [doc.model_dump() for doc in request.documents], llm_integration.model, request.temperature, request.max_tokens
+    )
+    return scope, ResponseCache.normalize_query(request.query)
+
+
+async def generate_and_cache(request: GenerateRequest) -> str:
+    """
+    Generate the response to a request with the LLM, then cache it.
+    """
+    response = await llm_integration.agenerate_response(
+        query=request.query,
+        retrieved_docs=[doc.model_dump(exclude_none=True) for doc in request.documents],
+        temperature=request.temperature,
+        max_tokens=request.max_tokens,
+    )
+    await cache_response(request, response)
+    return response
+
+
+async def stream_and_cache(request: GenerateRequest, updates: "asyncio.Queue[Union[str, BaseException, None]]") -> str:
+    """
+    Stream the response to a request from the LLM, then cache it.
+
+    Each token is put in `updates` as it arrives, followed by None at the end, or by the exception
+    that stopped the stream.
+
+    Returns:
+        str: The complete response.
+    """
+    streamed: List[str] = []
+    try:
+        tokens = llm_integration.astream_response(
+            query=request.query,
+            retrieved_docs=[doc.model_dump(exclude_none=True) for doc in request.documents],
+            temperature=request.temperature,
+            max_tokens=request.max_tokens,
+        )
+        # aclosing releases the concurrency slot and the upstream stream as soon as we stop reading
+        async with aclosing(tokens):
+            async for token in tokens:
+                streamed.append(token)
+                updates.put_nowait(token)
+        response = "".join(streamed)
+        await cache_response(request, response)
+    except BaseException as e:
+        updates.put_nowait(e)
+        raise
+    updates.put_nowait(None)
+    return response
+
 
 @router.post("/generate-response", response_model=GenerateResponse)
-async def generate_response(request: GenerateRequest):
+async def generate_response(request: GenerateRequest, raw_request: Request):
     """
     Endpoint to generate a response from a query and contextual documents.
+    Repeated questions about the same documents are answered from the response cache, and concurrent
+    identical requests share one generation. It runs on the shared async Groq client, so it does not
+    block other requests, and is cancelled once every client waiting for it has disconnected.
     Args:
         request (GenerateRequest): The request containing a query and documents.
+        raw_request (Request): The underlying HTTP request, watched for disconnection.
 
     Returns:
         GenerateResponse: The generated response from the model.
     """
+    cached = await cached_response(request)
+    if cached is not None:
+        return GenerateResponse(response=cached)
     try:
         # Extract document texts and generate a response using LLaMA
-
-        response = llm_integration.generate_response(
-            query=request.query,
-            retrieved_docs=[{"text": doc.text} for doc in request.documents],
-            temperature=request.temperature,
-            max_tokens=request.max_tokens,
+        response = await run_until_disconnected(
+            raw_request,
+            generation_flights.do(generation_key(request), lambda: generate_and_cache(request)),
         )
-        return GenerateResponse(response=response)
+    except ClientDisconnectedError as e:
+        # Nobody reads this response; 499 marks it as client-closed in the logs
+        raise HTTPException(status_code=499, detail=str(e))
+    except (LLMTimeoutError, SingleFlightTimeoutError) as e:
+        raise HTTPException(status_code=504, detail=f"Failed to generate response: {e}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to generate response: {e}")
+    return GenerateResponse(response=response)
+
+
+def _sse(data: dict, event: str = "") -> str:
+    """
+    Format a server-sent event.
+    """
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+
+@router.post("/generate-response/stream")
+async def generate_response_stream(request: GenerateRequest, raw_request: Request):
+    """
+    Endpoint streaming the generated response as server-sent events.
+    Each text fragment is sent as a `data: {"token": ...}` event as soon as the model produces it,
+    followed by a final `done` event, or an `error` event if the generation fails midway.
+    Concurrent identical requests, streamed or not, share one generation: the request that started it
+    streams the tokens, the others get the complete response as a single token, like cached responses.
+    The generation is cancelled and the upstream request closed once every client waiting for it has
+    disconnected; only complete responses are cached.
+    Args:
+        request (GenerateRequest): The request containing a query and documents.
+        raw_request (Request): The underlying HTTP request, watched for disconnection.
+
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    """
+
+    async def events() -> AsyncIterator[str]:
+        cached = await cached_response(request)
+        if cached is not None:
+            yield _sse({"token": cached})
+            yield _sse({}, event="done")
+            return
+        updates: "asyncio.Queue[Union[str, BaseException, None]]" = asyncio.Queue()
+        shared, leader = generation_flights.join(generation_key(request), lambda: stream_and_cache(request, updates))
+        waiter = asyncio.ensure_future(shared)
+        try:
+            if not leader:
+                yield _sse({"token": await waiter})
+            while leader:
+                update = await updates.get()
+                if update is None:
+                    break
+                if isinstance(update, BaseException):
+                    # The waiter raises the error of the flight, or its timeout
+                    await waiter
+                    raise update
+                if await raw_request.is_disconnected():
+                    return
+                yield _sse({"token": update})
+        except Exception as e:
+            yield _sse({"detail": f"Failed to generate response: {e}"}, event="error")
+            return
+        finally:
+            # Stops waiting; the generation goes on if other clients wait for it
+            waiter.cancel()
+        yield _sse({}, event="done")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@router.post("/retrieve-batch", response_model=RetrieveBatchResponse)
+def retrieve_batch(request: RetrieveBatchRequest):
+    """
+    Endpoint to retrieve the most relevant documents of several queries at once.
+    Declared synchronous so FastAPI runs the blocking retrieval in its thread pool.
+    Args:
+        request (RetrieveBatchRequest): The queries and the number of documents per query.
+
+    Returns:
+        RetrieveBatchResponse: One result per query, in request order. A failing query carries
+        an error message instead of failing the whole batch.
+    """
+    try:
+        outcomes = retriever.retrieve_many(request.queries, top_k=request.top_k)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to retrieve documents: {e}")
+    return RetrieveBatchResponse(
+        results=[
+            QueryResult(
+                query=outcome["query"],
+                documents=[RetrievedDocument(**document) for document in outcome["results"]],
+                error=outcome["error"],
+            )
+            for outcome in outcomes
+        ]
+    )
 
 
 @router.get("/health")
@@ -1,13 +1,18 @@
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+from retriever.config import TOP_K_RESULTS
 
 
 class Document(BaseModel):
     """
-    Represents a contextual document with its text content.
+    Represents a contextual document with its text content, and optionally the character span of
+    the chunk in its source, used to merge overlapping chunks in the prompt.
     """
 
     text: str
+    source: Optional[str] = None
+    start_index: Optional[int] = None
+    end_index: Optional[int] = None
 
 
 class GenerateRequest(BaseModel):
@@ -27,3 +32,40 @@ class GenerateResponse(BaseModel):
     """
 
     response: str
+
+
+class RetrieveBatchRequest(BaseModel):
+    """
+    Schema for a request retrieving the relevant documents of several queries at once.
+    """
+
+    queries: List[str]
+    top_k: int = TOP_K_RESULTS
+
+
+class RetrievedDocument(BaseModel):
+    """
+    A document retrieved from the vector database with its similarity score.
+    """
+
+    id: str
+    score: float
+    text: str
+
+
+class QueryResult(BaseModel):
+    """
+    The documents retrieved for one query, or the error that prevented it.
+    """
+
+    query: str
+    documents: List[RetrievedDocument]
+    error: Optional[str] = None
+
+
+class RetrieveBatchResponse(BaseModel):
+    """
+    Schema for the response of a batch retrieval, with one result per query in request order.
+    """
+
+    results: List[QueryResult]
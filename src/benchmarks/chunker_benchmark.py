@@ -0,0 +1,131 @@
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.config import BENCHMARK_SEED, PARAGRAPHS_PER_DOC
+from benchmarks.corpus import make_paragraphs
+from benchmarks.fakes import FakeSentenceTransformer
+from benchmarks.run_benchmarks import environment_info, save_results
+from embeddings.config import CHUNK_OVERLAP, CHUNK_OVERLAP_TOKENS, CHUNK_SIZE
+from embeddings.token_chunker import TokenChunker
+
+
+def token_lengths(tokenizer: Any, chunks: List[str]) -> np.ndarray:
+    """
+    Count the tokens of each chunk as the embedding model sees them, special tokens included.
+    """
+    if not chunks:
+        return np.zeros(0, dtype=np.int64)
+    return np.array([len(ids) for ids in tokenizer(chunks, verbose=False)["input_ids"]], dtype=np.int64)
+
+
+def _summary(seconds: float, characters: int, chunks: List[str], lengths: np.ndarray, window: int) -> Dict[str, Any]:
+    return {
+        "seconds": seconds,
+        "chunks": len(chunks),
+        "mb_text_per_s": characters / 1e6 / seconds if seconds else 0.0,
+        "mean_tokens": float(lengths.mean()) if len(lengths) else 0.0,
+        "max_tokens": int(lengths.max()) if len(lengths) else 0,
+        # Chunks the model truncates, whose tail is never embedded
+        "truncated_fraction": float((lengths > window).mean()) if len(lengths) else 0.0,
+    }
+
+
+def run_chunker_benchmark(
+    num_documents: int = 200,
+    paragraphs_per_doc: int = PARAGRAPHS_PER_DOC,
+    chunk_size: int = CHUNK_SIZE,
+    chunk_overlap: int = CHUNK_OVERLAP,
+    overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+    model_name: Optional[str] = None,
+    repeat: int = 3,
+    seed: int = BENCHMARK_SEED,
+) -> Dict[str, Any]:
+    """
+    Compare the character splitter with the token chunker on synthetic documents.
+
+    Args:
+        num_documents (int): Documents to split.
+        paragraphs_per_doc (int): Paragraphs per document.
+        chunk_size (int): Characters per chunk of the character splitter.
+        chunk_overlap (int): Character overlap of the character splitter.
+        overlap_tokens (int): Token overlap of the token chunker.
+        model_name (Optional[str]): A locally available sentence-transformers model whose tokenizer and
+            window are used instead of the offline WordPiece tokenizer.
+        repeat (int): Runs per measurement; the fastest is kept.
+        seed (int): Seed of the generated documents.
+
+    Returns:
+        Dict[str, Any]: Per splitter, its speed and the token lengths of its chunks.
+    """
+    model: Any
+    if model_name:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+    else:
+        model = FakeSentenceTransformer()
+    rng = random.Random(seed)
+    texts = [" ".join(make_paragraphs(rng, paragraphs_per_doc)) for _ in range(num_documents)]
+    characters = sum(len(text) for text in texts)
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunker = TokenChunker.from_model(model, overlap_tokens=overlap_tokens)
+    splitters = {
+        "recursive_characters": lambda: [chunk for text in texts for chunk in splitter.split_text(text)],
+        "tokens": lambda: [
+            text[start:end] for text, spans in zip(texts, chunker.split_many(texts)) for start, end, _ in spans
+        ],
+    }
+
+    results: Dict[str, Any] = {}
+    for name, split in splitters.items():
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            chunks = split()
+            timings.append(time.perf_counter() - start)
+        lengths = token_lengths(model.tokenizer, chunks)
+        results[name] = _summary(min(timings), characters, chunks, lengths, model.max_seq_length)
+    return {
+        "environment": environment_info(),
+        "parameters": {
+            "documents": num_documents,
+            "characters": characters,
+            "model": model_name or "wordpiece",
+            "max_seq_length": model.max_seq_length,
+            "chunk_size": chunk_size,
+            "chunk_overlap": chunk_overlap,
+            "max_tokens": chunker.max_tokens,
+            "overlap_tokens": chunker.overlap_tokens,
+        },
+        "splitters": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the character splitter against the token chunker.")
+    parser.add_argument("--documents", type=int, default=200)
+    parser.add_argument("--paragraphs", type=int, default=PARAGRAPHS_PER_DOC)
+    parser.add_argument("--model", default=None, help="Locally available sentence-transformers model.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output-dir", default=None, help="Also save the results as JSON in this directory.")
+    args = parser.parse_args(argv)
+
+    results = run_chunker_benchmark(args.documents, args.paragraphs, model_name=args.model, repeat=args.repeat)
+    print(json.dumps(results["parameters"]))
+    for name, result in results["splitters"].items():
+        print(
+            f"{name:21s} {result['seconds'] * 1000:8.1f} ms  {result['mb_text_per_s']:6.2f} MB/s  "
+            f"{result['chunks']:6d} chunks  mean {result['mean_tokens']:6.1f} tokens  max {result['max_tokens']:5d}  "
+            f"truncated {result['truncated_fraction']:.1%}"
+        )
+    if args.output_dir:
+        print(f"Results written to {save_results(results, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+BENCHMARK_OUTPUT_DIR = "data/benchmarks"  # Where benchmark results are written as JSON
+BENCHMARK_SEED = 0  # Seed of the synthetic corpus and queries, so runs are comparable
+DOCS_PER_FORMAT = 20  # Synthetic documents generated per file format
+PARAGRAPHS_PER_DOC = 30  # Paragraphs per synthetic document
+CORPUS_FORMATS = ("pdf", "docx", "html", "txt")
+NUM_QUERIES = 200  # Queries timed in the retrieval and generation benchmarks
+BENCHMARK_TOP_K = 5
+FAKE_EMBEDDING_DIMENSIONS = 384  # Same size as the default sentence-transformers model
+FAKE_LLM_TOKENS = 64  # Tokens streamed by the fake LLM per answer
+FAKE_LLM_TOKEN_DELAY = 0.0  # Seconds the fake LLM waits before each token
@@ -0,0 +1,171 @@
+import os
+import random
+from typing import Callable, Dict, List, Sequence
+import docx
+from benchmarks.config import BENCHMARK_SEED, CORPUS_FORMATS, DOCS_PER_FORMAT, PARAGRAPHS_PER_DOC
+
+# Vocabulary of the synthetic documents; a fixed list keeps corpora identical across machines
+_WORDS = (
+    "risk portfolio market trading volatility return asset hedge liquidity yield bond equity option "
+    "future spread arbitrage momentum factor model optimization constraint allocation benchmark index "
+    "variance covariance correlation regression forecast signal strategy execution order price volume "
+    "exposure drawdown leverage capital margin collateral credit default rating duration convexity curve "
+    "inflation rate currency commodity sector region cycle regime scenario stress simulation estimate"
+).split()
+
+# Characters per line and lines per page of the synthetic PDFs
+_PDF_LINE_CHARS = 90
+_PDF_PAGE_LINES = 60
+
+
+def corpus_vocabulary() -> List[str]:
+    """
+    Return the words of the synthetic documents.
+    """
+    return list(_WORDS)
+
+
+def make_paragraphs(rng: random.Random, count: int) -> List[str]:
+    """
+    Generate pseudo-random paragraphs of 3 to 8 sentences.
+    """
+    paragraphs = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(3, 8)):
+            words = rng.choices(_WORDS, k=rng.randint(8, 20))
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def write_txt(path: str, paragraphs: Sequence[str]) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def write_html(path: str, paragraphs: Sequence[str]) -> None:
+    body = "\n".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"<html><head><title>{os.path.basename(path)}</title></head><body>\n{body}\n</body></html>")
+
+
+def write_docx(path: str, paragraphs: Sequence[str]) -> None:
+    document = docx.Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    lines, line = [], ""
+    for word in text.split():
+        if line and len(line) + 1 + len(word) > width:
+            lines.append(line)
+            line = word
+        else:
+            line = f"{line} {word}" if line else word
+    if line:
+        lines.append(line)
+    return lines
+
+
+def write_pdf(path: str, paragraphs: Sequence[str]) -> None:
+    """
+    Write a text-only PDF with the standard Helvetica font, without any PDF library.
+    """
+    lines: List[str] = []
+    for paragraph in paragraphs:
+        lines.extend(_wrap(paragraph, _PDF_LINE_CHARS))
+        lines.append("")
+    pages = [lines[start : start + _PDF_PAGE_LINES] for start in range(0, len(lines), _PDF_PAGE_LINES)] or [[]]
+
+    # Objects 1-3 are the catalog, the page tree and the font; each page then has a page and a content object
+    objects: List[bytes] = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page_lines in pages:
+        commands = ["BT", "/F1 10 Tf", "12 TL", "40 780 Td"]
+        for line in page_lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            commands.append(f"({escaped}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode()
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    output += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    output += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(output)
+
+
+WRITERS: Dict[str, Callable[[str, Sequence[str]], None]] = {
+    "txt": write_txt,
+    "html": write_html,
+    "docx": write_docx,
+    "pdf": write_pdf,
+}
+
+
+def generate_corpus(
+    output_dir: str,
+    docs_per_format: int = DOCS_PER_FORMAT,
+    paragraphs_per_doc: int = PARAGRAPHS_PER_DOC,
+    formats: Sequence[str] = CORPUS_FORMATS,
+    seed: int = BENCHMARK_SEED,
+) -> List[str]:
+    """
+    Generate a synthetic corpus. The same arguments always produce the same documents.
+
+    Args:
+        output_dir (str): Directory to write the documents to.
+        docs_per_format (int): Number of documents per format.
+        paragraphs_per_doc (int): Number of paragraphs per document.
+        formats (Sequence[str]): File formats to generate, among "pdf", "docx", "html" and "txt".
+        seed (int): Seed of the text generator.
+
+    Returns:
+        List[str]: Paths of the generated documents.
+    """
+    unknown = set(formats) - set(WRITERS)
+    if unknown:
+        raise ValueError(f"Unsupported corpus formats: {sorted(unknown)}")
+    os.makedirs(output_dir, exist_ok=True)
+    rng = random.Random(seed)
+    paths = []
+    for file_format in formats:
+        for index in range(docs_per_format):
+            path = os.path.join(output_dir, f"doc_{index:05d}.{file_format}")
+            WRITERS[file_format](path, make_paragraphs(rng, paragraphs_per_doc))
+            paths.append(path)
+    return paths
+
+
+def make_queries(count: int, seed: int = BENCHMARK_SEED) -> List[str]:
+    """
+    Generate distinct short queries from the corpus vocabulary.
+    """
+    rng = random.Random(seed + 1)
+    queries: List[str] = []
+    seen = set()
+    while len(queries) < count:
+        query = " ".join(rng.choices(_WORDS, k=rng.randint(3, 7)))
+        if query not in seen:
+            seen.add(query)
+            queries.append(query)
+    return queries
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from benchmarks.config import BENCHMARK_SEED, BENCHMARK_TOP_K, DOCS_PER_FORMAT, NUM_QUERIES, PARAGRAPHS_PER_DOC
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import HashingEmbedder
+from benchmarks.run_benchmarks import environment_info, latency_summary, save_results
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline
+from embeddings.chunks import DocumentChunker
+from embeddings.dim_reduction import PCAProjection, create_projection
+from embeddings.embedding_generator import EmbeddingGenerator
+from vector_database.local_store import LocalVectorStore
+
+
+def _search(vectors: np.ndarray, queries: np.ndarray, top_k: int) -> Dict[str, Any]:
+    store = LocalVectorStore(vectors.shape[1])
+    store.upsert_vectors({"id": str(i), "values": row} for i, row in enumerate(vectors))
+    latencies, found = [], []
+    for query in queries:
+        start = time.perf_counter()
+        matches = store.query_vectors(query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        found.append([match["id"] for match in matches])
+    return {"found": found, "latency": latency_summary(latencies), "index_bytes": store.index_bytes}
+
+
+def run_dimension_benchmark(
+    dimensions: Sequence[int] = (32, 64, 128, 192, 256),
+    methods: Sequence[str] = ("pca", "truncate"),
+    docs_per_format: int = DOCS_PER_FORMAT,
+    paragraphs_per_doc: int = PARAGRAPHS_PER_DOC,
+    num_queries: int = NUM_QUERIES,
+    top_k: int = BENCHMARK_TOP_K,
+    model_name: Optional[str] = None,
+    seed: int = BENCHMARK_SEED,
+) -> Dict[str, Any]:
+    """
+    Measure the recall of reduced-dimension search against full-dimension search on the benchmark corpus.
+
+    The corpus is ingested and chunked as in `run_benchmarks`; the PCA projection is fitted on its chunk
+    embeddings. Recall is the fraction of the exact full-dimension top-k found in the reduced space.
+
+    Args:
+        dimensions (Sequence[int]): Reduced dimensionalities to evaluate.
+        methods (Sequence[str]): Reduction methods, "pca" and/or "truncate". Truncation is only expected to
+            work with Matryoshka models.
+        docs_per_format (int): Synthetic documents per file format.
+        paragraphs_per_doc (int): Paragraphs per document.
+        num_queries (int): Queries evaluated.
+        top_k (int): Results per query.
+        model_name (Optional[str]): A locally available sentence-transformers model to use instead of the
+            hashing embedder.
+        seed (int): Seed of the corpus and queries.
+
+    Returns:
+        Dict[str, Any]: The full-dimension baseline, then per method and dimensionality the recall, the index
+        size, the query latencies and, for PCA, the fraction of the squared norm of the
+        embeddings kept.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = generate_corpus(os.path.join(tmp_dir, "corpus"), docs_per_format, paragraphs_per_doc, seed=seed)
+        documents = DataIngestionPipeline(parse_cache=None).ingest(file_paths)
+    chunker = DocumentChunker(directory="")
+    texts = [chunk.page_content for document in documents for chunk in chunker.split_document(document)]
+
+    model = None if model_name else HashingEmbedder()
+    generator = EmbeddingGenerator(model_name=model_name or "hashing", cache=None, model=model)
+    vectors = generator.generate_embeddings(texts)
+    queries = generator.generate_embeddings(make_queries(num_queries, seed))
+    full_dimensions = vectors.shape[1]
+
+    baseline = _search(vectors, queries, top_k)
+    truth = baseline.pop("found")
+    results: Dict[str, Any] = {"full": {"dimensions": full_dimensions, "recall": 1.0, **baseline}}
+    for method in methods:
+        results[method] = {}
+        for output_dimensions in dimensions:
+            if output_dimensions >= full_dimensions:
+                continue
+            projection = create_projection(method, full_dimensions, output_dimensions)
+            if projection is None:
+                continue
+            if isinstance(projection, PCAProjection):
+                projection.fit(vectors)
+            reduced = _search(projection.transform(vectors), projection.transform(queries), top_k)
+            found = reduced.pop("found")
+            hits = sum(len(set(expected) & set(ids)) for expected, ids in zip(truth, found))
+            results[method][output_dimensions] = {"recall": hits / (top_k * len(queries)), **reduced}
+            if isinstance(projection, PCAProjection):
+                results[method][output_dimensions]["retained_energy"] = projection.retained_energy
+    return {
+        "environment": environment_info(),
+        "parameters": {
+            "chunks": len(texts),
+            "queries": len(queries),
+            "top_k": top_k,
+            "model": model_name or "hashing",
+            "full_dimensions": full_dimensions,
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Report the recall of reduced-dimension search on the corpus.")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[32, 64, 128, 192, 256])
+    parser.add_argument("--methods", nargs="+", default=["pca", "truncate"])
+    parser.add_argument("--docs-per-format", type=int, default=DOCS_PER_FORMAT)
+    parser.add_argument("--paragraphs", type=int, default=PARAGRAPHS_PER_DOC)
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=BENCHMARK_TOP_K)
+    parser.add_argument("--model", default=None, help="Locally available sentence-transformers model.")
+    parser.add_argument("--output-dir", default=None, help="Also save the results as JSON in this directory.")
+    args = parser.parse_args(argv)
+
+    results = run_dimension_benchmark(
+        args.dimensions,
+        args.methods,
+        args.docs_per_format,
+        args.paragraphs,
+        args.queries,
+        args.top_k,
+        model_name=args.model,
+    )
+    print(json.dumps(results["parameters"]))
+    full = results["results"]["full"]
+    print(f"full     {full['dimensions']:4d} dims  {full['index_bytes'] / 2**20:7.2f} MiB  recall 1.000")
+    for method in args.methods:
+        for output_dimensions, result in results["results"][method].items():
+            energy = f"  energy kept {result['retained_energy']:.1%}" if "retained_energy" in result else ""
+            print(
+                f"{method:8s} {output_dimensions:4d} dims  {result['index_bytes'] / 2**20:7.2f} MiB  "
+                f"recall@{args.top_k} {result['recall']:.3f}  p50 {result['latency']['p50_ms']:.2f} ms{energy}"
+            )
+    if args.output_dir:
+        print(f"Results written to {save_results(results, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
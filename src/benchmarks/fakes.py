@@ -0,0 +1,142 @@
+import hashlib
+import string
+import time
+from types import SimpleNamespace
+from typing import Any, Iterator, List
+import numpy as np
+from benchmarks.config import FAKE_EMBEDDING_DIMENSIONS, FAKE_LLM_TOKEN_DELAY, FAKE_LLM_TOKENS
+from benchmarks.corpus import corpus_vocabulary
+
+
+class HashingEmbedder:
+    """
+    Deterministic stand-in for a SentenceTransformer model, used to benchmark without downloading a model.
+
+    Each word is hashed to a fixed random unit vector and a text is the normalized sum of its words,
+    so texts sharing words are similar. The cost scales with the amount of text, like a real encoder.
+    """
+
+    def __init__(self, dimensions: int = FAKE_EMBEDDING_DIMENSIONS):
+        self.dimensions = dimensions
+        self._word_vectors: dict = {}
+
+    def _word_vector(self, word: str) -> np.ndarray:
+        vector = self._word_vectors.get(word)
+        if vector is None:
+            seed = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+            vector /= np.linalg.norm(vector)
+            self._word_vectors[word] = vector
+        return vector
+
+    def encode(self, texts: List[str], batch_size: int = 32, **kwargs: Any) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row] += self._word_vector(word.strip(".,;:!?"))
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+
+class FakeLLMClient:
+    """
+    Stand-in for the Groq client: every completion is `tokens` words, streamed with `token_delay`
+    seconds before each token to simulate generation speed.
+    """
+
+    def __init__(self, tokens: int = FAKE_LLM_TOKENS, token_delay: float = FAKE_LLM_TOKEN_DELAY):
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _tokens(self) -> Iterator[str]:
+        for index in range(self.tokens):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            yield f"token{index} "
+
+    def create(self, stream: bool = False, **kwargs: Any) -> Any:
+        if stream:
+            return (
+                SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+                for token in self._tokens()
+            )
+        content = "".join(self._tokens())
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class FakeSentenceTransformer(HashingEmbedder):
+    """
+    HashingEmbedder with the `tokenizer` and `max_seq_length` of a SentenceTransformer model.
+
+    The tokenizer is a Hugging Face fast WordPiece tokenizer built offline: most words of the corpus
+    are whole-word tokens and the last tenth split into letter pieces, like rare words do with a
+    real subword vocabulary.
+    """
+
+    def __init__(self, dimensions: int = FAKE_EMBEDDING_DIMENSIONS, max_seq_length: int = 384):
+        super().__init__(dimensions)
+        self.max_seq_length = max_seq_length
+        self.tokenizer = make_wordpiece_tokenizer()
+
+
+def make_wordpiece_tokenizer() -> Any:
+    """
+    Build the fast WordPiece tokenizer of FakeSentenceTransformer.
+    """
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    specials = ["[PAD]", "[UNK]", "[CLS]", "[SEP]"]
+    characters = string.ascii_lowercase + string.ascii_uppercase + string.digits
+    words = corpus_vocabulary()
+    pieces = [
+        *words[: len(words) * 9 // 10],
+        *characters,
+        *(f"##{character}" for character in characters),
+        *string.punctuation,
+    ]
+    vocab = {token: index for index, token in enumerate(dict.fromkeys(specials + pieces))}
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]", special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])]
+    )
+    return PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, unk_token="[UNK]", cls_token="[CLS]", sep_token="[SEP]", pad_token="[PAD]"
+    )
+
+
+def make_cross_encoder(directory: str, num_layers: int = 6, hidden_size: int = 384) -> str:
+    """
+    Save an untrained cross-encoder with the shape of ms-marco-MiniLM-L-6-v2 and the offline WordPiece tokenizer.
+
+    Its scores are meaningless but it costs as much CPU per pair as the real model, so reranking latency
+    can be benchmarked without downloading a model.
+
+    Args:
+        directory (str): Where the model is saved.
+        num_layers (int): Transformer layers.
+        hidden_size (int): Hidden size, with one attention head per 32 dimensions.
+
+    Returns:
+        str: The directory, to load with `sentence_transformers.CrossEncoder`.
+    """
+    import torch
+    from transformers import BertConfig, BertForSequenceClassification
+
+    tokenizer = make_wordpiece_tokenizer()
+    config = BertConfig(
+        vocab_size=len(tokenizer),
+        hidden_size=hidden_size,
+        num_hidden_layers=num_layers,
+        num_attention_heads=hidden_size // 32,
+        intermediate_size=4 * hidden_size,
+        max_position_embeddings=512,
+        num_labels=1,
+    )
+    torch.manual_seed(0)
+    BertForSequenceClassification(config).save_pretrained(directory)
+    tokenizer.save_pretrained(directory)
+    return directory
@@ -0,0 +1,121 @@
+import argparse
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional
+from benchmarks.config import BENCHMARK_SEED
+from benchmarks.run_benchmarks import environment_info, save_results
+from data_ingestion.preprocessor import TextPreprocessor
+
+# Samples of extracted text: mostly prose, with the punctuation, symbols and layout whitespace of real documents
+_ASCII_WORDS = (
+    "the market risk portfolio return (see Table 3) volatility effect on 12.5% yields; e.g. bonds/equities "
+    "& options: price* [1] #4 $100 a_b x=y <tag> {json} ~approx | pipe @user"
+).split()
+_UNICODE_WORDS = _ASCII_WORDS + "café naïve €100 – — “quoted” ‘it’s’ • ü ß Ωmega 数据 ½ ©".split()
+_SEPARATORS = [" "] * 12 + ["\n", "\n\n", "  ", "\t", " \n "]
+
+
+def legacy_process(text: str) -> str:
+    """
+    The preprocessing of TextPreprocessor before it was optimized, kept as the reference output.
+    """
+    text = text.strip()
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r'[^a-zA-Z0-9À-ž\s.,!?\'"-]', "", text)
+    return text
+
+
+def make_text(rng: random.Random, words: List[str], num_words: int) -> str:
+    return "".join(rng.choice(words) + rng.choice(_SEPARATORS) for _ in range(num_words))
+
+
+def _time(func: Callable[[], Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_preprocessor_benchmark(
+    num_words: int = 500_000,
+    num_pages: int = 200,
+    num_documents: int = 2000,
+    repeat: int = 5,
+    seed: int = BENCHMARK_SEED,
+) -> Dict[str, Any]:
+    """
+    Compare TextPreprocessor with the legacy implementation on whole documents, page streams and batches.
+
+    Args:
+        num_words (int): Words of each whole-document sample (about 6 bytes per word).
+        num_pages (int): Pages the document is split into for the streaming case.
+        num_documents (int): Documents of the batch case.
+        repeat (int): Runs per measurement; the fastest is kept.
+        seed (int): Seed of the generated text.
+
+    Returns:
+        Dict[str, Any]: Per case, the legacy and new timings in seconds, the speedup, and whether
+        both implementations produced identical output.
+
+    Raises:
+        AssertionError: If the outputs differ in any case.
+    """
+    rng = random.Random(seed)
+    preprocessor = TextPreprocessor()
+    cases: Dict[str, Any] = {}
+
+    for name, words in (("ascii_document", _ASCII_WORDS), ("unicode_document", _UNICODE_WORDS)):
+        text = make_text(rng, words, num_words)
+        identical = preprocessor.process(text) == legacy_process(text)
+        legacy = _time(lambda: legacy_process(text), repeat)
+        new = _time(lambda: preprocessor.process(text), repeat)
+        cases[name] = {"bytes": len(text.encode("utf-8")), "legacy_s": legacy, "new_s": new, "identical": identical}
+
+    # Pages are cut at arbitrary positions, including inside whitespace runs
+    text = make_text(rng, _UNICODE_WORDS, num_words)
+    cuts = sorted(rng.sample(range(1, len(text)), num_pages - 1))
+    pages = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+    identical = "".join(preprocessor.iter_process(pages)) == legacy_process("".join(pages))
+    legacy = _time(lambda: legacy_process("".join(pages)), repeat)
+    new = _time(lambda: "".join(preprocessor.iter_process(pages)), repeat)
+    cases["page_stream"] = {"pages": num_pages, "legacy_s": legacy, "new_s": new, "identical": identical}
+
+    documents = [make_text(rng, _UNICODE_WORDS, rng.randint(50, 500)) for _ in range(num_documents)]
+    identical = preprocessor.process_batch(documents) == [legacy_process(document) for document in documents]
+    legacy = _time(lambda: [legacy_process(document) for document in documents], repeat)
+    new = _time(lambda: preprocessor.process_batch(documents), repeat)
+    cases["batch"] = {"documents": num_documents, "legacy_s": legacy, "new_s": new, "identical": identical}
+
+    for name, case in cases.items():
+        case["speedup"] = case["legacy_s"] / case["new_s"] if case["new_s"] else 0.0
+        assert case["identical"], f"TextPreprocessor output differs from the legacy output on '{name}'"
+    return {"environment": environment_info(), "cases": cases}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark TextPreprocessor against its legacy implementation.")
+    parser.add_argument("--words", type=int, default=500_000)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--documents", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output-dir", default=None, help="Also save the results as JSON in this directory.")
+    args = parser.parse_args(argv)
+
+    results = run_preprocessor_benchmark(args.words, args.pages, args.documents, args.repeat)
+    for name, case in results["cases"].items():
+        print(
+            f"{name:17s} legacy {case['legacy_s'] * 1000:8.1f} ms  new {case['new_s'] * 1000:8.1f} ms  "
+            f"speedup {case['speedup']:.2f}x  identical={case['identical']}"
+        )
+    if args.output_dir:
+        print(f"Results written to {save_results(results, args.output_dir)}")
+    else:
+        print(json.dumps(results["environment"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+import numpy as np
+from benchmarks.config import BENCHMARK_SEED, BENCHMARK_TOP_K
+from benchmarks.corpus import make_paragraphs, make_queries
+from benchmarks.run_benchmarks import environment_info, latency_summary, save_results
+from embeddings.quantization import PRECISIONS
+from vector_database.config import BINARY_RESCORE_FACTOR
+from vector_database.local_store import LocalVectorStore
+
+
+def clustered_embeddings(
+    rng: np.random.Generator, count: int, dimensions: int, num_topics: int = 100, chunks_per_document: int = 20
+) -> np.ndarray:
+    """
+    Unit vectors grouped by topic and by document, a stand-in for the chunk embeddings of a corpus.
+
+    The chunks of a document are closer to each other than to the other documents of their topic.
+    """
+    topics = rng.normal(size=(num_topics, dimensions))
+    num_documents = max(1, count // chunks_per_document)
+    documents = topics[rng.integers(0, num_topics, size=num_documents)] + 0.8 * rng.normal(
+        size=(num_documents, dimensions)
+    )
+    vectors = documents[rng.integers(0, num_documents, size=count)] + 0.6 * rng.normal(size=(count, dimensions))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def run_quantization_benchmark(
+    num_vectors: int = 50_000,
+    dimensions: int = 768,
+    num_queries: int = 200,
+    top_k: int = BENCHMARK_TOP_K,
+    rescore_factor: int = BINARY_RESCORE_FACTOR,
+    model_name: Optional[str] = None,
+    seed: int = BENCHMARK_SEED,
+) -> Dict[str, Any]:
+    """
+    Compare the memory, query latency and recall of the local store in every vector precision.
+
+    Recall is the fraction of the exact float32 top-k found by each precision.
+
+    Args:
+        num_vectors (int): Vectors indexed.
+        dimensions (int): Dimensionality of the synthetic vectors.
+        num_queries (int): Queries timed.
+        top_k (int): Results per query.
+        rescore_factor (int): Candidates rescored per result in binary precision.
+        model_name (Optional[str]): A locally available sentence-transformers model used to embed synthetic
+            paragraphs and queries instead of generating clustered vectors.
+        seed (int): Seed of the generated data.
+
+    Returns:
+        Dict[str, Any]: Per precision, the index size (including the rescore copy of binary stores) and the
+        size of the scanned matrix, their compression against float32, the query latencies, the speedup of
+        the mean latency and recall@top_k.
+    """
+    if model_name:
+        from sentence_transformers import SentenceTransformer
+
+        model = SentenceTransformer(model_name)
+        paragraphs = make_paragraphs(random.Random(seed), num_vectors)
+        vectors = model.encode(paragraphs, convert_to_numpy=True).astype(np.float32)
+        queries = model.encode(make_queries(num_queries, seed), convert_to_numpy=True).astype(np.float32)
+    else:
+        rng = np.random.default_rng(seed)
+        vectors = clustered_embeddings(rng, num_vectors, dimensions)
+        # Queries land near a stored chunk, as questions about a passage of the corpus do
+        queries = vectors[rng.integers(0, num_vectors, size=num_queries)]
+        queries = queries + 0.04 * rng.normal(size=queries.shape).astype(np.float32)
+    dimensions = vectors.shape[1]
+
+    results: Dict[str, Any] = {}
+    truth: List[List[str]] = []
+    for precision in PRECISIONS:
+        store = LocalVectorStore(dimensions, precision=precision, rescore_factor=rescore_factor)
+        store.upsert_vectors({"id": str(i), "values": row} for i, row in enumerate(vectors))
+        latencies, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            matches = store.query_vectors(query, top_k=top_k)
+            latencies.append(time.perf_counter() - start)
+            found.append([str(match["id"]) for match in matches])
+        if precision == "float32":
+            truth = found
+        hits = sum(len(set(expected) & set(ids)) for expected, ids in zip(truth, found))
+        results[precision] = {
+            "index_bytes": store.index_bytes,
+            "scan_bytes": store.scan_bytes,
+            "rescore_bytes": store.rescore_bytes,
+            "recall": hits / (top_k * len(queries)),
+            "latency": latency_summary(latencies),
+        }
+
+    baseline = results["float32"]
+    for result in results.values():
+        result["compression"] = baseline["index_bytes"] / result["index_bytes"]
+        result["scan_compression"] = baseline["scan_bytes"] / result["scan_bytes"]
+        result["speedup"] = baseline["latency"]["mean_ms"] / result["latency"]["mean_ms"]
+    return {
+        "environment": environment_info(),
+        "parameters": {
+            "vectors": num_vectors,
+            "dimensions": dimensions,
+            "queries": num_queries,
+            "top_k": top_k,
+            "rescore_factor": rescore_factor,
+            "model": model_name or "clustered",
+        },
+        "precisions": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the vector precisions of the local store.")
+    parser.add_argument("--vectors", type=int, default=50_000)
+    parser.add_argument("--dimensions", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=BENCHMARK_TOP_K)
+    parser.add_argument("--rescore-factor", type=int, default=BINARY_RESCORE_FACTOR)
+    parser.add_argument("--model", default=None, help="Locally available sentence-transformers model.")
+    parser.add_argument("--output-dir", default=None, help="Also save the results as JSON in this directory.")
+    args = parser.parse_args(argv)
+
+    results = run_quantization_benchmark(
+        args.vectors, args.dimensions, args.queries, args.top_k, args.rescore_factor, model_name=args.model
+    )
+    print(json.dumps(results["parameters"]))
+    for name, result in results["precisions"].items():
+        print(
+            f"{name:8s} {result['index_bytes'] / 2**20:8.1f} MiB  {result['compression']:5.1f}x smaller  "
+            f"(scanned {result['scan_bytes'] / 2**20:8.1f} MiB, {result['scan_compression']:5.1f}x)  "
+            f"p50 {result['latency']['p50_ms']:7.2f} ms  speedup {result['speedup']:5.2f}x  "
+            f"recall@{args.top_k} {result['recall']:.3f}"
+        )
+    if args.output_dir:
+        print(f"Results written to {save_results(results, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from sentence_transformers import CrossEncoder
+from benchmarks.config import BENCHMARK_SEED, BENCHMARK_TOP_K, PARAGRAPHS_PER_DOC
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import HashingEmbedder, make_cross_encoder
+from benchmarks.run_benchmarks import (
+    benchmark_chunking,
+    benchmark_indexing,
+    environment_info,
+    latency_summary,
+    save_results,
+)
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline
+from embeddings.embedding_generator import EmbeddingGenerator
+from retriever.config import RERANK_BATCH_SIZE, RERANK_LATENCY_BUDGET_MS, RERANK_MAX_LENGTH
+from retriever.reranker import CrossEncoderReranker
+from retriever.retriever import Retriever
+from utils.tracing import metrics
+from vector_database.local_store import LocalVectorStore
+from vector_database.vector_manager import VectorManager
+
+
+def _time_queries(retriever: Retriever, queries: List[str], top_k: int) -> List[float]:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        retriever.retrieve(query, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def run_rerank_benchmark(
+    candidates: Sequence[int] = (10, 50),
+    budgets_ms: Sequence[float] = (RERANK_LATENCY_BUDGET_MS,),
+    batch_size: int = RERANK_BATCH_SIZE,
+    max_length: int = RERANK_MAX_LENGTH,
+    docs_per_format: int = 5,
+    paragraphs_per_doc: int = PARAGRAPHS_PER_DOC,
+    num_queries: int = 20,
+    top_k: int = BENCHMARK_TOP_K,
+    model_name: Optional[str] = None,
+    seed: int = BENCHMARK_SEED,
+) -> Dict[str, Any]:
+    """
+    Measure the CPU latency of retrieval with cross-encoder reranking, per candidate count and latency budget.
+
+    The corpus is ingested, chunked and indexed as in `run_benchmarks`. Without `model_name`, the cross-encoder
+    is an untrained model with the shape of ms-marco-MiniLM-L-6-v2, as costly per pair as the real one.
+    Each configuration is timed on distinct queries, then on the same queries again with the result cache
+    cleared, so that only the pair scores are reused.
+
+    Args:
+        candidates (Sequence[int]): Candidates fetched and reranked per query.
+        budgets_ms (Sequence[float]): Latency budgets of the rerank, in milliseconds; 0 scores every candidate.
+        batch_size (int): Pairs per forward pass.
+        max_length (int): Tokens of a pair read by the cross-encoder.
+        docs_per_format (int): Synthetic documents per file format.
+        paragraphs_per_doc (int): Paragraphs per document.
+        num_queries (int): Queries timed per configuration.
+        top_k (int): Documents returned per query.
+        model_name (Optional[str]): A locally available cross-encoder to benchmark instead of the untrained one.
+        seed (int): Seed of the corpus and queries.
+
+    Returns:
+        Dict[str, Any]: The latencies without reranking, then per configuration the latencies, the latencies
+        with cached pair scores, and the average number of pairs scored by the model per query.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_paths = generate_corpus(os.path.join(tmp_dir, "corpus"), docs_per_format, paragraphs_per_doc, seed=seed)
+        documents = DataIngestionPipeline(parse_cache=None).ingest(file_paths)
+        chunks, _ = benchmark_chunking(documents, 1500, 250)
+        generator = EmbeddingGenerator(model_name="hashing", cache=None, model=HashingEmbedder())
+        embeddings = generator.generate_embeddings([chunk.page_content for chunk in chunks])
+        manager = VectorManager(
+            directory_documents="",
+            dimensions=embeddings.shape[1],
+            manifest_dir=os.path.join(tmp_dir, "manifests"),
+            store=LocalVectorStore(embeddings.shape[1]),
+        )
+        benchmark_indexing(chunks, embeddings, manager)
+        model_path = model_name or make_cross_encoder(os.path.join(tmp_dir, "cross-encoder"))
+        model = CrossEncoder(model_path, max_length=max_length, device="cpu")
+
+    queries = make_queries(num_queries, seed)
+    baseline = Retriever(manager, generator, rerank=False)
+    _time_queries(baseline, queries, top_k)
+    baseline.result_cache.clear()
+    results: Dict[str, Any] = {"none": {"latency": latency_summary(_time_queries(baseline, queries, top_k))}}
+
+    # Warm the model up, so that the first configuration does not pay for the first forward passes
+    model.predict([(queries[0], chunks[0].page_content)] * batch_size, batch_size=batch_size, show_progress_bar=False)
+    for budget in budgets_ms:
+        for count in candidates:
+            reranker = CrossEncoderReranker(
+                model_name=model_path, model=model, batch_size=batch_size, latency_budget_ms=budget
+            )
+            retriever = Retriever(manager, generator, reranker=reranker, rerank_candidates=count)
+            metrics.reset()
+            latencies = _time_queries(retriever, queries, top_k)
+            scored = metrics.get_counter("rerank_pairs_total", source="model")
+            retriever.result_cache.clear()
+            cached = _time_queries(retriever, queries, top_k)
+            results[f"{count}@{budget:g}ms"] = {
+                "candidates": count,
+                "budget_ms": budget,
+                "pairs_scored_per_query": scored / len(queries),
+                "latency": latency_summary(latencies),
+                "cached_latency": latency_summary(cached),
+            }
+    return {
+        "environment": environment_info(),
+        "parameters": {
+            "chunks": len(chunks),
+            "queries": len(queries),
+            "top_k": top_k,
+            "batch_size": batch_size,
+            "max_length": max_length,
+            "model": model_name or "untrained MiniLM-L6",
+        },
+        "results": results,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark retrieval latency with cross-encoder reranking.")
+    parser.add_argument("--candidates", type=int, nargs="+", default=[10, 50])
+    parser.add_argument("--budgets", type=float, nargs="+", default=[RERANK_LATENCY_BUDGET_MS], help="0 = no budget")
+    parser.add_argument("--batch-size", type=int, default=RERANK_BATCH_SIZE)
+    parser.add_argument("--max-length", type=int, default=RERANK_MAX_LENGTH)
+    parser.add_argument("--docs-per-format", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=BENCHMARK_TOP_K)
+    parser.add_argument("--model", default=None, help="Locally available cross-encoder.")
+    parser.add_argument("--output-dir", default=None, help="Also save the results as JSON in this directory.")
+    args = parser.parse_args(argv)
+
+    results = run_rerank_benchmark(
+        args.candidates,
+        args.budgets,
+        args.batch_size,
+        args.max_length,
+        args.docs_per_format,
+        num_queries=args.queries,
+        top_k=args.top_k,
+        model_name=args.model,
+    )
+    print(json.dumps(results["parameters"]))
+    for name, result in results["results"].items():
+        latency, cached = result["latency"], result.get("cached_latency")
+        pairs = f"  {result['pairs_scored_per_query']:5.1f} pairs/query" if "pairs_scored_per_query" in result else ""
+        warm = f"  cached p95 {cached['p95_ms']:8.1f} ms" if cached else ""
+        print(f"{name:14s} p50 {latency['p50_ms']:8.1f} ms  p95 {latency['p95_ms']:8.1f} ms{pairs}{warm}")
+    if args.output_dir:
+        print(f"Results written to {save_results(results, args.output_dir)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from benchmarks.config import (
+    BENCHMARK_OUTPUT_DIR,
+    BENCHMARK_SEED,
+    BENCHMARK_TOP_K,
+    CORPUS_FORMATS,
+    DOCS_PER_FORMAT,
+    FAKE_EMBEDDING_DIMENSIONS,
+    FAKE_LLM_TOKEN_DELAY,
+    FAKE_LLM_TOKENS,
+    NUM_QUERIES,
+    PARAGRAPHS_PER_DOC,
+)
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.fakes import FakeLLMClient, HashingEmbedder
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline
+from embeddings.chunks import DocumentChunker
+from embeddings.config import DEFAULT_BATCH_SIZE
+from embeddings.embedding_generator import EmbeddingGenerator
+from llm_integration.llm_chain import LLMIntegrationWithLLaMA
+from retriever.retriever import Retriever
+from utils.tracing import metrics
+from vector_database.local_store import LocalVectorStore
+from utils.hashing import hash_text
+from vector_database.manifest import make_vector_id
+from vector_database.vector_manager import VectorManager
+
+
+def peak_rss_bytes() -> int:
+    """
+    Return the peak resident set size of this process and of its finished child processes.
+    """
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * scale
+
+
+def latency_summary(seconds: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latencies in milliseconds.
+    """
+    if not seconds:
+        return {}
+    values = np.asarray(seconds) * 1000
+    return {
+        "p50_ms": float(np.percentile(values, 50)),
+        "p95_ms": float(np.percentile(values, 95)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "mean_ms": float(values.mean()),
+        "max_ms": float(values.max()),
+    }
+
+
+def benchmark_ingestion(file_paths: List[str], workers: int) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Load and preprocess the corpus with DataIngestionPipeline, serially or in worker processes.
+    """
+    pipeline = DataIngestionPipeline(parse_cache=None)
+    start = time.perf_counter()
+    if workers > 1:
+        results = list(pipeline.ingest_parallel(file_paths, max_workers=workers))
+        documents = [result.document for result in results if result.document is not None]
+        failed = sum(not result.ok for result in results)
+    else:
+        documents = pipeline.ingest(file_paths)
+        failed = len(file_paths) - len(documents)
+    elapsed = time.perf_counter() - start
+    characters = sum(len(document["text"]) for document in documents)
+    return documents, {
+        "documents": len(documents),
+        "failed": failed,
+        "workers": workers,
+        "seconds": elapsed,
+        "docs_per_s": len(documents) / elapsed if elapsed else 0.0,
+        "mb_text_per_s": characters / 1e6 / elapsed if elapsed else 0.0,
+    }
+
+
+def benchmark_chunking(
+    documents: List[Dict[str, Any]], chunk_size: int, chunk_overlap: int
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Split the ingested documents with the DocumentChunker text splitter.
+    """
+    chunker = DocumentChunker(directory="", chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    start = time.perf_counter()
+    chunks = [chunk for document in documents for chunk in chunker.split_document(document)]
+    elapsed = time.perf_counter() - start
+    return chunks, {
+        "chunks": len(chunks),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "seconds": elapsed,
+        "chunks_per_s": len(chunks) / elapsed if elapsed else 0.0,
+    }
+
+
+def benchmark_embedding(
+    texts: List[str], generator: EmbeddingGenerator, batch_size: int
+) -> Tuple[np.ndarray, Dict[str, Any]]:
+    """
+    Embed the chunks with EmbeddingGenerator.
+    """
+    start = time.perf_counter()
+    embeddings = generator.generate_embeddings(texts, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    return embeddings, {
+        "embeddings": len(texts),
+        "dimensions": int(embeddings.shape[1]),
+        "batch_size": batch_size,
+        "seconds": elapsed,
+        "embeddings_per_s": len(texts) / elapsed if elapsed else 0.0,
+    }
+
+
+def benchmark_indexing(chunks: List[Any], embeddings: np.ndarray, manager: VectorManager) -> Dict[str, Any]:
+    """
+    Upsert the embedded chunks into the vector store.
+    """
+    vectors = [
+        {
+            "id": make_vector_id(chunk.metadata.get("file_path", ""), f"{position}:{hash_text(chunk.page_content)}"),
+            "values": embedding.tolist(),
+            "metadata": {"text": chunk.page_content, **chunk.metadata},
+        }
+        for position, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+    start = time.perf_counter()
+    manager.upsert_vectors(vectors)
+    elapsed = time.perf_counter() - start
+    return {
+        "vectors": len(vectors),
+        "seconds": elapsed,
+        "vectors_per_s": len(vectors) / elapsed if elapsed else 0.0,
+    }
+
+
+def benchmark_retrieval(retriever: Retriever, queries: List[str], top_k: int) -> Dict[str, Any]:
+    """
+    Time Retriever.retrieve for distinct queries, then for the same queries again once cached.
+    """
+    cold: List[float] = []
+    warm: List[float] = []
+    for timings in (cold, warm):
+        for query in queries:
+            start = time.perf_counter()
+            retriever.retrieve(query, top_k=top_k)
+            timings.append(time.perf_counter() - start)
+    elapsed = sum(cold)
+    return {
+        "queries": len(queries),
+        "top_k": top_k,
+        "queries_per_s": len(queries) / elapsed if elapsed else 0.0,
+        "latency": latency_summary(cold),
+        "cached_latency": latency_summary(warm),
+    }
+
+
+def benchmark_generation(
+    llm: LLMIntegrationWithLLaMA, retriever: Retriever, queries: List[str], top_k: int
+) -> Dict[str, Any]:
+    """
+    Time the full request path, retrieval then streamed generation, against the fake LLM, and count the
+    document tokens of the prompts before and after context packing.
+    """
+    input_tokens = metrics.get_counter("llm_context_tokens_total", stage="input")
+    sent_tokens = metrics.get_counter("llm_context_tokens_total", stage="sent")
+    first_token, total, tokens = [], [], 0
+    for query in queries:
+        start = time.perf_counter()
+        documents = retriever.retrieve(query, top_k=top_k)
+        for position, _ in enumerate(llm.stream_response(query, documents, temperature=0.0, max_tokens=512)):
+            if position == 0:
+                first_token.append(time.perf_counter() - start)
+            tokens += 1
+        total.append(time.perf_counter() - start)
+    elapsed = sum(total)
+    requests = max(len(queries), 1)
+    input_tokens = metrics.get_counter("llm_context_tokens_total", stage="input") - input_tokens
+    sent_tokens = metrics.get_counter("llm_context_tokens_total", stage="sent") - sent_tokens
+    return {
+        "requests": len(queries),
+        "tokens_per_s": tokens / elapsed if elapsed else 0.0,
+        "time_to_first_token": latency_summary(first_token),
+        "latency": latency_summary(total),
+        "context_tokens_per_request": input_tokens / requests,
+        "sent_tokens_per_request": sent_tokens / requests,
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """
+    Describe the machine and code version, so that only comparable runs are compared.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=10
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "git_commit": commit,
+    }
+
+
+def run_benchmarks(
+    docs_per_format: int = DOCS_PER_FORMAT,
+    paragraphs_per_doc: int = PARAGRAPHS_PER_DOC,
+    formats: Sequence[str] = CORPUS_FORMATS,
+    num_queries: int = NUM_QUERIES,
+    top_k: int = BENCHMARK_TOP_K,
+    workers: int = 1,
+    chunk_size: int = 1500,
+    chunk_overlap: int = 250,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    model_name: Optional[str] = None,
+    llm_tokens: int = FAKE_LLM_TOKENS,
+    llm_token_delay: float = FAKE_LLM_TOKEN_DELAY,
+    seed: int = BENCHMARK_SEED,
+    work_dir: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Run every benchmark stage on a synthetic corpus, offline and on CPU.
+
+    Args:
+        docs_per_format (int): Synthetic documents per file format.
+        paragraphs_per_doc (int): Paragraphs per document.
+        formats (Sequence[str]): File formats of the corpus.
+        num_queries (int): Queries timed in the retrieval and generation stages.
+        top_k (int): Documents retrieved per query.
+        workers (int): Ingestion worker processes; 1 ingests serially.
+        chunk_size (int): Chunk size, in characters.
+        chunk_overlap (int): Chunk overlap, in characters.
+        batch_size (int): Embedding batch size.
+        model_name (Optional[str]): A locally available sentence-transformers model to benchmark instead of
+            the hashing embedder.
+        llm_tokens (int): Tokens streamed by the fake LLM per answer.
+        llm_token_delay (float): Seconds the fake LLM waits before each token.
+        seed (int): Seed of the corpus and queries.
+        work_dir (Optional[str]): Directory for the corpus and index, a temporary one when None.
+
+    Returns:
+        Dict[str, Any]: The parameters, environment and results of every stage.
+    """
+    parameters = {
+        "docs_per_format": docs_per_format,
+        "paragraphs_per_doc": paragraphs_per_doc,
+        "formats": list(formats),
+        "num_queries": num_queries,
+        "top_k": top_k,
+        "model": model_name or "hashing",
+        "llm_tokens": llm_tokens,
+        "llm_token_delay": llm_token_delay,
+        "seed": seed,
+    }
+    stages: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = work_dir or tmp_dir
+        corpus_dir = os.path.join(work_dir, "corpus")
+
+        start = time.perf_counter()
+        file_paths = generate_corpus(corpus_dir, docs_per_format, paragraphs_per_doc, formats, seed)
+        stages["corpus"] = {
+            "files": len(file_paths),
+            "bytes": sum(os.path.getsize(path) for path in file_paths),
+            "seconds": time.perf_counter() - start,
+        }
+
+        documents, stages["ingestion"] = benchmark_ingestion(file_paths, workers)
+        chunks, stages["chunking"] = benchmark_chunking(documents, chunk_size, chunk_overlap)
+
+        model = None if model_name else HashingEmbedder()
+        generator = EmbeddingGenerator(model_name=model_name or "hashing", cache=None, model=model)
+        embeddings, stages["embedding"] = benchmark_embedding(
+            [chunk.page_content for chunk in chunks], generator, batch_size
+        )
+
+        dimensions = int(embeddings.shape[1]) if len(embeddings) else FAKE_EMBEDDING_DIMENSIONS
+        manager = VectorManager(
+            directory_documents=corpus_dir,
+            dimensions=dimensions,
+            manifest_dir=os.path.join(work_dir, "manifests"),
+            store=LocalVectorStore(dimensions),
+        )
+        stages["indexing"] = benchmark_indexing(chunks, embeddings, manager)
+
+        queries = make_queries(num_queries, seed)
+        stages["retrieval"] = benchmark_retrieval(Retriever(manager, generator), queries, top_k)
+        stages["hybrid_retrieval"] = benchmark_retrieval(Retriever(manager, generator, mode="hybrid"), queries, top_k)
+
+        llm = LLMIntegrationWithLLaMA(client=FakeLLMClient(llm_tokens, llm_token_delay))
+        stages["generation"] = benchmark_generation(llm, Retriever(manager, generator), queries, top_k)
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "environment": environment_info(),
+        "parameters": parameters,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_bytes() / 2**20,
+    }
+
+
+def _flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = float(value)
+    return flat
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+    """
+    Compare the metrics of two runs.
+
+    Args:
+        baseline (Dict[str, Any]): Results of the reference run.
+        current (Dict[str, Any]): Results of the new run.
+
+    Returns:
+        Dict[str, Dict[str, float]]: For every metric of both runs, the baseline and current values and
+        the relative change in percent.
+    """
+    old = _flatten(baseline["stages"])
+    new = _flatten(current["stages"])
+    old["peak_rss_mb"], new["peak_rss_mb"] = baseline["peak_rss_mb"], current["peak_rss_mb"]
+    return {
+        name: {
+            "baseline": old[name],
+            "current": new[name],
+            "change_pct": (new[name] - old[name]) / old[name] * 100 if old[name] else 0.0,
+        }
+        for name in sorted(old.keys() & new.keys())
+    }
+
+
+def save_results(results: Dict[str, Any], output_dir: str = BENCHMARK_OUTPUT_DIR) -> str:
+    """
+    Write the results to a timestamped JSON file and return its path.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the RAG pipeline on a synthetic corpus.")
+    parser.add_argument("--docs-per-format", type=int, default=DOCS_PER_FORMAT)
+    parser.add_argument("--paragraphs-per-doc", type=int, default=PARAGRAPHS_PER_DOC)
+    parser.add_argument("--formats", nargs="+", default=list(CORPUS_FORMATS), choices=list(CORPUS_FORMATS))
+    parser.add_argument("--queries", type=int, default=NUM_QUERIES)
+    parser.add_argument("--top-k", type=int, default=BENCHMARK_TOP_K)
+    parser.add_argument("--workers", type=int, default=1, help="Ingestion worker processes (1 is serial).")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--model", default=None, help="Local sentence-transformers model instead of the fake one.")
+    parser.add_argument("--llm-tokens", type=int, default=FAKE_LLM_TOKENS)
+    parser.add_argument("--llm-token-delay", type=float, default=FAKE_LLM_TOKEN_DELAY)
+    parser.add_argument("--seed", type=int, default=BENCHMARK_SEED)
+    parser.add_argument("--output-dir", default=BENCHMARK_OUTPUT_DIR)
+    parser.add_argument("--compare", default=None, help="JSON results of a previous run to compare against.")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        docs_per_format=args.docs_per_format,
+        paragraphs_per_doc=args.paragraphs_per_doc,
+        formats=args.formats,
+        num_queries=args.queries,
+        top_k=args.top_k,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        model_name=args.model,
+        llm_tokens=args.llm_tokens,
+        llm_token_delay=args.llm_token_delay,
+        seed=args.seed,
+    )
+    path = save_results(results, args.output_dir)
+
+    stages = results["stages"]
+    print(f"Results written to {path}")
+    print(f"Ingestion:  {stages['ingestion']['docs_per_s']:.1f} docs/s")
+    print(f"Chunking:   {stages['chunking']['chunks_per_s']:.1f} chunks/s")
+    print(f"Embedding:  {stages['embedding']['embeddings_per_s']:.1f} embeddings/s")
+    print(f"Indexing:   {stages['indexing']['vectors_per_s']:.1f} vectors/s")
+    latency = stages["retrieval"]["latency"]
+    print(f"Retrieval:  p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms")
+    latency = stages["hybrid_retrieval"]["latency"]
+    print(f"Hybrid:     p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms")
+    latency = stages["generation"]["latency"]
+    print(f"End-to-end: p50 {latency['p50_ms']:.2f} ms, p95 {latency['p95_ms']:.2f} ms, p99 {latency['p99_ms']:.2f} ms")
+    generation = stages["generation"]
+    print(
+        f"Context:    {generation['context_tokens_per_request']:.0f} retrieved tokens, "
+        f"{generation['sent_tokens_per_request']:.0f} sent per request"
+    )
+    print(f"Peak RSS:   {results['peak_rss_mb']:.1f} MB")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        print(f"\nChange against {args.compare}:")
+        for name, comparison in compare_results(baseline, results).items():
+            old, new, change = comparison["baseline"], comparison["current"], comparison["change_pct"]
+            print(f"  {name}: {old:.4g} -> {new:.4g} ({change:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
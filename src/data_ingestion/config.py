@@ -0,0 +1,11 @@
+import os
+
+INGEST_MAX_WORKERS = os.cpu_count() or 1  # Worker processes used by the parallel ingest mode
+INGEST_FILE_TIMEOUT = 120.0  # Seconds a single file may take to load before it is reported as failed
+PDF_PAGE_WORKERS = 1  # Worker processes extracting the pages of one PDF; 1 extracts them in the calling process
+PDF_PARALLEL_MIN_PAGES = 200  # PDFs with fewer pages are always extracted in the calling process
+PDF_PAGES_PER_TASK = 25  # Pages extracted by a worker per task, so results stream back in page order
+PARSE_CACHE_ENABLED = True  # Reuse the parse of files whose content was already loaded
+PARSE_CACHE_DIR = "data/cache/parsed"  # Where parsed documents are stored, one JSON file per content hash
+PARSER_VERSION = 1  # Bump when loaders or preprocessing change, so cached parses are not reused
+MIME_SNIFF_BYTES = 2048  # Bytes read from a file without a known extension to detect its type
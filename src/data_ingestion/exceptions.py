@@ -0,0 +1,10 @@
+class IngestionError(Exception):
+    """Custom exception for document ingestion errors."""
+
+    pass
+
+
+class UnsupportedFileTypeError(IngestionError):
+    """Raised when no loader is registered for a file."""
+
+    pass
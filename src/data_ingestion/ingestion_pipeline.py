@@ -1,22 +1,165 @@
-from typing import List, Dict, Any
+from typing import Callable, List, Dict, Any, Iterable, Iterator, Optional, Tuple
+from dataclasses import dataclass
+import logging
+import multiprocessing
 import os
+import queue
+import time
 from data_ingestion.text_loader import TextDocumentLoader
 from data_ingestion.pdf_loader import PDFDocumentLoader
 from data_ingestion.word_loader import WordDocumentLoader
 from data_ingestion.html_loader import HTMLDocumentLoader
+from data_ingestion.base_loader import BaseDocumentLoader
+from data_ingestion.config import INGEST_MAX_WORKERS, INGEST_FILE_TIMEOUT, PARSE_CACHE_ENABLED
+from data_ingestion.exceptions import UnsupportedFileTypeError
+from data_ingestion.mime import DOCX_MIME, HTML_MIME, PDF_MIME, TEXT_MIME, sniff_mime_type
+from data_ingestion.parse_cache import ParseCache
+from utils.logger import setup_logger
+from utils.hashing import hash_file
+
+# Initialize logger
+ingestion_logger = setup_logger(name="ingestion_logger", log_file="logs/ingestion.log", level=logging.INFO)
+
+# Loader factories by file extension, and the extension standing for each sniffed MIME type
+_LOADER_FACTORIES: Dict[str, Callable[[], BaseDocumentLoader]] = {}
+_MIME_EXTENSIONS: Dict[str, str] = {}
+
+
+def register_loader(
+    extensions: Iterable[str], factory: Callable[[], BaseDocumentLoader], mime_types: Iterable[str] = ()
+) -> None:
+    """
+    Register a loader for new file formats, used by every pipeline created afterwards.
+
+    Args:
+        extensions (Iterable[str]): File extensions handled by the loader, such as ".md".
+        factory (Callable[[], BaseDocumentLoader]): Builds the loader, for example the loader class.
+        mime_types (Iterable[str]): MIME types, as detected by `sniff_mime_type`, of files without
+            a known extension that the loader handles.
+    """
+    extensions = [extension.lower() for extension in extensions]
+    for extension in extensions:
+        _LOADER_FACTORIES[extension] = factory
+    for mime_type in mime_types:
+        _MIME_EXTENSIONS[mime_type] = extensions[0]
+
+
+def supported_extensions() -> List[str]:
+    """
+    Return the file extensions that have a registered loader.
+    """
+    return sorted(_LOADER_FACTORIES)
+
+
+register_loader([".txt"], TextDocumentLoader, [TEXT_MIME])
+register_loader([".pdf"], PDFDocumentLoader, [PDF_MIME])
+register_loader([".docx"], WordDocumentLoader, [DOCX_MIME])
+register_loader([".html", ".htm"], HTMLDocumentLoader, [HTML_MIME])
+
+
+@dataclass
+class IngestionResult:
+    """
+    Outcome of the ingestion of a single file.
+
+    Exactly one of `document` and `error` is set.
+    """
+
+    file_path: str
+    document: Optional[Dict[str, Any]] = None
+    error_type: Optional[str] = None
+    error: Optional[str] = None
+    elapsed: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _load_document(loader: BaseDocumentLoader, file_path: str) -> Dict[str, Any]:
+    """
+    Load a file in a worker process.
+    """
+    return loader.load(file_path)
+
+
+# Default of the `parse_cache` argument, standing for the on-disk cache in PARSE_CACHE_DIR
+DEFAULT_PARSE_CACHE: Any = object()
 
 
 class DataIngestionPipeline:
     """Pipeline to ingest and preprocess documents."""
 
-    def __init__(self):
-        self.loaders = {
-            ".txt": TextDocumentLoader(),
-            ".pdf": PDFDocumentLoader(),
-            ".docx": WordDocumentLoader(),
-            ".html": HTMLDocumentLoader(),
-            ".htm": HTMLDocumentLoader(),
-        }
+    def __init__(self, parse_cache: Optional[ParseCache] = DEFAULT_PARSE_CACHE):
+        """
+        Args:
+            parse_cache (Optional[ParseCache]): Cache of parsed documents used by `load`, `ingest` and
+                `ingest_parallel`, or None to disable it. When omitted, the default on-disk cache is used if
+                PARSE_CACHE_ENABLED is set.
+        """
+        # One loader instance per factory, shared by the extensions it handles
+        instances: Dict[Any, BaseDocumentLoader] = {}
+        self.loaders: Dict[str, BaseDocumentLoader] = {}
+        for extension, factory in _LOADER_FACTORIES.items():
+            if factory not in instances:
+                instances[factory] = factory()
+            self.loaders[extension] = instances[factory]
+        self.mime_extensions: Dict[str, str] = dict(_MIME_EXTENSIONS)
+        if parse_cache is DEFAULT_PARSE_CACHE:
+            parse_cache = ParseCache() if PARSE_CACHE_ENABLED else None
+        self.parse_cache = parse_cache
+
+    def get_loader(self, file_path: str) -> BaseDocumentLoader:
+        """
+        Return the loader registered for a file.
+
+        Files whose extension has no loader, such as uploads saved under a temporary name,
+        are matched by the MIME type sniffed from their content.
+
+        Args:
+            file_path (str): The path of the file to load.
+
+        Returns:
+            BaseDocumentLoader: The loader for the file's extension or content.
+
+        Raises:
+            UnsupportedFileTypeError: If no loader handles the file.
+        """
+        ext = os.path.splitext(file_path)[1].lower()
+        loader = self.loaders.get(ext)
+        if loader is None:
+            loader = self.loaders.get(self.mime_extensions.get(sniff_mime_type(file_path) or "", ""))
+        if loader is None:
+            raise UnsupportedFileTypeError(f"Unsupported file type: {file_path}")
+        return loader
+
+    def load(self, file_path: str, content_hash: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Load a single document, reusing its cached parse when the same content was loaded before.
+
+        Args:
+            file_path (str): The path of the file to load.
+            content_hash (Optional[str]): SHA-256 digest of the file content, when the caller already
+                computed it; otherwise it is computed here if a parse cache is used.
+
+        Returns:
+            Dict[str, Any]: The processed text and metadata.
+
+        Raises:
+            UnsupportedFileTypeError: If no loader handles the file.
+            IOError: If the file cannot be loaded.
+        """
+        loader = self.get_loader(file_path)
+        if self.parse_cache is None:
+            return loader.load(file_path)
+
+        loader_name = type(loader).__name__
+        content_hash = content_hash or hash_file(file_path)
+        document = self.parse_cache.get(content_hash, loader_name, file_path)
+        if document is None:
+            document = loader.load(file_path)
+            self.parse_cache.put(content_hash, loader_name, document)
+        return document
 
     def ingest(self, file_paths: List[str]) -> List[Dict[str, Any]]:
         """
@@ -30,14 +173,136 @@ class DataIngestionPipeline:
         """
         documents = []
         for file_path in file_paths:
-            ext = os.path.splitext(file_path)[1].lower()
-            loader = self.loaders.get(ext)
-            if loader:
-                try:
-                    document = loader.load(file_path)
-                    documents.append(document)
-                except Exception as e:
-                    print(f"Error processing {file_path}: {e}")
-            else:
-                print(f"Unsupported file type: {file_path}")
+            try:
+                documents.append(self.load(file_path))
+            except UnsupportedFileTypeError as e:
+                ingestion_logger.warning("%s", e)
+            except Exception as e:
+                ingestion_logger.error("Error processing %s: %s", file_path, e)
         return documents
+
+    def ingest_parallel(
+        self,
+        file_paths: List[str],
+        max_workers: int = INGEST_MAX_WORKERS,
+        timeout: Optional[float] = INGEST_FILE_TIMEOUT,
+    ) -> Iterator[IngestionResult]:
+        """
+        Ingest documents in a pool of worker processes, yielding results as files complete.
+
+        At most `max_workers` files are loading at any time, so each file's timeout starts
+        when it actually starts loading. When a file exceeds its timeout it is reported as
+        failed, and the pool is restarted because a stuck worker cannot be interrupted; the
+        other files that were loading are resubmitted. Files found in the parse cache are
+        yielded without being submitted, and the documents loaded by the workers are cached.
+
+        Args:
+            file_paths (List[str]): A list of file paths to ingest.
+            max_workers (int): Number of worker processes.
+            timeout (Optional[float]): Seconds a single file may take, or None for no limit.
+
+        Yields:
+            IngestionResult: One result per file, in completion order. Failed files carry
+            the type and message of their error instead of a document.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+
+        todo: List[str] = []
+        # Parse cache key of the files submitted, to store the documents the workers return
+        cache_keys: Dict[str, Tuple[str, str]] = {}
+        parse_cache = self.parse_cache
+        for file_path in file_paths:
+            started = time.monotonic()
+            try:
+                loader = self.get_loader(file_path)
+            except UnsupportedFileTypeError as e:
+                ingestion_logger.warning("%s", e)
+                yield IngestionResult(file_path=file_path, error_type=type(e).__name__, error=str(e))
+                continue
+            if parse_cache is not None:
+                try:
+                    cache_keys[file_path] = (hash_file(file_path), type(loader).__name__)
+                except OSError:
+                    # Unreadable files are submitted anyway, for the worker to report the error
+                    pass
+                else:
+                    document = parse_cache.get(*cache_keys[file_path], file_path)
+                    if document is not None:
+                        yield IngestionResult(
+                            file_path=file_path, document=document, elapsed=time.monotonic() - started
+                        )
+                        continue
+            todo.append(file_path)
+        if not todo:
+            return
+        todo.reverse()
+
+        completed: queue.Queue = queue.Queue()
+        in_flight: Dict[str, float] = {}
+        generation = 0
+
+        def submit(pool: Any, file_path: str) -> None:
+            tag = generation
+            in_flight[file_path] = time.monotonic()
+            pool.apply_async(
+                _load_document,
+                (self.get_loader(file_path), file_path),
+                callback=lambda document: completed.put((tag, file_path, document, None)),
+                error_callback=lambda error: completed.put((tag, file_path, None, error)),
+            )
+
+        pool = multiprocessing.Pool(processes=max_workers)
+        try:
+            while todo or in_flight:
+                while todo and len(in_flight) < max_workers:
+                    submit(pool, todo.pop())
+
+                wait_for = None
+                if timeout is not None:
+                    oldest = min(in_flight.values())
+                    wait_for = max(0.0, oldest + timeout - time.monotonic())
+                try:
+                    tag, file_path, document, error = completed.get(timeout=wait_for)
+                except queue.Empty:
+                    tag = None
+
+                if tag is not None:
+                    # Ignore late results from a pool that was restarted
+                    if tag != generation or file_path not in in_flight:
+                        continue
+                    elapsed = time.monotonic() - in_flight.pop(file_path)
+                    if error is None:
+                        if parse_cache is not None and document is not None and file_path in cache_keys:
+                            parse_cache.put(*cache_keys[file_path], document)
+                        yield IngestionResult(file_path=file_path, document=document, elapsed=elapsed)
+                    else:
+                        ingestion_logger.error("Error processing %s: %s", file_path, error)
+                        yield IngestionResult(
+                            file_path=file_path, error_type=type(error).__name__, error=str(error), elapsed=elapsed
+                        )
+                    continue
+
+                # Some files exceeded their timeout: report them and restart the pool
+                if timeout is None:
+                    continue
+                now = time.monotonic()
+                expired = [path for path, started in in_flight.items() if now - started >= timeout]
+                for file_path in expired:
+                    elapsed = now - in_flight.pop(file_path)
+                    ingestion_logger.error("Timed out processing %s after %.1fs", file_path, elapsed)
+                    yield IngestionResult(
+                        file_path=file_path,
+                        error_type="TimeoutError",
+                        error=f"Loading took longer than {timeout}s",
+                        elapsed=elapsed,
+                    )
+                pool.terminate()
+                pool.join()
+                pool = multiprocessing.Pool(processes=max_workers)
+                generation += 1
+                todo.extend(in_flight)
+                in_flight.clear()
+        finally:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,50 @@
+import mimetypes
+import zipfile
+from typing import Optional
+from data_ingestion.config import MIME_SNIFF_BYTES
+
+PDF_MIME = "application/pdf"
+DOCX_MIME = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+HTML_MIME = "text/html"
+TEXT_MIME = "text/plain"
+
+
+def sniff_mime_type(file_path: str) -> Optional[str]:
+    """
+    Detect the MIME type of a file from its first bytes, falling back on its name.
+
+    Args:
+        file_path (str): The path of the file.
+
+    Returns:
+        Optional[str]: The detected MIME type, or None if the file cannot be read or its type is unknown.
+    """
+    try:
+        with open(file_path, "rb") as file:
+            head = file.read(MIME_SNIFF_BYTES)
+    except OSError:
+        return None
+
+    if b"%PDF-" in head[:1024]:
+        return PDF_MIME
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(file_path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return DOCX_MIME
+        except zipfile.BadZipFile:
+            pass
+        return mimetypes.guess_type(file_path)[0]
+
+    start = head.lstrip().lower()
+    if start.startswith(b"<!doctype html") or start.startswith(b"<html") or b"<html" in start[:512]:
+        return HTML_MIME
+    if b"\x00" not in head:
+        # A multi-byte character may be cut at the end of a full sample
+        sample = head if len(head) < MIME_SNIFF_BYTES else head[:-3]
+        try:
+            sample.decode("utf-8")
+            return TEXT_MIME
+        except UnicodeDecodeError:
+            pass
+    return mimetypes.guess_type(file_path)[0]
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+from data_ingestion.config import PARSE_CACHE_DIR, PARSER_VERSION
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed documents, keyed by the content hash of the source file.
+
+    A file is parsed once per loader and parser version: moving or copying it, or indexing it
+    again after an unrelated change to the corpus, reuses the stored text and metadata.
+    """
+
+    def __init__(self, directory: str = PARSE_CACHE_DIR):
+        """
+        Args:
+            directory (str): Directory holding one JSON file per cached document.
+        """
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, content_hash: str, loader_name: str) -> str:
+        key = hashlib.sha256(f"{PARSER_VERSION}\x00{loader_name}\x00{content_hash}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, content_hash: str, loader_name: str, file_path: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached parse of a file content, or None on a miss.
+
+        Args:
+            content_hash (str): SHA-256 digest of the file content.
+            loader_name (str): Name of the loader that parses the file.
+            file_path (str): The current path of the file, recorded in the returned metadata.
+
+        Returns:
+            Optional[Dict[str, Any]]: The processed text and metadata.
+        """
+        try:
+            with open(self._path(content_hash, loader_name), "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        document["metadata"]["file_path"] = file_path
+        return document
+
+    def put(self, content_hash: str, loader_name: str, document: Dict[str, Any]) -> None:
+        """
+        Store the parse of a file content. Failures to write are ignored, the cache being an optimization.
+        """
+        path = self._path(content_hash, loader_name)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(document, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -1,14 +1,104 @@
-from typing import Any, Dict
+import bisect
+import multiprocessing
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
 from .base_loader import BaseDocumentLoader
+from .config import PDF_PAGE_WORKERS, PDF_PARALLEL_MIN_PAGES, PDF_PAGES_PER_TASK
 from .preprocessor import TextPreprocessor
 import PyPDF2
 
 
+def _extract_page_range(task: Tuple[str, int, int]) -> List[str]:
+    """
+    Extract the raw text of the pages [start, stop) of a PDF in a worker process.
+    """
+    file_path, start, stop = task
+    with open(file_path, "rb") as file:
+        reader = PyPDF2.PdfReader(file)
+        return [reader.pages[index].extract_text() for index in range(start, stop)]
+
+
+def page_range(page_offsets: Sequence[int], start: int, end: int) -> Tuple[int, int]:
+    """
+    Return the pages spanned by a slice of the text of a PDF.
+
+    Args:
+        page_offsets (Sequence[int]): The `page_offsets` metadata of the document.
+        start (int): Offset of the first character of the slice in the document text.
+        end (int): Offset just past the last character of the slice.
+
+    Returns:
+        Tuple[int, int]: The first and last page numbers, starting at 1.
+    """
+    first = max(1, bisect.bisect_right(page_offsets, start))
+    last = max(first, bisect.bisect_right(page_offsets, max(start, end - 1)))
+    return first, last
+
+
 class PDFDocumentLoader(BaseDocumentLoader):
     """Loader for PDF documents."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_workers: int = PDF_PAGE_WORKERS,
+        parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+    ):
+        """
+        Args:
+            max_workers (int): Worker processes extracting the pages of large PDFs. With 1, or inside
+                a daemonic worker such as those of `DataIngestionPipeline.ingest_parallel`, pages are
+                extracted in the calling process.
+            parallel_min_pages (int): Minimum number of pages for a PDF to be split across workers.
+            pages_per_task (int): Pages extracted by a worker per task.
+        """
         self.preprocessor = TextPreprocessor()
+        self.max_workers = max_workers
+        self.parallel_min_pages = parallel_min_pages
+        self.pages_per_task = pages_per_task
+
+    def _raw_pages(self, reader: PyPDF2.PdfReader, file_path: str) -> Iterator[str]:
+        """
+        Yield the raw text of every page in order, from worker processes when the PDF is large enough.
+        """
+        num_pages = len(reader.pages)
+        if self.max_workers <= 1 or num_pages < self.parallel_min_pages or multiprocessing.current_process().daemon:
+            for page in reader.pages:
+                yield page.extract_text()
+            return
+
+        tasks = [
+            (file_path, start, min(start + self.pages_per_task, num_pages))
+            for start in range(0, num_pages, self.pages_per_task)
+        ]
+        with multiprocessing.Pool(processes=min(self.max_workers, len(tasks))) as pool:
+            for texts in pool.imap(_extract_page_range, tasks):
+                yield from texts
+
+    def iter_pages(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        Lazily load and preprocess a PDF document one page at a time.
+
+        Args:
+            file_path (str): The path to the PDF file.
+
+        Yields:
+            Dict[str, Any]: For each page, its processed text and metadata including its `page_number`,
+            starting at 1.
+        """
+        try:
+            with open(file_path, "rb") as file:
+                reader = PyPDF2.PdfReader(file)
+                num_pages = len(reader.pages)
+                for page_number, raw_text in enumerate(self._raw_pages(reader, file_path), start=1):
+                    metadata = {
+                        "file_path": file_path,
+                        "file_type": "pdf",
+                        "page_number": page_number,
+                        "num_pages": num_pages,
+                    }
+                    yield {"text": self.preprocessor.process(raw_text), "metadata": metadata}
+        except Exception as e:
+            raise IOError(f"Error loading PDF file {file_path}: {e}")
 
     def load(self, file_path: str) -> Dict[str, Any]:
         """
@@ -18,20 +108,41 @@ class PDFDocumentLoader(BaseDocumentLoader):
             file_path (str): The path to the PDF file.
 
         Returns:
-            Dict[str, Any]: A dictionary containing the processed text and metadata.
+            Dict[str, Any]: A dictionary containing the processed text and metadata. The metadata
+            `page_offsets` holds the offset in the text where each page starts; see `page_range`.
         """
         try:
+            current_page = 0
+            page_offsets: List[int] = []
+            parts: List[str] = []
+            length = 0
+
             with open(file_path, "rb") as file:
                 reader = PyPDF2.PdfReader(file)
-                raw_text = ""
-                for page in reader.pages:
-                    raw_text += page.extract_text()
-            processed_text = self.preprocessor.process(raw_text)
+                num_pages = len(reader.pages)
+
+                def pages() -> Iterator[str]:
+                    nonlocal current_page
+                    for current_page, raw_text in enumerate(self._raw_pages(reader, file_path), start=1):
+                        yield raw_text
+
+                # Pages are cleaned as they are extracted, without building the raw text of the whole file.
+                # iter_process yields the text of a page before reading the next one, so each part
+                # belongs to `current_page`.
+                for part in self.preprocessor.iter_process(pages()):
+                    while len(page_offsets) < current_page - 1:
+                        page_offsets.append(length)  # Pages without text
+                    page_offsets.append(length + len(part) - len(part.lstrip(" ")))
+                    parts.append(part)
+                    length += len(part)
+            page_offsets.extend([length] * (num_pages - len(page_offsets)))
+
             metadata = {
                 "file_path": file_path,
                 "file_type": "pdf",
-                "num_pages": len(reader.pages),
+                "num_pages": num_pages,
+                "page_offsets": page_offsets,
             }
-            return {"text": processed_text, "metadata": metadata}
+            return {"text": "".join(parts), "metadata": metadata}
         except Exception as e:
             raise IOError(f"Error loading PDF file {file_path}: {e}")
@@ -1,8 +1,25 @@
 import re
+from typing import Iterable, Iterator, List
+
+# Characters kept by the preprocessor besides whitespace, which is normalized to single spaces
+_ALLOWED = "a-zA-Z0-9À-ž.,!?'\"-"
+_SPECIAL_CHARACTERS = re.compile(f"[^\\s{_ALLOWED}]")
+
+# Deletion table of the ASCII fast path: every ASCII character the pattern above removes
+_ASCII_SPECIAL_CHARACTERS = bytes(
+    code for code in range(128) if _SPECIAL_CHARACTERS.match(chr(code)) and not chr(code).isspace()
+)
 
 
 class TextPreprocessor:
-    """Preprocesses text data."""
+    """
+    Preprocesses text data: strips it, collapses whitespace runs into single spaces and removes
+    special characters.
+
+    Whitespace is normalized with str.split/join, which matches the `\\s` regex class exactly, and
+    special characters are removed with a byte translation table for ASCII text or one precompiled
+    pattern otherwise.
+    """
 
     def __init__(self):
         pass
@@ -17,10 +34,47 @@ class TextPreprocessor:
         Returns:
             str: The cleaned and normalized text.
         """
-        text = text.strip()
-        text = re.sub(r"\s+", " ", text)
-        text = self.remove_special_characters(text)
-        return text
+        return self.remove_special_characters(" ".join(text.split()))
+
+    def iter_process(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Clean a text given as successive pieces, such as the pages of a document, without joining them first.
+
+        Concatenating the yielded strings gives exactly `process("".join(pieces))`: whitespace runs that span
+        two pieces are collapsed once, and the whitespace at both ends of the whole text is stripped.
+
+        Args:
+            pieces (Iterable[str]): The raw text, piece by piece.
+
+        Yields:
+            str: The cleaned text, piece by piece. Empty results are skipped.
+        """
+        started = False
+        pending_space = False
+        for piece in pieces:
+            words = piece.split()
+            if not words:
+                pending_space = pending_space or bool(piece)
+                continue
+            separator = " " if started and (pending_space or piece[0].isspace()) else ""
+            cleaned = self.remove_special_characters(separator + " ".join(words))
+            if cleaned:
+                yield cleaned
+            started = True
+            pending_space = piece[-1].isspace()
+
+    def process_batch(self, texts: Iterable[str]) -> List[str]:
+        """
+        Clean many texts.
+
+        Args:
+            texts (Iterable[str]): The raw texts.
+
+        Returns:
+            List[str]: The cleaned texts, in the same order.
+        """
+        remove = self.remove_special_characters
+        return [remove(" ".join(text.split())) for text in texts]
 
     def remove_special_characters(self, text: str) -> str:
         """
@@ -32,6 +86,6 @@ class TextPreprocessor:
         Returns:
             str: The text without special characters.
         """
-        pattern = r'[^a-zA-Z0-9À-ž\s.,!?\'"-]'
-        text = re.sub(pattern, "", text)
-        return text
+        if text.isascii():
+            return text.encode("ascii").translate(None, _ASCII_SPECIAL_CHARACTERS).decode("ascii")
+        return _SPECIAL_CHARACTERS.sub("", text)
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from embeddings.config import EMBEDDING_CACHE_ACCESS_BATCH, EMBEDDING_CACHE_MAX_BYTES, EMBEDDING_CACHE_PATH
+from embeddings.exceptions import EmbeddingError
+
+# Maximum number of bound parameters per SQLite statement
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    Content-addressed, on-disk cache of float32 embeddings backed by SQLite.
+
+    Entries are keyed by a hash of the model name and the text, so identical texts are
+    only ever encoded once per model. When the stored vectors exceed `max_bytes`, the
+    least recently used entries are evicted.
+
+    Lookups only read the database: the access times of the hits are kept in memory and written in
+    the transaction of the next `put_many`, which evicts by them, or once `access_batch` are pending.
+    """
+
+    def __init__(
+        self,
+        path: str = EMBEDDING_CACHE_PATH,
+        max_bytes: int = EMBEDDING_CACHE_MAX_BYTES,
+        access_batch: int = EMBEDDING_CACHE_ACCESS_BATCH,
+    ):
+        """
+        Open or create the cache database.
+
+        Args:
+            path (str): Path of the SQLite database, or ":memory:" for a process-local cache.
+            max_bytes (int): Maximum total size of the stored vectors.
+            access_batch (int): Number of pending access times from which a lookup writes them.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.access_batch = access_batch
+        # Access times of the hits since the last write, by key
+        self._accessed: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        try:
+            if path != ":memory:":
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "key TEXT PRIMARY KEY, model TEXT NOT NULL, dim INTEGER NOT NULL, "
+                "vector BLOB NOT NULL, nbytes INTEGER NOT NULL, last_access REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings (last_access)")
+            self._conn.commit()
+            self.size_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM embeddings").fetchone()[0]
+        except sqlite3.Error as e:
+            raise EmbeddingError(f"Failed to open embedding cache '{path}': {e}")
+
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """
+        Build the cache key of a text for a given model.
+        """
+        return hashlib.sha256(f"{model_name}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """
+        Look up the embeddings of several texts.
+
+        Args:
+            model_name (str): Name of the model that produced the embeddings.
+            texts (Sequence[str]): The texts to look up.
+
+        Returns:
+            List[Optional[np.ndarray]]: The cached embedding of each text, or None on a miss.
+        """
+        keys = [self.make_key(model_name, text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start : start + _SQL_BATCH]
+                rows = self._conn.execute(
+                    f"SELECT key, dim, vector FROM embeddings WHERE key IN ({','.join('?' * len(batch))})", batch
+                ).fetchall()
+                for key, dim, blob in rows:
+                    # Embeddings are stored in the precision they were produced in
+                    dtype = np.float16 if len(blob) == 2 * dim else np.float32
+                    found[key] = np.frombuffer(blob, dtype=dtype)
+            now = time.time()
+            self._accessed.update((key, now) for key in found)
+            if len(self._accessed) >= self.access_batch:
+                self._write_accesses()
+                self._conn.commit()
+
+            results = [found.get(key) for key in keys]
+            hits = sum(result is not None for result in results)
+            self.hits += hits
+            self.misses += len(results) - hits
+            self.bytes_saved += sum(result.nbytes for result in results if result is not None)
+        return results
+
+    def put_many(self, model_name: str, texts: Sequence[str], embeddings: np.ndarray) -> None:
+        """
+        Store the embeddings of several texts, then evict old entries if the cache is full.
+
+        Args:
+            model_name (str): Name of the model that produced the embeddings.
+            texts (Sequence[str]): The embedded texts.
+            embeddings (np.ndarray): One embedding per text. float16 embeddings are stored as float16,
+                any other type as float32.
+        """
+        dtype = np.float16 if embeddings.dtype == np.float16 else np.float32
+        now = time.time()
+        rows = []
+        for text, embedding in zip(texts, embeddings):
+            vector = np.ascontiguousarray(embedding, dtype=dtype)
+            rows.append(
+                (self.make_key(model_name, text), model_name, vector.shape[0], vector.tobytes(), vector.nbytes, now)
+            )
+
+        with self._lock:
+            keys = [row[0] for row in rows]
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start : start + _SQL_BATCH]
+                self.size_bytes -= self._conn.execute(
+                    f"SELECT COALESCE(SUM(nbytes), 0) FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchone()[0]
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._write_accesses()
+            self.size_bytes += sum(row[4] for row in rows)
+            if self.size_bytes > self.max_bytes:
+                self._evict(self.max_bytes * 9 // 10)
+            self._conn.commit()
+
+    def _write_accesses(self) -> None:
+        """
+        Write the pending access times, without committing.
+        """
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _evict(self, target_bytes: int) -> None:
+        """
+        Delete least recently used entries until the stored vectors fit in `target_bytes`.
+        """
+        cursor = self._conn.execute("SELECT key, nbytes FROM embeddings ORDER BY last_access ASC")
+        evicted = []
+        for key, nbytes in cursor:
+            if self.size_bytes <= target_bytes:
+                break
+            evicted.append((key,))
+            self.size_bytes -= nbytes
+        cursor.close()
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", evicted)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Return the cache statistics.
+
+        Returns:
+            Dict[str, float]: Hits, misses, hit rate, bytes of embeddings served from the cache
+            instead of the model, and the current number and size of the stored entries.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "entries": entries,
+                "size_bytes": self.size_bytes,
+            }
+
+    def clear(self) -> None:
+        """
+        Remove every entry and reset the statistics.
+        """
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM embeddings")
+            self._conn.commit()
+            self.size_bytes = 0
+            self.hits = self.misses = self.bytes_saved = 0
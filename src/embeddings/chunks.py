@@ -1,19 +1,38 @@
-from typing import List, Any
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyPDFDirectoryLoader
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline, supported_extensions
+from data_ingestion.pdf_loader import page_range
+from embeddings.token_chunker import TokenChunker
 
 
 class DocumentChunker:
     """
-    A class used to split documents into chunks using RecursiveCharacterTextSplitter.
+    A class used to split documents into chunks using RecursiveCharacterTextSplitter, or a TokenChunker
+    sized to the embedding model when one is given.
+
+    Documents of every supported format are loaded and preprocessed by the DataIngestionPipeline.
     """
 
-    def __init__(self, directory: str, chunk_size: int = 1500, chunk_overlap: int = 250):
+    def __init__(
+        self,
+        directory: str,
+        chunk_size: int = 1500,
+        chunk_overlap: int = 250,
+        pipeline: Optional[DataIngestionPipeline] = None,
+        content_hashes: Optional[Dict[str, str]] = None,
+        token_chunker: Optional[TokenChunker] = None,
+    ):
         """
         Initialize the DocumentChunker with specified chunk size and overlap.
 
         :param chunk_size: The maximum size of each chunk in characters.
         :param chunk_overlap: The number of characters to overlap between chunks.
+        :param pipeline: The ingestion pipeline loading the files, a default one when omitted.
+        :param content_hashes: Content hashes of the files already computed by the caller, so that the
+            parse cache does not read the files twice.
+        :param token_chunker: Splits by tokens instead of characters, ignoring chunk_size and chunk_overlap.
         """
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
@@ -21,25 +40,124 @@ class DocumentChunker:
             chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap
         )
         self.directory = directory
+        self.pipeline = pipeline if pipeline is not None else DataIngestionPipeline()
+        self.content_hashes = content_hashes or {}
+        self.token_chunker = token_chunker
+
+    def read_doc(self, file_paths: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Read documents from the specifique directory, or only the given files.
 
-    def read_doc(self):
+        :param file_paths: Optional list of files to read instead of the whole directory.
+        :return: A list of documents, each with its processed text and metadata.
         """
-        Read documents from the specifique directory.
+        if file_paths is None:
+            file_paths = list_documents(self.directory)
+        return [self.pipeline.load(file_path, self.content_hashes.get(file_path)) for file_path in file_paths]
 
-        :return: A list documents.
+    def split_documents(self, documents: List[Dict[str, Any]]) -> List[Any]:
         """
-        file_loader = PyPDFDirectoryLoader(self.directory)
-        documents = file_loader.load()
-        return documents
+        Split loaded documents into chunks, tokenizing them together with the token chunker.
+
+        Chunks carry the metadata of their document, with its path as `source`, and their offsets in the
+        document text as `start_index` and `end_index`, unless a character chunk cannot be found in the text.
+        Token chunks also carry their `token_count`, and located chunks of paged documents the first and
+        last pages they span, as `page_start` and `page_end`.
+
+        :param documents: Documents loaded by the DataIngestionPipeline.
+        :return: A list of chunked documents, in document order.
+        """
+        texts = [document["text"] for document in documents]
+        pieces: List[List[Tuple[str, Optional[int], Optional[int], Optional[int]]]]
+        if self.token_chunker is not None:
+            pieces = [
+                [(text[start:end], start, end, token_count) for start, end, token_count in spans]
+                for text, spans in zip(texts, self.token_chunker.split_many(texts))
+            ]
+        else:
+            pieces = [self._character_pieces(text) for text in texts]
+
+        chunks = []
+        for document, document_pieces in zip(documents, pieces):
+            metadata = dict(document["metadata"])
+            page_offsets = metadata.pop("page_offsets", None)
+            metadata["source"] = metadata.pop("file_path")
+            for content, start, end, token_count in document_pieces:
+                chunk_metadata = dict(metadata)
+                if start is not None and end is not None:
+                    chunk_metadata["start_index"], chunk_metadata["end_index"] = start, end
+                    if page_offsets:
+                        chunk_metadata["page_start"], chunk_metadata["page_end"] = page_range(page_offsets, start, end)
+                if token_count is not None:
+                    chunk_metadata["token_count"] = token_count
+                chunks.append(Document(page_content=content, metadata=chunk_metadata))
+        return chunks
 
-    def chunk_data(self) -> List[Any]:
+    def _character_pieces(self, text: str) -> List[Tuple[str, Optional[int], Optional[int], Optional[int]]]:
+        """
+        Split the text with the character text splitter and locate its chunks in the text.
+
+        :param text: The document text.
+        :return: The (chunk, start, end, None) of each chunk, with None offsets for a chunk not found.
+        """
+        pieces: List[Tuple[str, Optional[int], Optional[int], Optional[int]]] = []
+        position = 0
+        for piece in self.text_splitter.split_text(text):
+            # The splitter strips chunks, so a chunk may start where the previous one did
+            start = text.find(piece, position)
+            if start < 0:
+                # The splitter rejoined the chunk with other whitespace than the text has
+                pieces.append((piece, None, None, None))
+                continue
+            pieces.append((piece, start, start + len(piece), None))
+            position = start
+        return pieces
+
+    def split_document(self, document: Dict[str, Any]) -> List[Any]:
+        """
+        Split a loaded document into chunks, see `split_documents`.
+
+        :param document: A document loaded by the DataIngestionPipeline.
+        :return: A list of chunked documents.
+        """
+        return self.split_documents([document])
+
+    def chunk_data(self, file_paths: Optional[List[str]] = None) -> List[Any]:
         """
         Splits the given documents into chunks.
 
+        :param file_paths: Optional list of files to chunk instead of the whole directory.
         :return: A list of chunked documents.
         """
-        split_docs = self.text_splitter.split_documents(self.read_doc())
-        return split_docs
+        return self.split_documents(self.read_doc(file_paths))
+
+    def iter_chunks(self, file_paths: List[str]) -> Iterator[Any]:
+        """
+        Lazily chunk the given files, one file at a time, without loading a whole corpus in memory.
+
+        :param file_paths: The files to chunk.
+        :return: An iterator over chunked documents, in file order.
+        """
+        for file_path in file_paths:
+            document = self.pipeline.load(file_path, self.content_hashes.get(file_path))
+            yield from self.split_document(document)
+
+
+def list_documents(directory: str) -> List[str]:
+    """
+    List the visible files of a directory that a registered loader handles by extension.
+
+    :param directory: The directory containing documents.
+    :return: The sorted paths of the files.
+    """
+    root = Path(directory)
+    extensions = set(supported_extensions())
+    file_paths = []
+    for path in root.glob("**/[!.]*"):
+        hidden = any(part.startswith(".") for part in path.relative_to(root).parts)
+        if path.suffix.lower() in extensions and path.is_file() and not hidden:
+            file_paths.append(str(path))
+    return sorted(file_paths)
 
 
 # Usage example:
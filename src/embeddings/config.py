@@ -1,3 +1,25 @@
+import os
+
 DEFAULT_MODEL_NAME = "all-mpnet-base-v2"
 DEFAULT_DIMENSIONS_EMBD = 768
 DEFAULT_BATCH_SIZE = 32
+EMBEDDING_CACHE_ENABLED = True  # Reuse embeddings of texts that were already encoded
+EMBEDDING_CACHE_PATH = "data/cache/embeddings.sqlite"
+EMBEDDING_CACHE_MAX_BYTES = 512 * 1024 * 1024  # Least recently used embeddings are evicted beyond this size
+EMBEDDING_CACHE_ACCESS_BATCH = 1024  # Cache hits whose access time is written in one transaction
+EMBEDDING_PRECISION = os.getenv("EMBEDDING_PRECISION", "float32")  # "float32" or "float16" generated embeddings
+CHUNK_STRATEGY = os.getenv("CHUNK_STRATEGY", "token")  # "token" chunks by model tokens, "recursive" by characters
+CHUNK_SIZE = 1000  # Characters per chunk of the "recursive" strategy
+CHUNK_OVERLAP = 200  # Characters shared by consecutive chunks of the "recursive" strategy
+CHUNK_MAX_TOKENS = 0  # Tokens per chunk of the "token" strategy, 0 to fill the model's max_seq_length
+CHUNK_OVERLAP_TOKENS = 48  # Tokens shared by consecutive chunks of the "token" strategy
+CHUNK_MAX_SEQ_LENGTH = 384  # Input window assumed for models that do not report their max_seq_length
+DEDUP_ENABLED = True  # Skip chunks that duplicate, exactly or nearly, a chunk already indexed
+DEDUP_THRESHOLD = 0.85  # Estimated Jaccard similarity of word shingles above which chunks are near-duplicates
+DEDUP_NUM_PERM = 64  # MinHash permutations per signature
+DEDUP_BANDS = 16  # LSH bands; each band hashes DEDUP_NUM_PERM / DEDUP_BANDS signature rows
+DEDUP_SHINGLE_SIZE = 3  # Words per shingle
+DEDUP_MAX_CANDIDATES = 64  # Candidates compared per chunk, bounding the cost of very common boilerplate
+DIM_REDUCTION = os.getenv("DIM_REDUCTION", "none")  # "none", "pca" fitted on the corpus, or "truncate" (Matryoshka)
+REDUCED_DIMENSIONS = int(os.getenv("REDUCED_DIMENSIONS", "256"))  # Dimensions kept by the "pca" and "truncate" methods
+PCA_FIT_SAMPLE_SIZE = 10000  # First chunks of the first indexing whose embeddings fit the PCA projection
@@ -0,0 +1,261 @@
+import hashlib
+import os
+import re
+import zlib
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from embeddings.config import (
+    DEDUP_BANDS,
+    DEDUP_MAX_CANDIDATES,
+    DEDUP_NUM_PERM,
+    DEDUP_SHINGLE_SIZE,
+    DEDUP_THRESHOLD,
+)
+from embeddings.exceptions import EmbeddingError
+
+_WORD = re.compile(r"\w+")
+# Modulus of the MinHash permutations, a Mersenne prime larger than every 32-bit shingle hash
+_PRIME = np.uint64((1 << 61) - 1)
+_MASK = np.uint64(0xFFFFFFFF)
+
+
+@dataclass
+class DuplicateMatch:
+    """
+    A chunk found to duplicate an indexed chunk.
+    """
+
+    key: str
+    duplicate_of: str
+    kind: str  # "exact" or "near"
+    similarity: float
+
+
+@dataclass
+class DedupReport:
+    """
+    Chunks checked by a ChunkDeduplicator and the duplicates it found.
+    """
+
+    checked: int = 0
+    exact: int = 0
+    near: int = 0
+    skipped: List[DuplicateMatch] = field(default_factory=list)
+
+    def record(self, match: Optional[DuplicateMatch]) -> None:
+        self.checked += 1
+        if match is not None:
+            self.skipped.append(match)
+            if match.kind == "exact":
+                self.exact += 1
+            else:
+                self.near += 1
+
+
+class MinHasher:
+    """
+    MinHash signatures of the word shingles of texts.
+
+    Shingle hashes are CRC32s of the lowercased words, combined per shingle, so signatures are
+    identical across processes and can be persisted.
+    """
+
+    def __init__(self, num_perm: int = DEDUP_NUM_PERM, shingle_size: int = DEDUP_SHINGLE_SIZE, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # Permutations (a * hash + b) mod p, computed with wrapping 64-bit arithmetic like datasketch
+        self.a = rng.integers(1, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), size=(num_perm, 1), dtype=np.uint64)
+
+    def shingles(self, text: str) -> np.ndarray:
+        """
+        Hash the overlapping `shingle_size`-word shingles of a text; shorter texts are one shingle.
+        """
+        words = np.array([zlib.crc32(word.encode("utf-8")) for word in _WORD.findall(text.lower())], dtype=np.uint64)
+        if len(words) == 0:
+            return np.zeros(1, dtype=np.uint64)
+        size = min(self.shingle_size, len(words))
+        hashes = np.zeros(len(words) - size + 1, dtype=np.uint64)
+        for offset in range(size):
+            hashes = (hashes * np.uint64(1000003) + words[offset : len(words) - size + 1 + offset]) & _MASK
+        return np.unique(hashes)
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Return the MinHash signature of a text, `num_perm` 32-bit values.
+        """
+        permuted = (self.a * self.shingles(text)[None, :] + self.b) % _PRIME
+        return (permuted.min(axis=1) & _MASK).astype(np.uint32)
+
+
+class ChunkDeduplicator:
+    """
+    Index of chunk fingerprints that finds exact duplicates by content hash and near-duplicates
+    with MinHash and locality-sensitive hashing.
+
+    Signatures are split into bands, and chunks sharing a band are candidates, whose estimated
+    similarity is then checked against the threshold. Checking a chunk costs a bounded number of
+    operations, so deduplicating a corpus is linear in its size.
+    """
+
+    def __init__(
+        self,
+        threshold: float = DEDUP_THRESHOLD,
+        num_perm: int = DEDUP_NUM_PERM,
+        bands: int = DEDUP_BANDS,
+        shingle_size: int = DEDUP_SHINGLE_SIZE,
+        max_candidates: int = DEDUP_MAX_CANDIDATES,
+    ):
+        """
+        Args:
+            threshold (float): Estimated Jaccard similarity above which chunks are near-duplicates.
+            num_perm (int): MinHash permutations per signature.
+            bands (int): LSH bands; must divide `num_perm`.
+            shingle_size (int): Words per shingle.
+            max_candidates (int): Candidates compared per chunk.
+
+        Raises:
+            ValueError: If `bands` does not divide `num_perm`.
+        """
+        if num_perm % bands:
+            raise ValueError("bands must divide num_perm.")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_candidates = max_candidates
+        self.hasher = MinHasher(num_perm, shingle_size)
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.exact_hashes: Dict[str, str] = {}
+        self._by_exact_hash: Dict[str, str] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    @staticmethod
+    def exact_hash(text: str) -> str:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows : (band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key: str, text: str, signature: Optional[np.ndarray] = None) -> None:
+        """
+        Index a chunk under a key, such as its vector ID.
+        """
+        if key in self.signatures:
+            return
+        signature = self.hasher.signature(text) if signature is None else signature
+        exact_hash = self.exact_hash(text)
+        self.signatures[key] = signature
+        self.exact_hashes[key] = exact_hash
+        self._by_exact_hash.setdefault(exact_hash, key)
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, []).append(key)
+
+    def find(self, text: str) -> Tuple[Optional[str], str, float, np.ndarray]:
+        """
+        Find an indexed chunk that the text duplicates.
+
+        Returns:
+            Tuple[Optional[str], str, float, np.ndarray]: The key of the duplicated chunk or None,
+            "exact" or "near", the estimated similarity, and the signature of the text.
+        """
+        signature = self.hasher.signature(text)
+        exact_match = self._by_exact_hash.get(self.exact_hash(text))
+        if exact_match is not None:
+            return exact_match, "exact", 1.0, signature
+
+        seen = set()
+        best_key, best_similarity = None, 0.0
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            for candidate in buckets.get(band_key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                similarity = float(np.mean(self.signatures[candidate] == signature))
+                if similarity > best_similarity:
+                    best_key, best_similarity = candidate, similarity
+                if len(seen) >= self.max_candidates:
+                    break
+            if len(seen) >= self.max_candidates:
+                break
+        if best_key is not None and best_similarity >= self.threshold:
+            return best_key, "near", best_similarity, signature
+        return None, "", best_similarity, signature
+
+    def check(self, key: str, text: str) -> Optional[DuplicateMatch]:
+        """
+        Return the match of a chunk that duplicates an indexed chunk, or index it and return None.
+        """
+        duplicate_of, kind, similarity, signature = self.find(text)
+        if duplicate_of is not None and duplicate_of != key:
+            return DuplicateMatch(key=key, duplicate_of=duplicate_of, kind=kind, similarity=similarity)
+        self.add(key, text, signature)
+        return None
+
+    def remove(self, keys: Iterable[str]) -> None:
+        """
+        Forget chunks, for example when their vectors are deleted.
+        """
+        for key in keys:
+            signature = self.signatures.pop(key, None)
+            if signature is None:
+                continue
+            exact_hash = self.exact_hashes.pop(key)
+            if self._by_exact_hash.get(exact_hash) == key:
+                del self._by_exact_hash[exact_hash]
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                bucket = buckets.get(band_key, [])
+                if key in bucket:
+                    bucket.remove(key)
+                if not bucket:
+                    buckets.pop(band_key, None)
+
+    def clear(self) -> None:
+        self.signatures.clear()
+        self.exact_hashes.clear()
+        self._by_exact_hash.clear()
+        self._buckets = [{} for _ in range(self.bands)]
+
+    def save(self, path: str) -> None:
+        """
+        Atomically write the fingerprints to a .npz file.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        keys = list(self.signatures)
+        signatures = np.stack([self.signatures[key] for key in keys]) if keys else np.zeros((0, self.hasher.num_perm))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(
+            tmp_path,
+            keys=np.array(keys, dtype=str),
+            exact_hashes=np.array([self.exact_hashes[key] for key in keys], dtype=str),
+            signatures=signatures.astype(np.uint32),
+        )
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """
+        Replace the index with the fingerprints saved in a .npz file. A missing file yields an empty index.
+
+        Raises:
+            EmbeddingError: If the file cannot be read or was written with other MinHash parameters.
+        """
+        self.clear()
+        if not os.path.isfile(path):
+            return
+        try:
+            with np.load(path) as data:
+                keys, exact_hashes, signatures = data["keys"], data["exact_hashes"], data["signatures"]
+        except Exception as e:
+            raise EmbeddingError(f"Failed to load deduplication index '{path}': {e}")
+        if len(keys) and signatures.shape[1] != self.hasher.num_perm:
+            raise EmbeddingError(f"Deduplication index '{path}' has {signatures.shape[1]} permutations per signature")
+        for key, exact_hash, signature in zip(keys.tolist(), exact_hashes.tolist(), signatures):
+            self.signatures[key] = signature
+            self.exact_hashes[key] = exact_hash
+            self._by_exact_hash.setdefault(exact_hash, key)
+            for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+                buckets.setdefault(band_key, []).append(key)
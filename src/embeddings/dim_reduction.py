@@ -0,0 +1,144 @@
+import os
+from typing import Optional, Union
+import numpy as np
+from embeddings.exceptions import EmbeddingError
+
+REDUCTION_METHODS = ("none", "pca", "truncate")
+
+
+class TruncationProjection:
+    """
+    Keep the first dimensions of the embeddings.
+
+    Only meaningful for models trained with a Matryoshka loss, whose leading dimensions carry most
+    of the information. Needs no fitting.
+    """
+
+    fitted = True
+
+    def __init__(self, input_dimensions: int, output_dimensions: int):
+        self.input_dimensions = input_dimensions
+        self.output_dimensions = output_dimensions
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        return np.ascontiguousarray(np.atleast_2d(vectors)[:, : self.output_dimensions], dtype=np.float32)
+
+
+class PCAProjection:
+    """
+    Project the embeddings on the principal components of a sample of the corpus.
+
+    The components are the leading eigenvectors of the uncentered second-moment matrix of the sample,
+    which best preserve dot products and therefore cosine rankings; centering would change the angles
+    between embeddings that all share a common direction. A sample smaller than the output
+    dimensionality still yields a full orthonormal basis.
+    """
+
+    def __init__(self, input_dimensions: int, output_dimensions: int):
+        self.input_dimensions = input_dimensions
+        self.output_dimensions = output_dimensions
+        self.components: Optional[np.ndarray] = None
+        # Fraction of the squared norm of the sample kept by the components
+        self.retained_energy = 0.0
+
+    @property
+    def fitted(self) -> bool:
+        return self.components is not None
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """
+        Compute the principal components of sample embeddings.
+
+        Args:
+            vectors (np.ndarray): The sample embeddings, one per row.
+
+        Raises:
+            EmbeddingError: If the sample is empty or has the wrong dimensionality.
+        """
+        vectors = np.asarray(vectors, dtype=np.float64)
+        if vectors.ndim != 2 or vectors.shape[0] == 0 or vectors.shape[1] != self.input_dimensions:
+            raise EmbeddingError(f"Cannot fit PCA on a sample of shape {vectors.shape}.")
+        eigenvalues, eigenvectors = np.linalg.eigh(vectors.T @ vectors)
+        order = np.argsort(eigenvalues)[::-1][: self.output_dimensions]
+        self.components = np.ascontiguousarray(eigenvectors[:, order].T, dtype=np.float32)
+        total = eigenvalues.clip(min=0).sum()
+        self.retained_energy = float(eigenvalues[order].clip(min=0).sum() / total) if total > 0 else 1.0
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Project embeddings on the components.
+
+        Raises:
+            EmbeddingError: If the projection is not fitted yet.
+        """
+        if self.components is None:
+            raise EmbeddingError("The PCA projection is not fitted yet.")
+        return np.atleast_2d(np.asarray(vectors, dtype=np.float32)) @ self.components.T
+
+    def save(self, path: str) -> None:
+        """
+        Atomically write the fitted projection to a .npz file.
+
+        Raises:
+            EmbeddingError: If the projection is not fitted yet.
+        """
+        if self.components is None:
+            raise EmbeddingError("The PCA projection is not fitted yet.")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, components=self.components, retained_energy=self.retained_energy)
+        os.replace(tmp_path, path)
+
+    def load(self, path: str) -> bool:
+        """
+        Load a projection saved by `save`.
+
+        Returns:
+            bool: Whether a projection was found.
+
+        Raises:
+            EmbeddingError: If the file cannot be read or holds a projection of other dimensions.
+        """
+        if not os.path.isfile(path):
+            return False
+        try:
+            with np.load(path) as data:
+                components, retained_energy = data["components"], float(data["retained_energy"])
+        except Exception as e:
+            raise EmbeddingError(f"Failed to load PCA projection '{path}': {e}")
+        if components.shape != (self.output_dimensions, self.input_dimensions):
+            raise EmbeddingError(
+                f"PCA projection '{path}' maps {components.shape[1]} to {components.shape[0]} dimensions, "
+                f"not {self.input_dimensions} to {self.output_dimensions}."
+            )
+        self.components, self.retained_energy = components, retained_energy
+        return True
+
+
+def create_projection(
+    method: str, input_dimensions: int, output_dimensions: int
+) -> Optional[Union[PCAProjection, TruncationProjection]]:
+    """
+    Build the dimensionality reduction of the embeddings.
+
+    Args:
+        method (str): "none", "pca" or "truncate".
+        input_dimensions (int): Dimensionality of the model embeddings.
+        output_dimensions (int): Dimensionality of the stored vectors.
+
+    Returns:
+        Optional[Union[PCAProjection, TruncationProjection]]: The projection, or None when the
+        embeddings are stored unchanged.
+
+    Raises:
+        EmbeddingError: If the method is unknown or the output dimensionality is out of range.
+    """
+    if method not in REDUCTION_METHODS:
+        raise EmbeddingError(f"Unknown reduction method '{method}', expected one of {', '.join(REDUCTION_METHODS)}.")
+    if method == "none" or output_dimensions == input_dimensions:
+        return None
+    if not 0 < output_dimensions < input_dimensions:
+        raise EmbeddingError(f"Cannot reduce {input_dimensions} dimensions to {output_dimensions}.")
+    if method == "pca":
+        return PCAProjection(input_dimensions, output_dimensions)
+    return TruncationProjection(input_dimensions, output_dimensions)
@@ -1,40 +1,89 @@
-from typing import List
+from typing import Any, Dict, List, Optional
 from sentence_transformers import SentenceTransformer
 import numpy as np
-from embeddings.config import DEFAULT_MODEL_NAME, DEFAULT_BATCH_SIZE
+from embeddings.cache import EmbeddingCache
+from embeddings.config import DEFAULT_MODEL_NAME, DEFAULT_BATCH_SIZE, EMBEDDING_CACHE_ENABLED, EMBEDDING_PRECISION
 from embeddings.exceptions import EmbeddingError
 
 
+# Default of the `cache` argument, standing for the on-disk cache at EMBEDDING_CACHE_PATH
+DEFAULT_CACHE: Any = object()
+
+
 class EmbeddingGenerator:
     """
     Class for generating embeddings from text using Sentence Transformers.
     """
 
-    def __init__(self, model_name: str = DEFAULT_MODEL_NAME):
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL_NAME,
+        cache: Optional[EmbeddingCache] = DEFAULT_CACHE,
+        model: Optional[Any] = None,
+        precision: str = EMBEDDING_PRECISION,
+    ):
         """
         Initialize the embedding generator with a specified model.
 
         Args:
             model_name (str): Name of the Sentence Transformers model to load.
+            cache (Optional[EmbeddingCache]): Cache of previously computed embeddings, or None to disable
+                caching. When omitted, the default on-disk cache is used if EMBEDDING_CACHE_ENABLED is set.
+            model (Optional[Any]): An already loaded model with the SentenceTransformer `encode` method,
+                used instead of loading `model_name`. `model_name` still keys the cache.
+            precision (str): "float32", or "float16" to return and cache embeddings at half the size.
+                The int8 and binary precisions need a calibration shared by the whole index and are
+                applied by the vector store instead.
         """
-        try:
-            self.model = SentenceTransformer(model_name)
-        except Exception as e:
-            raise EmbeddingError(f"Failed to load model '{model_name}': {e}")
+        if precision not in ("float32", "float16"):
+            raise EmbeddingError(f"Unsupported embedding precision '{precision}', expected 'float32' or 'float16'.")
+        self.model_name = model_name
+        self.dtype = np.dtype(precision)
+        if model is not None:
+            self.model = model
+        else:
+            try:
+                self.model = SentenceTransformer(model_name)
+            except Exception as e:
+                raise EmbeddingError(f"Failed to load model '{model_name}': {e}")
+        if cache is DEFAULT_CACHE:
+            cache = EmbeddingCache() if EMBEDDING_CACHE_ENABLED else None
+        self.cache = cache
 
     def generate_embeddings(self, texts: List[str], batch_size: int = DEFAULT_BATCH_SIZE) -> np.ndarray:
         """
         Generate embeddings for a list of texts.
 
+        Embeddings found in the cache are reused, and only the missing texts are sent to the model.
+
         Args:
             texts (List[str]): List of texts to process.
             batch_size (int): Batch size for processing.
 
         Returns:
-            np.ndarray: Array of embeddings.
+            np.ndarray: Array of embeddings, in the precision of the generator.
         """
         if not texts:
             raise ValueError("Input text list is empty. Provide at least one text.")
 
-        embeddings = self.model.encode(texts, batch_size=batch_size, show_progress_bar=True, convert_to_numpy=True)
-        return embeddings
+        if self.cache is None:
+            return self._encode(texts, batch_size)
+
+        cached = self.cache.get_many(self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, embedding in zip(texts, cached) if embedding is None))
+        computed: Dict[str, np.ndarray] = {}
+        if missing:
+            encoded = self._encode(missing, batch_size)
+            self.cache.put_many(self.model_name, missing, encoded)
+            computed = dict(zip(missing, encoded))
+        embeddings = [computed[text] if embedding is None else embedding for text, embedding in zip(texts, cached)]
+        return np.stack(embeddings).astype(self.dtype, copy=False)
+
+    def _encode(self, texts: List[str], batch_size: int) -> np.ndarray:
+        """
+        Encode texts with the model.
+        """
+        embeddings = self.model.encode(
+            texts, batch_size=batch_size, show_progress_bar=len(texts) > batch_size, convert_to_numpy=True
+        )
+        return np.asarray(embeddings).astype(self.dtype, copy=False)
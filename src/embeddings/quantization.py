@@ -0,0 +1,201 @@
+from typing import Optional
+import numpy as np
+
+PRECISIONS = ("float32", "float16", "int8", "binary")
+
+# Rows converted to float32 at once when scoring reduced-precision vectors, small enough to stay in cache
+_SCORE_BLOCK = 1024
+
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+
+class ScalarQuantizer:
+    """
+    Scalar int8 quantization with one scale per dimension.
+
+    Every dimension is mapped linearly from its observed [min, max] range onto the codes -127..127,
+    so a 768-dim vector takes 768 bytes instead of 3072. Dot products with a float query are computed
+    directly on the codes: `x . q ~= codes . (scale * q) + center . q`.
+    """
+
+    def __init__(self, center: np.ndarray, scale: np.ndarray):
+        """
+        Args:
+            center (np.ndarray): Middle of the range of each dimension.
+            scale (np.ndarray): Width of one code step in each dimension.
+        """
+        self.center = np.asarray(center, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def fit(cls, vectors: np.ndarray, margin: float = 0.0) -> "ScalarQuantizer":
+        """
+        Calibrate the quantizer on sample vectors.
+
+        Args:
+            vectors (np.ndarray): The sample vectors, one per row.
+            margin (float): Fraction of each range added on both sides, so that later vectors slightly
+                outside the sample range are not clipped.
+
+        Returns:
+            ScalarQuantizer: The calibrated quantizer.
+        """
+        low, high = vectors.min(axis=0), vectors.max(axis=0)
+        return cls.from_range(low, high, margin)
+
+    @classmethod
+    def from_range(cls, low: np.ndarray, high: np.ndarray, margin: float = 0.0) -> "ScalarQuantizer":
+        width = (high - low) * (1.0 + 2.0 * margin)
+        scale = np.maximum(width / 254.0, 1e-8)
+        return cls((low + high) / 2.0, scale)
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.center - 127.0 * self.scale
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.center + 127.0 * self.scale
+
+    def covers(self, vectors: np.ndarray) -> bool:
+        """
+        Whether every component of the vectors is encoded within half a step, i.e. is not clipped.
+        """
+        half_step = self.scale / 2
+        return bool(np.all(vectors >= self.low - half_step) and np.all(vectors <= self.high + half_step))
+
+    def extended(self, vectors: np.ndarray, margin: float = 0.0) -> "ScalarQuantizer":
+        """
+        Return a quantizer whose ranges also cover the given vectors, with `margin` applied to theirs only.
+        """
+        fitted = ScalarQuantizer.fit(vectors, margin)
+        return ScalarQuantizer.from_range(np.minimum(self.low, fitted.low), np.maximum(self.high, fitted.high))
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        codes = np.rint((vectors - self.center) / self.scale)
+        return np.clip(codes, -127, 127).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * self.scale + self.center
+
+    def scores(self, codes: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """
+        Approximate dot products of the encoded vectors with a float query.
+        """
+        weights = (self.scale * query).astype(np.float32)
+        offset = np.float32(self.center @ query)
+        scores = np.empty(codes.shape[0], dtype=np.float32)
+        for start in range(0, codes.shape[0], _SCORE_BLOCK):
+            block = codes[start : start + _SCORE_BLOCK]
+            scores[start : start + block.shape[0]] = block.astype(np.float32) @ weights + offset
+        return scores
+
+    def to_array(self) -> np.ndarray:
+        return np.stack([self.center, self.scale])
+
+    @classmethod
+    def from_array(cls, array: np.ndarray) -> "ScalarQuantizer":
+        return cls(array[0], array[1])
+
+
+def binary_width(dimensions: int) -> int:
+    """
+    Bytes of the binary code of a vector: one bit per dimension, padded to whole 64-bit words.
+    """
+    return 8 * ((dimensions + 63) // 64)
+
+
+def pack_binary(vectors: np.ndarray) -> np.ndarray:
+    """
+    Encode vectors as their sign bits, packed into bytes and padded to whole 64-bit words.
+
+    Args:
+        vectors (np.ndarray): The vectors, one per row.
+
+    Returns:
+        np.ndarray: A uint8 matrix with `binary_width(dimensions)` bytes per vector.
+    """
+    vectors = np.atleast_2d(vectors)
+    packed = np.packbits(vectors > 0, axis=1)
+    width = binary_width(vectors.shape[1])
+    if packed.shape[1] == width:
+        return packed
+    padded = np.zeros((packed.shape[0], width), dtype=np.uint8)
+    padded[:, : packed.shape[1]] = packed
+    return padded
+
+
+def _popcount64(words: np.ndarray) -> np.ndarray:
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    # Bit-parallel popcount for NumPy versions without bitwise_count
+    words = words - ((words >> np.uint64(1)) & _M1)
+    words = (words & _M2) + ((words >> np.uint64(2)) & _M2)
+    words = (words + (words >> np.uint64(4))) & _M4
+    return (words * _H01) >> np.uint64(56)
+
+
+def hamming_distances(codes: np.ndarray, query_code: np.ndarray) -> np.ndarray:
+    """
+    Hamming distances between binary codes and the binary code of a query.
+
+    Args:
+        codes (np.ndarray): Codes from `pack_binary`, one per row.
+        query_code (np.ndarray): The code of the query, from `pack_binary`.
+
+    Returns:
+        np.ndarray: The number of differing bits of each row, as int32.
+    """
+    words = np.ascontiguousarray(codes).view(np.uint64)
+    query_words = np.ascontiguousarray(query_code).reshape(-1).view(np.uint64)
+    distances = np.empty(codes.shape[0], dtype=np.int32)
+    for start in range(0, codes.shape[0], _SCORE_BLOCK):
+        block = words[start : start + _SCORE_BLOCK]
+        distances[start : start + block.shape[0]] = _popcount64(block ^ query_words).sum(axis=1)
+    return distances
+
+
+def float_scores(vectors: np.ndarray, query: np.ndarray) -> np.ndarray:
+    """
+    Dot products of float16 or float32 vectors with a float32 query, converting float16 rows block by block.
+    """
+    if vectors.dtype == np.float32:
+        return vectors @ query
+    scores = np.empty(vectors.shape[0], dtype=np.float32)
+    for start in range(0, vectors.shape[0], _SCORE_BLOCK):
+        block = vectors[start : start + _SCORE_BLOCK]
+        scores[start : start + block.shape[0]] = block.astype(np.float32) @ query
+    return scores
+
+
+def quantize_embeddings(
+    embeddings: np.ndarray, precision: str, quantizer: Optional[ScalarQuantizer] = None
+) -> np.ndarray:
+    """
+    Convert float embeddings to a reduced precision.
+
+    Args:
+        embeddings (np.ndarray): The embeddings, one per row.
+        precision (str): One of PRECISIONS.
+        quantizer (Optional[ScalarQuantizer]): Calibration of the "int8" precision. When omitted, it is fitted
+            on the embeddings themselves.
+
+    Returns:
+        np.ndarray: float32 or float16 embeddings, int8 codes, or packed binary codes.
+
+    Raises:
+        ValueError: If the precision is unknown.
+    """
+    if precision == "float32":
+        return np.asarray(embeddings, dtype=np.float32)
+    if precision == "float16":
+        return np.asarray(embeddings, dtype=np.float16)
+    if precision == "int8":
+        quantizer = quantizer or ScalarQuantizer.fit(embeddings)
+        return quantizer.encode(embeddings)
+    if precision == "binary":
+        return pack_binary(embeddings)
+    raise ValueError(f"Unknown precision '{precision}', expected one of {', '.join(PRECISIONS)}.")
@@ -0,0 +1,161 @@
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+import numpy as np
+from embeddings.config import CHUNK_MAX_SEQ_LENGTH, CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# End of a sentence: terminal punctuation, closing quotes or brackets, then whitespace
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+")
+# Tokens of the regex tokenizer: words and single punctuation marks
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+
+# Character offsets of a chunk in its text, and its number of tokens
+ChunkSpan = Tuple[int, int, int]
+
+
+class RegexTokenizer:
+    """
+    Word and punctuation tokenizer, used when the embedding model has no fast tokenizer.
+
+    Subword tokenizers split rare words further, so its counts are a lower bound of the model's.
+    """
+
+    num_special_tokens = 0
+
+    def offsets(self, texts: Sequence[str]) -> List[np.ndarray]:
+        return [
+            np.array([match.span() for match in _TOKEN.finditer(text)], dtype=np.int64).reshape(-1, 2) for text in texts
+        ]
+
+
+class HFTokenizer:
+    """
+    Adapter of a Hugging Face fast tokenizer, which encodes a whole batch of texts natively.
+
+    It runs on its own copy of the Rust tokenizer, without truncation or padding, since the model's
+    tokenizer keeps the truncation settings of its last call.
+    """
+
+    def __init__(self, tokenizer: Any):
+        from tokenizers import Tokenizer
+
+        self.num_special_tokens = tokenizer.num_special_tokens_to_add(pair=False)
+        self.backend = Tokenizer.from_str(tokenizer.backend_tokenizer.to_str())
+        self.backend.no_truncation()
+        self.backend.no_padding()
+
+    def offsets(self, texts: Sequence[str]) -> List[np.ndarray]:
+        encodings = self.backend.encode_batch(list(texts), add_special_tokens=False)
+        return [np.array(encoding.offsets, dtype=np.int64).reshape(-1, 2) for encoding in encodings]
+
+
+class TokenChunker:
+    """
+    Split texts into chunks of at most `max_tokens` tokens of the embedding model.
+
+    Chunks end at a sentence boundary when one lies in the second half of the token window,
+    else at a word boundary, so that every chunk fits the model's input without truncation.
+    Consecutive chunks share about `overlap_tokens` tokens, starting at a sentence or word
+    boundary too. Texts are tokenized together in one batch, and boundaries are located with
+    binary searches over the token offsets.
+    """
+
+    def __init__(
+        self, tokenizer: Optional[Any] = None, max_tokens: int = CHUNK_MAX_SEQ_LENGTH, overlap_tokens: int = 0
+    ):
+        """
+        Args:
+            tokenizer (Optional[Any]): A RegexTokenizer or HFTokenizer, a RegexTokenizer when omitted.
+            max_tokens (int): Maximum number of tokens per chunk, excluding special tokens.
+            overlap_tokens (int): Tokens shared by consecutive chunks.
+
+        Raises:
+            ValueError: If the overlap is not smaller than the chunk size.
+        """
+        if not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("overlap_tokens must be at least 0 and smaller than max_tokens.")
+        self.tokenizer = tokenizer if tokenizer is not None else RegexTokenizer()
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @classmethod
+    def from_model(
+        cls, model: Any, max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS
+    ) -> "TokenChunker":
+        """
+        Build a chunker matching the tokenizer and input window of a SentenceTransformer model.
+
+        Args:
+            model (Any): The embedding model; models without a fast tokenizer are approximated
+                with a RegexTokenizer.
+            max_tokens (int): Tokens per chunk, 0 to fill the model's window. Capped to the window.
+            overlap_tokens (int): Tokens shared by consecutive chunks.
+
+        Returns:
+            TokenChunker: The chunker.
+        """
+        hf_tokenizer = getattr(model, "tokenizer", None)
+        tokenizer = HFTokenizer(hf_tokenizer) if getattr(hf_tokenizer, "is_fast", False) else RegexTokenizer()
+        window = (getattr(model, "max_seq_length", None) or CHUNK_MAX_SEQ_LENGTH) - tokenizer.num_special_tokens
+        max_tokens = min(max_tokens, window) if max_tokens else window
+        return cls(tokenizer, max_tokens, min(overlap_tokens, max_tokens // 2))
+
+    @staticmethod
+    def _last_cut(cuts: np.ndarray, low: int, high: int) -> int:
+        """
+        Return the largest cut in [low, high], or 0 if there is none.
+        """
+        index = int(np.searchsorted(cuts, high, side="right")) - 1
+        return int(cuts[index]) if index >= 0 and cuts[index] >= low else 0
+
+    @staticmethod
+    def _first_cut(cuts: np.ndarray, low: int, high: int) -> int:
+        """
+        Return the smallest cut in [low, high), or 0 if there is none.
+        """
+        index = int(np.searchsorted(cuts, low, side="left"))
+        return int(cuts[index]) if index < len(cuts) and cuts[index] < high else 0
+
+    def _split(self, text: str, offsets: np.ndarray) -> List[ChunkSpan]:
+        num_tokens = len(offsets)
+        if num_tokens == 0:
+            return []
+        starts, ends = offsets[:, 0], offsets[:, 1]
+        # Token indices where a sentence starts, and where a word starts (a gap precedes the token)
+        sentence_chars = np.fromiter((match.end() for match in _SENTENCE_END.finditer(text)), dtype=np.int64)
+        sentence_cuts = np.unique(np.searchsorted(starts, sentence_chars))
+        word_cuts = np.flatnonzero(np.concatenate(([True], starts[1:] > ends[:-1])))
+
+        spans = []
+        first = 0
+        while True:
+            limit = first + self.max_tokens
+            if limit >= num_tokens:
+                last = num_tokens
+            else:
+                # Prefer a sentence end in the second half of the window, then a word boundary
+                last = self._last_cut(sentence_cuts, first + self.max_tokens // 2, limit)
+                last = last or self._last_cut(word_cuts, first + 1, limit) or limit
+            spans.append((int(starts[first]), int(ends[last - 1]), last - first))
+            if last >= num_tokens:
+                return spans
+            back = max(last - self.overlap_tokens, first + 1)
+            first = self._first_cut(sentence_cuts, back, last) or self._first_cut(word_cuts, back, last) or back
+
+    def split_many(self, texts: Sequence[str]) -> List[List[ChunkSpan]]:
+        """
+        Split texts into chunks.
+
+        Args:
+            texts (Sequence[str]): The texts, tokenized together in one batch.
+
+        Returns:
+            List[List[ChunkSpan]]: For each text, the (start, end, num_tokens) of its chunks,
+            where `text[start:end]` is the chunk.
+        """
+        return [self._split(text, offsets) for text, offsets in zip(texts, self.tokenizer.offsets(texts))]
+
+    def split_text(self, text: str) -> List[str]:
+        """
+        Split a text into chunk strings.
+        """
+        return [text[start:end] for start, end, _ in self.split_many([text])[0]]
@@ -3,6 +3,9 @@ from utils.helpers import get_api_key
 from vector_database.exceptions import APIKeyError
 from env_variables import ENV
 
+# Stays None when no key can be read, so that offline tools can import the package
+api_key = None
+
 try:
     # Retrieve the API key
     api_key = get_api_key(key_name="LLM_API_KEY")
@@ -27,3 +30,16 @@ elif ENV == "test":
 DEFAULT_MODEL = "llama3-8b-8192"
 MAX_TOKENS = 3500  # Maximum tokens for the response
 TEMPERATURE = 0.3  # Creativity level of the response
+
+# Async client used by the API
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))  # Generations in flight per worker
+LLM_MAX_CONNECTIONS = 64  # Size of the HTTP connection pool to the Groq API
+LLM_REQUEST_TIMEOUT = 60.0  # Seconds before a generation (or a gap between streamed tokens) times out
+LLM_MAX_RETRIES = 2  # Retries of failed Groq requests
+
+# Context packing of the prompt
+MODEL_CONTEXT_WINDOW = 8192  # Tokens of prompt and answer accepted by DEFAULT_MODEL
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))  # Cap on the document tokens sent per request
+CONTEXT_SAFETY_TOKENS = 128  # Tokens kept free in the window for the error of the token counts
+CONTEXT_MIN_PARTIAL_TOKENS = 64  # Smallest room worth filling with the truncated start of a document
+LLM_TOKENIZER = os.getenv("LLM_TOKENIZER", "")  # Hugging Face tokenizer counting prompt tokens; "" estimates them
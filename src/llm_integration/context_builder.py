@@ -0,0 +1,268 @@
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from llm_integration.config import (
+    CONTEXT_MAX_TOKENS,
+    CONTEXT_MIN_PARTIAL_TOKENS,
+    CONTEXT_SAFETY_TOKENS,
+    LLM_TOKENIZER,
+    MODEL_CONTEXT_WINDOW,
+)
+from llm_integration.exceptions import LLMChainError
+
+# Words and single punctuation marks, the pieces of the token estimate
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+# Tokens of the "Document i:" header and separator that precede each document in the prompt
+DOCUMENT_HEADER_TOKENS = 6
+
+
+class TokenCounter:
+    """
+    Count the tokens of prompt texts.
+
+    With a Hugging Face tokenizer of the LLM the counts are exact. Without one, a text is estimated
+    as the larger of its number of words and punctuation marks and one token per 4 characters, which
+    BPE tokenizers such as Llama 3's rarely exceed on English text.
+    """
+
+    def __init__(self, tokenizer_name: str = LLM_TOKENIZER, tokenizer: Optional[Any] = None):
+        """
+        Args:
+            tokenizer_name (str): Name or path of a Hugging Face tokenizer, or "" to estimate the counts.
+            tokenizer (Optional[Any]): An already loaded tokenizer with an `encode` method, used instead.
+
+        Raises:
+            LLMChainError: If the tokenizer cannot be loaded.
+        """
+        if tokenizer is None and tokenizer_name:
+            try:
+                from transformers import AutoTokenizer
+
+                tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+            except Exception as e:
+                raise LLMChainError(f"Failed to load tokenizer '{tokenizer_name}': {e}")
+        self.tokenizer = tokenizer
+
+    def count(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text, add_special_tokens=False))
+        return max(len(_TOKEN.findall(text)), (len(text) + 3) // 4)
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Return the longest start of a text, cut at a word boundary, that has at most `max_tokens` tokens.
+        """
+        if self.count(text) <= max_tokens:
+            return text
+        ends = [match.start() for match in re.finditer(r"\s+", text)]
+        low, high = 0, len(ends)
+        # Binary search of the last word boundary whose prefix fits
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count(text[: ends[middle - 1]]) <= max_tokens:
+                low = middle
+            else:
+                high = middle - 1
+        return text[: ends[low - 1]] if low else ""
+
+
+@dataclass
+class ContextReport:
+    """
+    What a ContextBuilder did to the documents of a prompt, and the tokens it saved.
+    """
+
+    documents: int = 0  # Documents received
+    kept: int = 0  # Documents sent, after merging, deduplication and budgeting
+    merged: int = 0  # Documents merged into an adjacent or overlapping one of the same source
+    duplicates: int = 0  # Documents dropped as repeating, or contained in, another one
+    dropped: int = 0  # Documents left out for lack of budget, or empty
+    truncated: int = 0  # Documents cut to fit the budget
+    input_tokens: int = 0  # Tokens of the documents as received
+    context_tokens: int = 0  # Tokens of the documents sent
+    budget: int = 0  # Tokens available for the documents
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.input_tokens - self.context_tokens
+
+
+class ContextBuilder:
+    """
+    Pack retrieved documents into the context of a prompt within a token budget.
+
+    Documents are kept in retrieval order, the most relevant first:
+
+    1. Chunks of the same source whose character spans overlap or touch are merged into one
+       document, so the overlap between consecutive chunks is sent once.
+    2. Documents whose normalized text repeats, or is contained in, a kept document are dropped.
+    3. Documents are added while they fit the budget; the first one that does not fit is truncated
+       if at least CONTEXT_MIN_PARTIAL_TOKENS tokens are left, and the rest is dropped.
+
+    The budget is the context window of the model minus the answer's `max_tokens`, the rest of the
+    prompt and a safety margin, capped at `max_context_tokens`.
+    """
+
+    def __init__(
+        self,
+        context_window: int = MODEL_CONTEXT_WINDOW,
+        max_context_tokens: int = CONTEXT_MAX_TOKENS,
+        safety_tokens: int = CONTEXT_SAFETY_TOKENS,
+        min_partial_tokens: int = CONTEXT_MIN_PARTIAL_TOKENS,
+        counter: Optional[TokenCounter] = None,
+    ):
+        """
+        Args:
+            context_window (int): Tokens of prompt and answer accepted by the model.
+            max_context_tokens (int): Cap on the tokens of the documents.
+            safety_tokens (int): Tokens kept free for the error of the counts.
+            min_partial_tokens (int): Smallest room filled with a truncated document.
+            counter (Optional[TokenCounter]): Token counter, estimating counts by default.
+        """
+        self.context_window = context_window
+        self.max_context_tokens = max_context_tokens
+        self.safety_tokens = safety_tokens
+        self.min_partial_tokens = min_partial_tokens
+        self.counter = counter or TokenCounter()
+
+    def budget(self, max_tokens: int, reserved_tokens: int = 0) -> int:
+        """
+        Tokens available for the documents of a prompt.
+
+        Args:
+            max_tokens (int): Tokens reserved for the answer.
+            reserved_tokens (int): Tokens of the prompt without documents.
+        """
+        available = self.context_window - max_tokens - reserved_tokens - self.safety_tokens
+        return max(0, min(self.max_context_tokens, available))
+
+    def build(
+        self, documents: List[Dict[str, Any]], max_tokens: int, reserved_tokens: int = 0
+    ) -> Tuple[List[Dict[str, Any]], ContextReport]:
+        """
+        Merge, deduplicate and budget the documents of a prompt.
+
+        Args:
+            documents (List[Dict[str, Any]]): Retrieved documents, most relevant first, with a 'text' key and
+                optionally 'source', 'start_index' and 'end_index', the character span of the chunk in its source.
+            max_tokens (int): Tokens reserved for the answer.
+            reserved_tokens (int): Tokens of the prompt without documents.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], ContextReport]: The documents to send, and what was done to them.
+        """
+        report = ContextReport(documents=len(documents), budget=self.budget(max_tokens, reserved_tokens))
+        report.input_tokens = sum(self._cost(document["text"]) for document in documents)
+
+        packed = self._deduplicate(self._merge(documents, report), report)
+
+        kept: List[Dict[str, Any]] = []
+        for document in packed:
+            cost = self._cost(document["text"])
+            room = report.budget - report.context_tokens
+            if cost <= room:
+                kept.append(document)
+                report.context_tokens += cost
+                continue
+            if room - DOCUMENT_HEADER_TOKENS >= self.min_partial_tokens:
+                text = self.counter.truncate(document["text"], room - DOCUMENT_HEADER_TOKENS)
+                if text:
+                    kept.append(dict(document, text=text))
+                    report.context_tokens += self._cost(text)
+                    report.truncated += 1
+            report.dropped += len(packed) - len(kept)
+            break
+        report.kept = len(kept)
+        return kept, report
+
+    def _cost(self, text: str) -> int:
+        return self.counter.count(text) + DOCUMENT_HEADER_TOKENS
+
+    @staticmethod
+    def _span(document: Dict[str, Any]) -> Optional[Tuple[str, int, int]]:
+        """
+        The source and character span of a chunk, if it has one consistent with its text.
+        """
+        source, start, end = document.get("source"), document.get("start_index"), document.get("end_index")
+        if source is None or not isinstance(start, int) or not isinstance(end, int):
+            return None
+        if end - start != len(document["text"]):
+            return None
+        return source, start, end
+
+    def _merge(self, documents: List[Dict[str, Any]], report: ContextReport) -> List[Dict[str, Any]]:
+        """
+        Merge the chunks of a source whose spans overlap or touch, at the rank of their best chunk.
+        """
+        by_source: Dict[str, List[Tuple[int, int, int]]] = {}
+        ranked: Dict[int, Dict[str, Any]] = {}
+        for rank, document in enumerate(documents):
+            located = self._span(document)
+            if located is None:
+                ranked[rank] = document
+            else:
+                source, start, end = located
+                by_source.setdefault(source, []).append((start, end, rank))
+
+        for spans in by_source.values():
+            spans.sort()
+            groups = [[spans[0]]]
+            group_end = spans[0][1]
+            for start, end, rank in spans[1:]:
+                if start <= group_end:
+                    groups[-1].append((start, end, rank))
+                    group_end = max(group_end, end)
+                else:
+                    groups.append([(start, end, rank)])
+                    group_end = end
+            for group in groups:
+                ranked[min(rank for _, _, rank in group)] = self._join(documents, group)
+                report.merged += len(group) - 1
+        return [ranked[rank] for rank in sorted(ranked)]
+
+    @staticmethod
+    def _join(documents: List[Dict[str, Any]], group: List[Tuple[int, int, int]]) -> Dict[str, Any]:
+        """
+        Join chunks sorted by start offset into the text of their combined span.
+        """
+        best = documents[min(rank for _, _, rank in group)]
+        if len(group) == 1:
+            return best
+        start, end, first_rank = group[0]
+        text = documents[first_rank]["text"]
+        for chunk_start, chunk_end, rank in group[1:]:
+            if chunk_end > end:
+                text += documents[rank]["text"][end - chunk_start :]
+                end = chunk_end
+        scores = [documents[rank]["score"] for _, _, rank in group if "score" in documents[rank]]
+        merged = dict(best, text=text, start_index=start, end_index=end)
+        if scores:
+            merged["score"] = max(scores)
+        return merged
+
+    @staticmethod
+    def _deduplicate(documents: List[Dict[str, Any]], report: ContextReport) -> List[Dict[str, Any]]:
+        """
+        Drop empty documents and documents whose normalized text is contained in a more relevant one.
+        A document containing more relevant ones replaces the first of them.
+        """
+        kept: List[Dict[str, Any]] = []
+        normalized: List[str] = []
+        for document in documents:
+            text = " ".join(document["text"].lower().split())
+            if not text:
+                report.dropped += 1
+                continue
+            if any(text in other for other in normalized):
+                report.duplicates += 1
+                continue
+            contained = [position for position, other in enumerate(normalized) if other in text]
+            if contained:
+                report.duplicates += len(contained)
+                kept[contained[0]], normalized[contained[0]] = document, text
+                for position in reversed(contained[1:]):
+                    del kept[position], normalized[position]
+                continue
+            kept.append(document)
+            normalized.append(text)
+        return kept
@@ -2,3 +2,9 @@ class LLMChainError(Exception):
     """Custom exception for LangChain-related errors."""
 
     pass
+
+
+class LLMTimeoutError(LLMChainError):
+    """Raised when the LLM does not answer within the configured timeout."""
+
+    pass
@@ -1,7 +1,24 @@
-from typing import List
-from llm_integration.config import MAX_TOKENS, TEMPERATURE, LLM_API_KEY, DEFAULT_MODEL
-from llm_integration.exceptions import LLMChainError
-from groq import Groq
+import asyncio
+import logging
+import time
+from typing import Any, AsyncGenerator, Iterator, List, Optional, Set
+import httpx
+from llm_integration.config import (
+    MAX_TOKENS,
+    TEMPERATURE,
+    LLM_API_KEY,
+    DEFAULT_MODEL,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_CONNECTIONS,
+    LLM_REQUEST_TIMEOUT,
+    LLM_MAX_RETRIES,
+)
+from llm_integration.context_builder import ContextBuilder
+from llm_integration.exceptions import LLMChainError, LLMTimeoutError
+from groq import AsyncGroq, Groq
+from utils.tracing import metrics, span
+
+llm_logger = logging.getLogger("llm_integration")
 
 
 class LLMIntegrationWithLLaMA:
@@ -9,16 +26,184 @@ class LLMIntegrationWithLLaMA:
     Integration with LLaMA 3 using Groq API.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        request_timeout: float = LLM_REQUEST_TIMEOUT,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        client: Optional[Any] = None,
+        context_builder: Optional[ContextBuilder] = None,
+    ):
         """
         Initialize the LLM integration with the Groq API and LLaMA model parameters.
+
+        Args:
+            max_concurrency (int): Maximum number of async generations in flight; further calls wait their turn.
+            request_timeout (float): Seconds after which an async generation, or the wait for the next
+                streamed token, is abandoned.
+            max_connections (int): Size of the connection pool of the async client.
+            client (Optional[Any]): An already built client with the Groq `chat.completions.create` method,
+                used instead of connecting to Groq, for example to benchmark offline.
+            context_builder (Optional[ContextBuilder]): Packs the retrieved documents into the token budget
+                of each prompt.
         """
         try:
-            self.client = Groq(api_key=LLM_API_KEY)  # Initialize the Groq client
+            self.client = client if client is not None else Groq(api_key=LLM_API_KEY)  # Initialize the Groq client
             self.model = DEFAULT_MODEL
             # self.tokenizer = LlamaTokenizer.from_pretrained("decapoda-research/llama-7b-hf")
         except Exception as e:
             raise LLMChainError(f"Failed to initialize Groq client: {e}")
+        self.max_concurrency = max_concurrency
+        self.request_timeout = request_timeout
+        self.max_connections = max_connections
+        self.context_builder = context_builder or ContextBuilder()
+        self._async_client: Optional[AsyncGroq] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closing: Set["asyncio.Task[None]"] = set()
+
+    def _bind_loop(self) -> None:
+        """
+        Drop the async client and semaphore if they were created in another event loop,
+        since their connections and waiters cannot be shared across loops. The dropped client
+        is closed in its own loop if that one still runs, otherwise in the current one.
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            previous_client, previous_loop = self._async_client, self._loop
+            self._loop = loop
+            self._async_client = None
+            self._semaphore = None
+            if previous_client is None:
+                return
+            if previous_loop is not None and previous_loop.is_running():
+                asyncio.run_coroutine_threadsafe(self._close_client(previous_client), previous_loop)
+            else:
+                closing = loop.create_task(self._close_client(previous_client))
+                # Keep a reference until the task is done, so that it is not garbage collected
+                self._closing.add(closing)
+                closing.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close_client(client: AsyncGroq) -> None:
+        """
+        Close an async client dropped by `_bind_loop`. The connections of a stopped loop may not close
+        cleanly, so a failure is only logged.
+        """
+        try:
+            await client.close()
+        except Exception as e:
+            llm_logger.debug("Failed to close the async Groq client of a previous event loop: %s", e)
+
+    @property
+    def async_client(self) -> AsyncGroq:
+        """
+        The async Groq client, created on first use and shared by every async call.
+        Its pooled connections are kept alive between requests.
+        """
+        self._bind_loop()
+        if self._async_client is None:
+            try:
+                http_client = httpx.AsyncClient(
+                    limits=httpx.Limits(
+                        max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                    ),
+                    timeout=self.request_timeout,
+                )
+                self._async_client = AsyncGroq(
+                    api_key=LLM_API_KEY,
+                    http_client=http_client,
+                    timeout=self.request_timeout,
+                    max_retries=LLM_MAX_RETRIES,
+                )
+            except Exception as e:
+                raise LLMChainError(f"Failed to initialize async Groq client: {e}")
+        return self._async_client
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        self._bind_loop()
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def aclose(self) -> None:
+        """
+        Close the connections of the async client.
+        """
+        if self._async_client is not None:
+            await self._async_client.close()
+            self._async_client = None
+
+    @staticmethod
+    def _observe_first_token(start: float) -> None:
+        """
+        Record the time between the request of a streamed completion and its first token.
+        """
+        metrics.observe(
+            "llm_time_to_first_token_seconds",
+            time.perf_counter() - start,
+            "Time from the LLM request to the first streamed token.",
+        )
+
+    @staticmethod
+    def build_prompt(query: str, retrieved_docs: List[dict]) -> str:
+        """
+        Build the prompt sent to the LLM from the query and the retrieved documents.
+
+        Args:
+            query (str): The user's query.
+            retrieved_docs (List[dict]): List of retrieved documents.
+
+        Returns:
+            str: The full input prompt.
+        """
+        # Format the context
+        context = "\n".join([f"Document {i + 1}:\n{doc['text']}" for i, doc in enumerate(retrieved_docs)])
+
+        # Construct the full input prompt
+        return (
+            "You are a knowledgeable assistant. Use the following documents to answer the question.\n\n"
+            f"Context:\n{context}\n\n"
+            f"Question: {query}\n\n"
+            "Answer:"
+        )
+
+    def pack_prompt(self, query: str, retrieved_docs: List[dict], max_tokens: int) -> str:
+        """
+        Build the prompt with the retrieved documents packed by the context builder, leaving room in the
+        model's context window for `max_tokens` of answer. The tokens saved are logged and counted.
+
+        Args:
+            query (str): The user's query.
+            retrieved_docs (List[dict]): List of retrieved documents, most relevant first.
+            max_tokens (int): Tokens reserved for the answer.
+
+        Returns:
+            str: The full input prompt.
+        """
+        with span("llm.context"):
+            reserved = self.context_builder.counter.count(self.build_prompt(query, []))
+            documents, report = self.context_builder.build(retrieved_docs, max_tokens, reserved)
+        metrics.increment("llm_context_tokens_total", report.input_tokens, "Tokens of prompt documents.", stage="input")
+        metrics.increment(
+            "llm_context_tokens_total", report.context_tokens, "Tokens of prompt documents.", stage="sent"
+        )
+        llm_logger.info(
+            "Context packed: %d of %d documents, %d of %d tokens sent (%d saved; %d merged, %d duplicates, "
+            "%d dropped, %d truncated; budget %d)",
+            report.kept,
+            report.documents,
+            report.context_tokens,
+            report.input_tokens,
+            report.tokens_saved,
+            report.merged,
+            report.duplicates,
+            report.dropped,
+            report.truncated,
+            report.budget,
+        )
+        return self.build_prompt(query, documents)
 
     def generate_response(self, query: str, retrieved_docs: List[dict], temperature: float, max_tokens: int) -> str:
         """
@@ -34,29 +219,174 @@ class LLMIntegrationWithLLaMA:
             str: The response generated by the LLM.
         """
         try:
-            # Format the context
-            context = "\n".join([f"Document {i + 1}:\n{doc['text']}" for i, doc in enumerate(retrieved_docs)])
-
-            # Construct the full input prompt
-            prompt = (
-                "You are a knowledgeable assistant. Use the following documents to answer the question.\n\n"
-                f"Context:\n{context}\n\n"
-                f"Question: {query}\n\n"
-                "Answer:"
-            )
+            prompt = self.pack_prompt(query, retrieved_docs, max_tokens)
 
             # Generate response using the Groq API
-            completion = self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                top_p=1.0,
-                stream=False,
-            )
+            with span("llm.generate"):
+                completion = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=1.0,
+                    stream=False,
+                )
 
             # Extract the assistant's reply
-            response_content = completion.choices[0].message.content.strip()
+            response_content = (completion.choices[0].message.content or "").strip()
             return response_content
         except Exception as e:
             raise LLMChainError(f"Failed to generate response with Groq LLaMA: {e}")
+
+    def stream_response(
+        self, query: str, retrieved_docs: List[dict], temperature: float, max_tokens: int
+    ) -> Iterator[str]:
+        """
+        Stream a response from the LLM using Groq API, yielding text fragments as they are generated.
+
+        Args:
+            query (str): The user's query.
+            retrieved_docs (List[dict]): List of retrieved documents.
+            temperature (float): creativity of model.
+            max_tokens (int)
+
+        Yields:
+            str: The next fragment of the response.
+        """
+        try:
+            with span("llm.stream") as stream_span:
+                stream = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[{"role": "user", "content": self.pack_prompt(query, retrieved_docs, max_tokens)}],
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    top_p=1.0,
+                    stream=True,
+                )
+                first = True
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first:
+                            self._observe_first_token(stream_span.start)
+                            first = False
+                        yield delta
+        except Exception as e:
+            raise LLMChainError(f"Failed to stream response with Groq LLaMA: {e}")
+
+    async def agenerate_response(
+        self, query: str, retrieved_docs: List[dict], temperature: float, max_tokens: int
+    ) -> str:
+        """
+        Generate a response like `generate_response` without blocking the event loop.
+
+        At most `max_concurrency` generations run at once; the wait for a slot counts toward the timeout.
+        Cancelling the calling task cancels the request to Groq.
+
+        Args:
+            query (str): The user's query.
+            retrieved_docs (List[dict]): List of retrieved documents.
+            temperature (float): creativity of model.
+            max_tokens (int)
+
+        Returns:
+            str: The response generated by the LLM.
+
+        Raises:
+            LLMTimeoutError: If no response arrives within `request_timeout` seconds.
+            LLMChainError: If the generation fails.
+        """
+
+        async def generate() -> str:
+            with span("llm.queue"):
+                await self.semaphore.acquire()
+            try:
+                with span("llm.generate"):
+                    completion = await self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": self.pack_prompt(query, retrieved_docs, max_tokens)}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=1.0,
+                    )
+            finally:
+                self.semaphore.release()
+            return (completion.choices[0].message.content or "").strip()
+
+        try:
+            return await asyncio.wait_for(generate(), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Groq LLaMA did not respond within {self.request_timeout} seconds")
+        except LLMChainError:
+            raise
+        except Exception as e:
+            raise LLMChainError(f"Failed to generate response with Groq LLaMA: {e}")
+
+    async def astream_response(
+        self, query: str, retrieved_docs: List[dict], temperature: float, max_tokens: int
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream a response like `stream_response` without blocking the event loop.
+
+        The concurrency slot is held until the stream ends. Closing or cancelling the iterator,
+        for example when the client disconnects, closes the upstream stream.
+
+        Args:
+            query (str): The user's query.
+            retrieved_docs (List[dict]): List of retrieved documents.
+            temperature (float): creativity of model.
+            max_tokens (int)
+
+        Yields:
+            str: The next fragment of the response.
+
+        Raises:
+            LLMTimeoutError: If the stream does not start, or stalls, for `request_timeout` seconds.
+            LLMChainError: If the generation fails.
+        """
+        try:
+            with span("llm.queue"):
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.request_timeout)
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"No LLM slot became available within {self.request_timeout} seconds")
+        stream = None
+        try:
+            with span("llm.stream") as stream_span:
+                stream = await asyncio.wait_for(
+                    self.async_client.chat.completions.create(
+                        model=self.model,
+                        messages=[{"role": "user", "content": self.pack_prompt(query, retrieved_docs, max_tokens)}],
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        top_p=1.0,
+                        stream=True,
+                    ),
+                    timeout=self.request_timeout,
+                )
+                chunks = stream.__aiter__()
+                first = True
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.request_timeout)
+                    except StopAsyncIteration:
+                        break
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        if first:
+                            self._observe_first_token(stream_span.start)
+                            first = False
+                        yield delta
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError(f"Groq LLaMA stream stalled for {self.request_timeout} seconds")
+        except LLMChainError:
+            raise
+        except Exception as e:
+            raise LLMChainError(f"Failed to stream response with Groq LLaMA: {e}")
+        finally:
+            self.semaphore.release()
+            if stream is not None and hasattr(stream, "close"):
+                await stream.close()
@@ -1 +1,20 @@
+import os
+
 TOP_K_RESULTS = 5  # Number of results to retrieve
+QUERY_EMBEDDING_CACHE_SIZE = 1024  # Number of query embeddings kept in memory
+RESULT_CACHE_SIZE = 256  # Number of top-k result lists kept in memory
+CACHE_TTL_SECONDS = 300.0  # Lifetime of cached query embeddings and results
+RETRIEVE_MAX_WORKERS = 8  # Concurrent vector-store queries in Retriever.retrieve_many
+RETRIEVE_COALESCE_TIMEOUT_SECONDS = 30.0  # Longest wait for a concurrent retrieval of the same query to finish
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "dense")  # "dense" vector search, or "hybrid" dense + BM25
+HYBRID_CANDIDATES = 50  # Candidates taken from each of the dense and BM25 rankings before fusion
+RRF_K = 60  # Reciprocal rank fusion constant: a document at rank r of a ranking scores 1 / (RRF_K + r)
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"  # Rerank the candidates with a cross-encoder
+RERANK_MODEL = os.getenv(
+    "RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+)  # Cross-encoder scoring query-chunk pairs
+RERANK_CANDIDATES = 50  # Candidates fetched from the index and reranked for each query
+RERANK_BATCH_SIZE = 16  # Query-chunk pairs scored per cross-encoder forward pass
+RERANK_MAX_LENGTH = 512  # Tokens of a query-chunk pair read by the cross-encoder
+RERANK_CACHE_SIZE = 8192  # Query-chunk pair scores kept in memory
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "300"))  # No batch is started past it; 0 = none
@@ -0,0 +1,24 @@
+from typing import Dict, List, Sequence, Tuple
+from retriever.config import RRF_K
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Merge rankings with reciprocal rank fusion.
+
+    A document scores the sum of 1 / (k + rank) over the rankings it appears in, ranks starting at 1,
+    so only positions matter and the incomparable dense and BM25 scores need no normalization.
+
+    Args:
+        rankings (Sequence[Sequence[str]]): Document IDs of each ranking, best first.
+        k (int): Damping constant; larger values flatten the advantage of top ranks.
+
+    Returns:
+        List[Tuple[str, float]]: Document IDs and fused scores, best first. Ties keep the order in
+        which documents were first seen.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, document_id in enumerate(ranking, start=1):
+            scores[document_id] = scores.get(document_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
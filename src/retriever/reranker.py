@@ -0,0 +1,134 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from retriever.config import (
+    CACHE_TTL_SECONDS,
+    RERANK_BATCH_SIZE,
+    RERANK_CACHE_SIZE,
+    RERANK_LATENCY_BUDGET_MS,
+    RERANK_MAX_LENGTH,
+    RERANK_MODEL,
+)
+from retriever.exceptions import RetrieverError
+from utils.cache import TTLCache
+from utils.tracing import metrics
+
+
+class CrossEncoderReranker:
+    """
+    Rescore retrieved chunks with a cross-encoder, which reads the query and the chunk together.
+
+    Candidates are scored best retrieval rank first, in batches, and the score of every query-chunk
+    pair is cached. The time the model takes per pair is tracked as a moving average, and batches are
+    shrunk or skipped so that the scoring fits in the latency budget; candidates left unscored keep
+    their retrieval order after the reranked ones. Until the cost is known, a single pair is scored
+    to measure it.
+
+    Concurrent reranks, such as those of `Retriever.retrieve_many`, score their pairs one at a time: the
+    model would otherwise share the same CPU cores between them, slowing every batch and inflating the
+    measured cost. The budget of a rerank starts once it gets the model.
+    """
+
+    def __init__(
+        self,
+        model_name: str = RERANK_MODEL,
+        model: Optional[Any] = None,
+        batch_size: int = RERANK_BATCH_SIZE,
+        max_length: int = RERANK_MAX_LENGTH,
+        cache_size: int = RERANK_CACHE_SIZE,
+        cache_ttl: Optional[float] = CACHE_TTL_SECONDS,
+        latency_budget_ms: Optional[float] = RERANK_LATENCY_BUDGET_MS,
+        clock: Callable[[], float] = time.perf_counter,
+    ):
+        """
+        Initialize the reranker.
+
+        Args:
+            model_name (str): Name of the Sentence Transformers cross-encoder to load.
+            model (Optional[Any]): An already loaded model with the CrossEncoder `predict` method, used
+                instead of loading `model_name`.
+            batch_size (int): Query-chunk pairs scored per forward pass.
+            max_length (int): Tokens of a pair read by the model; longer chunks are truncated.
+            cache_size (int): Number of pair scores kept in memory.
+            cache_ttl (Optional[float]): Seconds after which cached scores expire.
+            latency_budget_ms (Optional[float]): Milliseconds a rerank may take; None or 0 scores every
+                candidate.
+            clock (Callable[[], float]): Time source, in seconds.
+
+        Raises:
+            RetrieverError: If the model cannot be loaded.
+        """
+        self.model_name = model_name
+        if model is not None:
+            self.model = model
+        else:
+            try:
+                from sentence_transformers import CrossEncoder
+
+                self.model = CrossEncoder(model_name, max_length=max_length, device="cpu")
+            except Exception as e:
+                raise RetrieverError(f"Failed to load cross-encoder '{model_name}': {e}")
+        self.batch_size = max(1, batch_size)
+        self.latency_budget = latency_budget_ms / 1000 if latency_budget_ms else None
+        self.clock = clock
+        self.score_cache = TTLCache(maxsize=cache_size, ttl=cache_ttl)
+        # Moving average of the model time per pair, in seconds
+        self.pair_seconds: Optional[float] = None
+        # Held while the model scores the pairs of a rerank, and updates `pair_seconds`
+        self._model_lock = threading.Lock()
+
+    def rerank(self, query: str, documents: List[Dict[str, Any]], top_k: Optional[int] = None) -> List[dict]:
+        """
+        Order retrieved documents by cross-encoder score.
+
+        Args:
+            query (str): The query string.
+            documents (List[Dict[str, Any]]): Documents with 'id', 'score' and 'text' keys, best first.
+            top_k (Optional[int]): Number of documents to return, all of them when None.
+
+        Returns:
+            List[dict]: Copies of the documents, the reranked ones first with their cross-encoder score
+            as 'score', then those left unscored by the budget in their original order.
+        """
+        scores: List[Optional[float]] = [self.score_cache.get((query, document["text"])) for document in documents]
+        missing = [position for position, score in enumerate(scores) if score is None]
+        with self._model_lock:
+            deadline = self.clock() + self.latency_budget if self.latency_budget is not None else None
+            scored_pairs = 0
+            while scored_pairs < len(missing):
+                size = self.batch_size
+                pair_seconds = self.pair_seconds
+                if deadline is not None and pair_seconds is None:
+                    size = 1
+                elif deadline is not None and pair_seconds is not None:
+                    size = min(size, int((deadline - self.clock()) / pair_seconds))
+                    if size < 1:
+                        metrics.increment(
+                            "rerank_budget_exhausted_total", help_text="Reranks cut short by their latency budget."
+                        )
+                        break
+                batch = missing[scored_pairs : scored_pairs + size]
+                start = self.clock()
+                try:
+                    predicted = self.model.predict(
+                        [(query, documents[position]["text"]) for position in batch],
+                        batch_size=len(batch),
+                        show_progress_bar=False,
+                    )
+                except Exception as e:
+                    raise RetrieverError(f"Failed to rerank documents: {e}")
+                seconds = (self.clock() - start) / len(batch)
+                self.pair_seconds = seconds if self.pair_seconds is None else 0.8 * self.pair_seconds + 0.2 * seconds
+                for position, score in zip(batch, predicted):
+                    scores[position] = float(score)
+                    self.score_cache.set((query, documents[position]["text"]), scores[position])
+                scored_pairs += len(batch)
+        metrics.increment("rerank_pairs_total", len(documents) - len(missing), "Reranked pairs.", source="cache")
+        metrics.increment("rerank_pairs_total", scored_pairs, "Reranked pairs.", source="model")
+
+        reranked = sorted(
+            (dict(document, score=score) for document, score in zip(documents, scores) if score is not None),
+            key=lambda document: -document["score"],
+        )
+        unscored = [dict(document) for document, score in zip(documents, scores) if score is None]
+        return (reranked + unscored)[:top_k]
@@ -1,8 +1,30 @@
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+import numpy as np
 from vector_database.vector_manager import VectorManager
 from embeddings.embedding_generator import EmbeddingGenerator
-from retriever.config import TOP_K_RESULTS
+from retriever.config import (
+    TOP_K_RESULTS,
+    QUERY_EMBEDDING_CACHE_SIZE,
+    RESULT_CACHE_SIZE,
+    CACHE_TTL_SECONDS,
+    RETRIEVE_MAX_WORKERS,
+    RETRIEVE_COALESCE_TIMEOUT_SECONDS,
+    RETRIEVAL_MODE,
+    HYBRID_CANDIDATES,
+    RERANK_ENABLED,
+    RERANK_CANDIDATES,
+)
 from retriever.exceptions import RetrieverError
+from retriever.fusion import reciprocal_rank_fusion
+from retriever.reranker import CrossEncoderReranker
+from utils.cache import TTLCache
+from utils.registry import get_embedding_generator, get_reranker, get_vector_manager
+from utils.singleflight import SingleFlight
+from utils.tracing import span
+
+# Metadata of a match locating its chunk in the source document
+SPAN_KEYS = ("source", "start_index", "end_index")
 
 
 class Retriever:
@@ -12,23 +34,109 @@ class Retriever:
 
     def __init__(
         self,
-        vector_manager: VectorManager = VectorManager(""),
-        embedding_generator: EmbeddingGenerator = EmbeddingGenerator(),
+        vector_manager: Optional[VectorManager] = None,
+        embedding_generator: Optional[EmbeddingGenerator] = None,
+        embedding_cache_size: int = QUERY_EMBEDDING_CACHE_SIZE,
+        result_cache_size: int = RESULT_CACHE_SIZE,
+        cache_ttl: Optional[float] = CACHE_TTL_SECONDS,
+        mode: str = RETRIEVAL_MODE,
+        hybrid_candidates: int = HYBRID_CANDIDATES,
+        reranker: Optional[CrossEncoderReranker] = None,
+        rerank: bool = RERANK_ENABLED,
+        rerank_candidates: int = RERANK_CANDIDATES,
+        coalesce_timeout: Optional[float] = RETRIEVE_COALESCE_TIMEOUT_SECONDS,
     ):
         """
         Initialize the retriever.
 
         Args:
-            vector_manager (VectorManager): The vector database manager.
-            embedding_generator (EmbeddingGenerator): The embedding generator.
+            vector_manager (Optional[VectorManager]): The vector database manager. Defaults to the
+                shared manager of the process, built on first use.
+            embedding_generator (Optional[EmbeddingGenerator]): The embedding generator. Defaults to the
+                shared generator of the process, loaded on first use.
+            embedding_cache_size (int): Number of query embeddings kept in memory.
+            result_cache_size (int): Number of top-k result lists kept in memory.
+            cache_ttl (Optional[float]): Seconds after which cached embeddings and results expire.
+            mode (str): "dense" vector search, or "hybrid" to fuse the dense and BM25 rankings with
+                reciprocal rank fusion.
+            hybrid_candidates (int): Candidates taken from each ranking in hybrid mode.
+            reranker (Optional[CrossEncoderReranker]): Cross-encoder reranking the candidates. Passing one
+                enables reranking.
+            rerank (bool): Whether to rerank the candidates, with the shared reranker of the process when
+                `reranker` is None.
+            rerank_candidates (int): Candidates fetched and reranked per query.
+            coalesce_timeout (Optional[float]): Seconds a retrieval may take before the concurrent
+                retrievals of the same query stop waiting for it, or None to wait without limit.
+
+        Raises:
+            RetrieverError: If the mode is unknown.
+        """
+        if mode not in ("dense", "hybrid"):
+            raise RetrieverError(f"Unknown retrieval mode '{mode}', expected 'dense' or 'hybrid'.")
+        self.mode = mode
+        self.hybrid_candidates = hybrid_candidates
+        self._reranker = reranker
+        self.rerank = rerank or reranker is not None
+        self.rerank_candidates = rerank_candidates
+        self._vector_manager = vector_manager
+        self._embedding_generator = embedding_generator
+        self.embedding_cache = TTLCache(maxsize=embedding_cache_size, ttl=cache_ttl)
+        self.result_cache = TTLCache(maxsize=result_cache_size, ttl=cache_ttl)
+        # Concurrent retrievals of the same query share one embedding and vector store query
+        self.flights = SingleFlight("retriever", timeout=coalesce_timeout)
+
+    @property
+    def vector_manager(self) -> VectorManager:
+        if self._vector_manager is None:
+            self._vector_manager = get_vector_manager()
+        return self._vector_manager
+
+    @property
+    def embedding_generator(self) -> EmbeddingGenerator:
+        if self._embedding_generator is None:
+            self._embedding_generator = get_embedding_generator()
+        return self._embedding_generator
+
+    @property
+    def reranker(self) -> Optional[CrossEncoderReranker]:
+        if self._reranker is None and self.rerank:
+            self._reranker = get_reranker()
+        return self._reranker
+
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Return the embedding of a query, reusing it if the query was recently embedded.
+
+        The embedding is reduced with the projection of the index, like the stored vectors.
+
+        Args:
+            query (str): The query string.
+
+        Returns:
+            List[float]: The query embedding.
         """
-        self.vector_manager = vector_manager
-        self.embedding_generator = embedding_generator
+        query_embedding = self.embedding_cache.get(query)
+        if query_embedding is None:
+            query_embedding = self.embedding_generator.generate_embeddings(texts=[query])[0]
+            self.embedding_cache.set(query, query_embedding)
+        return self._project(query_embedding[None, :])[0]
+
+    def _project(self, embeddings: np.ndarray) -> List[List[float]]:
+        """
+        Apply the projection of the index to model embeddings.
+        """
+        return np.asarray(self.vector_manager.project(embeddings)).astype(float).tolist()
 
     def retrieve(self, query: str, top_k: int = TOP_K_RESULTS) -> List[dict]:
         """
         Retrieve the top K most relevant documents for a given query.
 
+        Results are cached per query and index version, so any write to the index invalidates them.
+        Concurrent calls for the same query share one search, and its error.
+        In hybrid mode, the scores are reciprocal rank fusion scores of the dense and BM25 rankings.
+        With reranking, `rerank_candidates` matches are fetched and the top K by cross-encoder score
+        are returned.
+
         Args:
             query (str): The query string.
             top_k (int): Number of results to retrieve.
@@ -38,17 +146,170 @@ class Retriever:
         """
         try:
             print(query)
-            # Generate embedding for the query
-            query_embedding = self.embedding_generator.generate_embeddings(texts=[query])[0]
-            vec_embedding = query_embedding.astype(float).tolist()
-
-            # Query the vector database
-            results = self.vector_manager.query_vectors(query_vector=vec_embedding, top_k=top_k)
-
-            # Include text from metadata
-            return [
-                {"id": match["id"], "score": float(match["score"]), "text": match["metadata"].get("text", "")}
-                for match in results
-            ]
+            with span("retriever.retrieve"):
+                cache_key = (query, top_k, self.vector_manager.version)
+                cached = self.result_cache.get(cache_key)
+                if cached is None:
+                    cached = self.flights.do(cache_key, lambda: self._search(query, top_k, cache_key))
+                return [dict(result) for result in cached]
         except Exception as e:
             raise RetrieverError(f"Failed to retrieve documents: {e}")
+
+    def _search(self, query: str, top_k: int, cache_key: tuple) -> List[dict]:
+        """
+        Embed a query, search the index, rerank the matches and cache them.
+        """
+        # Generate embedding for the query
+        with span("retriever.embed"):
+            vec_embedding = self.embed_query(query)
+
+        # Query the vector database, and the BM25 index in hybrid mode
+        with span("retriever.query"):
+            results = self._query(query, vec_embedding, self._candidates(top_k))
+
+        # Include text from metadata
+        with span("retriever.format"):
+            documents = self._format_matches(results)
+
+        reranker = self.reranker
+        if reranker is not None:
+            with span("retriever.rerank"):
+                documents = reranker.rerank(query, documents, top_k)
+        self.result_cache.set(cache_key, documents)
+        return documents
+
+    @span("retriever.retrieve_many")
+    def retrieve_many(
+        self, queries: List[str], top_k: int = TOP_K_RESULTS, max_workers: int = RETRIEVE_MAX_WORKERS
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve the top K most relevant documents for several queries at once.
+
+        Queries that are not cached are embedded together in one batch, and the vector
+        store queries run concurrently, shared with concurrent retrievals of the same queries.
+        Their reranks take turns on the cross-encoder. A failing query does not affect the others.
+
+        Args:
+            queries (List[str]): The query strings.
+            top_k (int): Number of results to retrieve per query.
+            max_workers (int): Maximum number of concurrent vector store queries.
+
+        Returns:
+            List[Dict[str, Any]]: One dictionary per query, in the order of `queries`, with keys
+            'query', 'results' (as returned by `retrieve`) and 'error' (None on success).
+        """
+        outcomes: List[Dict[str, Any]] = [{"query": query, "results": [], "error": None} for query in queries]
+        version = self.vector_manager.version
+
+        # 1. Serve cached results
+        pending = []
+        for position, query in enumerate(queries):
+            cached = self.result_cache.get((query, top_k, version))
+            if cached is not None:
+                outcomes[position]["results"] = [dict(result) for result in cached]
+            else:
+                pending.append(position)
+        if not pending:
+            return outcomes
+
+        # 2. Embed the queries without a cached embedding in one batch, then project them all at once
+        cached_embeddings: Dict[str, np.ndarray] = {}
+        to_embed = []
+        for position in pending:
+            query = queries[position]
+            query_embedding = self.embedding_cache.get(query)
+            if query_embedding is not None:
+                cached_embeddings[query] = query_embedding
+            elif query not in to_embed:
+                to_embed.append(query)
+        failed: Dict[str, str] = {}
+        if to_embed:
+            try:
+                with span("retriever.embed"):
+                    batch = self.embedding_generator.generate_embeddings(texts=to_embed)
+                for query, query_embedding in zip(to_embed, batch):
+                    cached_embeddings[query] = query_embedding
+                    self.embedding_cache.set(query, query_embedding)
+            except Exception as e:
+                failed.update((query, f"Failed to embed query: {e}") for query in to_embed)
+        embeddings: Dict[str, List[float]] = {}
+        if cached_embeddings:
+            try:
+                projected = self._project(np.stack(list(cached_embeddings.values())))
+                embeddings = dict(zip(cached_embeddings, projected))
+            except Exception as e:
+                failed.update((query, f"Failed to embed query: {e}") for query in cached_embeddings)
+        for position in pending:
+            outcomes[position]["error"] = failed.get(queries[position])
+        pending = [position for position in pending if outcomes[position]["error"] is None]
+
+        # 3. Query the vector store concurrently, once per distinct query
+        def compute(query: str) -> List[dict]:
+            results = self._query(query, embeddings[query], self._candidates(top_k))
+            documents = self._format_matches(results)
+            reranker = self.reranker
+            if reranker is not None:
+                with span("retriever.rerank"):
+                    documents = reranker.rerank(query, documents, top_k)
+            self.result_cache.set((query, top_k, version), documents)
+            return documents
+
+        def search(query: str) -> Dict[str, Any]:
+            try:
+                documents = self.flights.do((query, top_k, version), lambda: compute(query))
+                return {"results": documents, "error": None}
+            except Exception as e:
+                return {"results": [], "error": f"Failed to retrieve documents: {e}"}
+
+        distinct = list(dict.fromkeys(queries[position] for position in pending))
+        if distinct:
+            with span("retriever.query"), ThreadPoolExecutor(
+                max_workers=max(1, min(max_workers, len(distinct)))
+            ) as executor:
+                searched = dict(zip(distinct, executor.map(search, distinct)))
+            for position in pending:
+                outcome = searched[queries[position]]
+                outcomes[position]["results"] = [dict(result) for result in outcome["results"]]
+                outcomes[position]["error"] = outcome["error"]
+        return outcomes
+
+    def _candidates(self, top_k: int) -> int:
+        """
+        Number of matches to fetch for a top-k result, more when they are reranked.
+        """
+        return max(top_k, self.rerank_candidates) if self.rerank else top_k
+
+    def _query(self, query: str, vec_embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Return the best matches of a query, from the vector store or fused with the BM25 ranking.
+        """
+        if self.mode == "dense":
+            return self.vector_manager.query_vectors(query_vector=vec_embedding, top_k=top_k)
+
+        candidates = max(top_k, self.hybrid_candidates)
+        dense = self.vector_manager.query_vectors(query_vector=vec_embedding, top_k=candidates)
+        with span("retriever.lexical"):
+            lexical = self.vector_manager.lexical_search(query, top_k=candidates)
+        fused = reciprocal_rank_fusion([[str(match["id"]) for match in dense], [key for key, _ in lexical]])[:top_k]
+
+        # Chunks found by BM25 only are fetched from the store for their metadata
+        metadata = {match["id"]: match["metadata"] for match in dense}
+        missing = [key for key, _ in fused if key not in metadata]
+        if missing:
+            for key, vector in self.vector_manager.fetch_vectors(missing).items():
+                metadata[key] = vector["metadata"]
+        return [{"id": key, "score": score, "metadata": metadata[key]} for key, score in fused if key in metadata]
+
+    @staticmethod
+    def _format_matches(matches: List[Any]) -> List[dict]:
+        """
+        Keep the ID, score and text of each vector store match, and the source and character span of
+        the chunk when they are known, which lets the prompt merge overlapping chunks.
+        """
+        documents = []
+        for match in matches:
+            metadata = match["metadata"]
+            document = {"id": match["id"], "score": float(match["score"]), "text": metadata.get("text", "")}
+            document.update((key, metadata[key]) for key in SPAN_KEYS if key in metadata)
+            documents.append(document)
+        return documents
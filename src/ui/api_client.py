@@ -1,23 +1,204 @@
 from api.schemas import GenerateRequest, GenerateResponse, Document
+import asyncio
+import gzip
+import json
+import random
+import httpx
 import requests
-from typing import List
+from requests.adapters import HTTPAdapter
+from typing import Any, AsyncIterator, Collection, Dict, Iterable, Iterator, List, Optional, Tuple, TypedDict
+from urllib3.util.retry import Retry
+from utils.tracing import TRACE_HEADER, get_trace_id, new_trace_id, span
+from ui.config import (
+    API_POOL_SIZE,
+    API_CONNECT_TIMEOUT,
+    API_READ_TIMEOUT,
+    API_MAX_RETRIES,
+    API_BACKOFF_FACTOR,
+    API_BACKOFF_JITTER,
+    API_RETRY_STATUSES,
+    API_COMPRESS,
+    API_COMPRESS_MIN_BYTES,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library encoder is used without it
+    orjson = None
+
+
+class _RetryOptions(TypedDict):
+    """
+    Keyword arguments of urllib3's Retry shared by all urllib3 versions.
+    """
+
+    total: int
+    connect: int
+    read: int
+    status: int
+    backoff_factor: float
+    status_forcelist: Collection[int]
+    allowed_methods: Optional[Collection[str]]
+    raise_on_status: bool
+
+
+def encode_payload(data: Dict[str, Any], compress: bool = API_COMPRESS) -> Tuple[bytes, Dict[str, str]]:
+    """
+    Serialize a request payload, with orjson when it is installed, and gzip it if it is large enough.
+
+    Args:
+        data (Dict[str, Any]): The payload.
+        compress (bool): Whether bodies of at least API_COMPRESS_MIN_BYTES are gzipped.
+
+    Returns:
+        Tuple[bytes, Dict[str, str]]: The body and the headers describing it.
+    """
+    body = orjson.dumps(data) if orjson is not None else json.dumps(data, separators=(",", ":")).encode("utf-8")
+    headers = {"Content-Type": "application/json"}
+    if compress and len(body) >= API_COMPRESS_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
+
+
+def decode_json(content: bytes) -> Any:
+    """
+    Parse a JSON response body, with orjson when it is installed.
+    """
+    return orjson.loads(content) if orjson is not None else json.loads(content)
+
+
+def backoff_delay(
+    attempt: int, backoff_factor: float = API_BACKOFF_FACTOR, jitter: float = API_BACKOFF_JITTER
+) -> float:
+    """
+    Return the delay before retry number `attempt` (starting at 0): exponential backoff plus random jitter,
+    so that clients failing together do not retry together.
+    """
+    return backoff_factor * (2**attempt) + random.uniform(0, jitter)
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[Tuple[str, Dict]]:
+    """
+    Parse a stream of server-sent event lines.
+
+    Args:
+        lines (Iterable[str]): The decoded lines of the response body.
+
+    Yields:
+        Tuple[str, Dict]: The event name ("message" when unnamed) and its JSON data.
+    """
+    event = "message"
+    data: List[str] = []
+    for line in lines:
+        if not line:
+            if data:
+                yield event, json.loads("\n".join(data))
+            event, data = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            data.append(line[len("data:") :].strip())
+    if data:
+        yield event, json.loads("\n".join(data))
+
+
+def build_payload(query: str, documents: List[dict], temperature: float, max_tokens: int) -> Dict[str, Any]:
+    """
+    Build the body of a generate-response request.
+    """
+    payload = GenerateRequest(
+        query=query,
+        documents=[
+            Document(
+                text=doc["text"],
+                source=doc.get("source"),
+                start_index=doc.get("start_index"),
+                end_index=doc.get("end_index"),
+            )
+            for doc in documents
+        ],
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    return payload.model_dump()
 
 
 class APIClient:
     """
     A client class to interact with the backend API endpoints.
+
+    Requests share a pooled keep-alive session. Failed connections and 502/503 responses are
+    retried with jittered exponential backoff. The backend endpoints have no side effects, so POSTs
+    are retried as well. Read timeouts and 504 responses are not retried, since the backend may
+    already have spent a full LLM timeout on the request.
     """
 
-    def __init__(self, base_url: str):
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = API_POOL_SIZE,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = API_READ_TIMEOUT,
+        max_retries: int = API_MAX_RETRIES,
+        backoff_factor: float = API_BACKOFF_FACTOR,
+        backoff_jitter: float = API_BACKOFF_JITTER,
+        compress: bool = API_COMPRESS,
+    ):
         """
         Initialize the API client with a base URL.
 
         Args:
             base_url (str): The base URL for the API endpoints.
+            pool_size (int): Number of keep-alive connections kept open to the backend.
+            connect_timeout (float): Seconds to establish a connection.
+            read_timeout (float): Seconds to wait for the response, or for the next streamed event.
+            max_retries (int): Maximum number of retries of a request.
+            backoff_factor (float): Base of the exponential backoff between retries, in seconds.
+            backoff_jitter (float): Maximum random delay added to each backoff, in seconds.
+            compress (bool): Whether large request bodies are gzipped.
         """
         self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.compress = compress
 
-    def generate_response(self, query: str, documents: List[dict], temperature: float, max_tokens: int) -> str:
+        retry_options = _RetryOptions(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=API_RETRY_STATUSES,
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+        try:
+            retry = Retry(backoff_jitter=backoff_jitter, **retry_options)
+        except TypeError:  # urllib3 < 2 has no jitter
+            retry = Retry(**retry_options)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def close(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        self.session.close()
+
+    def _post(
+        self, path: str, data: Dict[str, Any], stream: bool = False, trace_id: Optional[str] = None
+    ) -> requests.Response:
+        body, headers = encode_payload(data, compress=self.compress)
+        headers[TRACE_HEADER] = trace_id or get_trace_id() or new_trace_id()
+        return self.session.post(
+            f"{self.base_url}{path}", data=body, headers=headers, timeout=self.timeout, stream=stream
+        )
+
+    def generate_response(
+        self, query: str, documents: List[dict], temperature: float, max_tokens: int, trace_id: Optional[str] = None
+    ) -> str:
         """
         Send a request to the backend to generate a response based on a query and retrieved documents,
         specifying the temperature and max_tokens for the language model.
@@ -27,25 +208,177 @@ class APIClient:
             documents (List[dict]): A list of documents (text segments) retrieved from the vector database.
             temperature (float): The creativity parameter for the LM's responses.
             max_tokens (int): The maximum number of tokens for the LM's response.
+            trace_id (Optional[str]): Trace ID sent to the backend. Defaults to the current trace.
 
         Returns:
             str: The generated response from the backend.
         """
-        payload = GenerateRequest(
-            query=query,
-            documents=[Document(text=doc["text"]) for doc in documents],
-            temperature=temperature,
-            max_tokens=max_tokens,
-        )
-
         # Add temperature and max_tokens to the request payload
-        payload_data = payload.model_dump()
+        payload_data = build_payload(query, documents, temperature, max_tokens)
 
-        response = requests.post(f"{self.base_url}/generate-response", json=payload_data)
+        with span("api_client.generate_response"):
+            response = self._post("/generate-response", payload_data, trace_id=trace_id)
 
         if response.status_code != 200:
             raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
 
-        data = response.json()
+        data = decode_json(response.content)
         result = GenerateResponse(**data)
         return result.response
+
+    def stream_response(
+        self, query: str, documents: List[dict], temperature: float, max_tokens: int, trace_id: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Ask the backend to stream a response, yielding text fragments as the model produces them.
+
+        Args:
+            query (str): The user's query.
+            documents (List[dict]): A list of documents (text segments) retrieved from the vector database.
+            temperature (float): The creativity parameter for the LM's responses.
+            max_tokens (int): The maximum number of tokens for the LM's response.
+            trace_id (Optional[str]): Trace ID sent to the backend. Defaults to the current trace.
+
+        Yields:
+            str: The next fragment of the response.
+
+        Raises:
+            ValueError: If the request fails or the backend reports an error during generation.
+        """
+        payload_data = build_payload(query, documents, temperature, max_tokens)
+
+        with span("api_client.stream_response"), self._post(
+            "/generate-response/stream", payload_data, stream=True, trace_id=trace_id
+        ) as response:
+            if response.status_code != 200:
+                raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
+
+            lines = (
+                line.decode("utf-8") if isinstance(line, bytes) else line
+                for line in response.iter_lines(decode_unicode=True)
+            )
+            for event, data in iter_sse_events(lines):
+                if event == "error":
+                    raise ValueError(data.get("detail", "Streaming failed"))
+                if event == "done":
+                    return
+                yield data.get("token", "")
+
+
+class AsyncAPIClient:
+    """
+    Async variant of APIClient on a pooled httpx.AsyncClient, with the same timeouts and retry policy.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        pool_size: int = API_POOL_SIZE,
+        connect_timeout: float = API_CONNECT_TIMEOUT,
+        read_timeout: float = API_READ_TIMEOUT,
+        max_retries: int = API_MAX_RETRIES,
+        backoff_factor: float = API_BACKOFF_FACTOR,
+        backoff_jitter: float = API_BACKOFF_JITTER,
+        compress: bool = API_COMPRESS,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        """
+        Initialize the async API client with a base URL.
+
+        Args:
+            base_url (str): The base URL for the API endpoints.
+            pool_size (int): Number of keep-alive connections kept open to the backend.
+            connect_timeout (float): Seconds to establish a connection.
+            read_timeout (float): Seconds to wait for the response, or for the next streamed event.
+            max_retries (int): Maximum number of retries of a request.
+            backoff_factor (float): Base of the exponential backoff between retries, in seconds.
+            backoff_jitter (float): Maximum random delay added to each backoff, in seconds.
+            compress (bool): Whether large request bodies are gzipped.
+            transport (Optional[httpx.AsyncBaseTransport]): Custom transport, mainly for tests.
+        """
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.compress = compress
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+            limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            transport=transport,
+        )
+
+    async def aclose(self) -> None:
+        """
+        Close the pooled connections.
+        """
+        await self.client.aclose()
+
+    async def __aenter__(self) -> "AsyncAPIClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def _send(
+        self, path: str, data: Dict[str, Any], stream: bool = False, trace_id: Optional[str] = None
+    ) -> httpx.Response:
+        """
+        POST a payload, retrying failed connections and retryable statuses with jittered backoff.
+        """
+        body, headers = encode_payload(data, compress=self.compress)
+        headers[TRACE_HEADER] = trace_id or get_trace_id() or new_trace_id()
+        request = self.client.build_request("POST", f"{self.base_url}{path}", content=body, headers=headers)
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = await self.client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt == self.max_retries:
+                    raise
+            else:
+                if response.status_code not in API_RETRY_STATUSES or attempt == self.max_retries:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(backoff_delay(attempt, self.backoff_factor, self.backoff_jitter))
+        raise RuntimeError("unreachable")
+
+    async def generate_response(
+        self, query: str, documents: List[dict], temperature: float, max_tokens: int, trace_id: Optional[str] = None
+    ) -> str:
+        """
+        Async version of APIClient.generate_response.
+        """
+        payload_data = build_payload(query, documents, temperature, max_tokens)
+        with span("api_client.generate_response"):
+            response = await self._send("/generate-response", payload_data, trace_id=trace_id)
+        if response.status_code != 200:
+            raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
+        return GenerateResponse(**decode_json(response.content)).response
+
+    async def stream_response(
+        self, query: str, documents: List[dict], temperature: float, max_tokens: int, trace_id: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async version of APIClient.stream_response.
+        """
+        payload_data = build_payload(query, documents, temperature, max_tokens)
+        with span("api_client.stream_response"):
+            response = await self._send("/generate-response/stream", payload_data, stream=True, trace_id=trace_id)
+            try:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise ValueError(f"API request failed with status {response.status_code}: {response.text}")
+
+                lines = []
+                async for line in response.aiter_lines():
+                    lines.append(line)
+                    if line:
+                        continue
+                    for event, data in iter_sse_events(lines):
+                        if event == "error":
+                            raise ValueError(data.get("detail", "Streaming failed"))
+                        if event == "done":
+                            return
+                        yield data.get("token", "")
+                    lines = []
+            finally:
+                await response.aclose()
@@ -1,10 +1,11 @@
 import shutil
 import os
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 from ui.api_client import APIClient
 from ui.llm_config import LLMConfig
-from vector_database.vector_manager import VectorManager
 from retriever.retriever import Retriever
+from utils.tracing import new_trace_id, trace_context
+from utils.registry import get_vector_manager
 import logging
 from utils.logger import setup_logger
 
@@ -30,8 +31,9 @@ class ChatbotInterface:
         retriever, API client, and default LLM configuration.
         """
         chatbot_logger.info("Initializing ChatbotInterface...")
-        self.vector_manager = VectorManager("data/raw/")
-        self.retriever = Retriever()
+        # The vector manager and the embedding model are shared with the retriever
+        self.vector_manager = get_vector_manager()
+        self.retriever = Retriever(vector_manager=self.vector_manager)
         self.api_client = APIClient(os.getenv("api_service_address", "http://localhost:8080/api"))
         self.llm_config = LLMConfig()
         chatbot_logger.info("ChatbotInterface initialized.")
@@ -71,13 +73,17 @@ class ChatbotInterface:
         Returns:
             Tuple[str, str]: The retrieved context and the bot's generated response.
         """
-        chatbot_logger.info("Chatbot interaction started with query: %s", query)
         try:
-            retrieved_docs = self.retriever.retrieve(query)
-            documents_for_api = [{"text": doc["text"]} for doc in retrieved_docs]
-            response = self.api_client.generate_response(
-                query, documents_for_api, temperature=self.llm_config.temperature, max_tokens=self.llm_config.max_tokens
-            )
+            # The trace ID follows the request to the API service, so both sides' spans can be matched
+            with trace_context() as trace_id:
+                chatbot_logger.info("Chatbot interaction %s started with query: %s", trace_id, query)
+                retrieved_docs = self.retriever.retrieve(query)
+                response = self.api_client.generate_response(
+                    query,
+                    retrieved_docs,
+                    temperature=self.llm_config.temperature,
+                    max_tokens=self.llm_config.max_tokens,
+                )
 
             context = "\n\n".join([doc["text"] for doc in retrieved_docs])
             chatbot_logger.info("Chatbot interaction completed.")
@@ -86,6 +92,41 @@ class ChatbotInterface:
             chatbot_logger.error("An error occurred during chatbot interaction: %s", e)
             return "", f"An error occurred: {e}"
 
+    def chat_with_bot_stream(self, query: str) -> Iterator[Tuple[str, str]]:
+        """
+        Chat with the bot like `chat_with_bot`, but yield the response as it is generated
+        so the frontend can display it incrementally.
+
+        Args:
+            query (str): The user's query.
+
+        Yields:
+            Tuple[str, str]: The retrieved context and the response generated so far.
+        """
+        trace_id = new_trace_id()
+        chatbot_logger.info("Streaming chatbot interaction %s started with query: %s", trace_id, query)
+        context, response = "", ""
+        try:
+            # The context is not held across yields, since Gradio may resume the generator elsewhere
+            with trace_context(trace_id):
+                retrieved_docs = self.retriever.retrieve(query)
+            context = "\n\n".join([doc["text"] for doc in retrieved_docs])
+            yield context, response
+
+            for token in self.api_client.stream_response(
+                query,
+                retrieved_docs,
+                temperature=self.llm_config.temperature,
+                max_tokens=self.llm_config.max_tokens,
+                trace_id=trace_id,
+            ):
+                response += token
+                yield context, response
+            chatbot_logger.info("Streaming chatbot interaction completed.")
+        except Exception as e:
+            chatbot_logger.error("An error occurred during chatbot interaction: %s", e)
+            yield context, f"{response}\n\nAn error occurred: {e}" if response else f"An error occurred: {e}"
+
     def clear_index_and_raw_folder(self) -> str:
         """
         Clear all vectors stored in the vector database and remove the files in /data/raw.
@@ -97,7 +138,7 @@ class ChatbotInterface:
         chatbot_logger.info("Clearing index and raw folder...")
         try:
             self.vector_manager.delete_index()
-            self.vector_manager.client.create_index(self.vector_manager.index_name, self.vector_manager.dimensions)
+            self.vector_manager.create_index()
 
             raw_folder = "data/raw"
             if os.path.exists(raw_folder):
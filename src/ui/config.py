@@ -0,0 +1,13 @@
+import os
+
+# HTTP connection from the Gradio app to the API service
+API_POOL_SIZE = 10  # Keep-alive connections per host
+API_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+API_READ_TIMEOUT = 120.0  # Seconds to wait for the response (or the next streamed token)
+API_MAX_RETRIES = 3  # Retries of failed connections and retryable statuses
+API_BACKOFF_FACTOR = 0.5  # Base of the exponential backoff between retries, in seconds
+API_BACKOFF_JITTER = 0.25  # Maximum random delay added to each backoff, in seconds
+# Statuses returned before the backend did any work. Not 504: the API returns it after a timed-out LLM call
+API_RETRY_STATUSES = (502, 503)
+API_COMPRESS = os.getenv("API_COMPRESS", "false").lower() == "true"  # Gzip large request bodies
+API_COMPRESS_MIN_BYTES = 1024  # Smaller bodies are sent uncompressed
@@ -1,5 +1,6 @@
 import gradio as gr
 from ui.chatbot import ChatbotInterface
+from data_ingestion.ingestion_pipeline import supported_extensions
 from utils.logger import setup_logger
 import logging
 
@@ -51,7 +52,9 @@ class Frontend:
                     with gr.Row():
                         with gr.Column():
                             uploaded_files = gr.File(
-                                label="Upload Documents (PDF)", file_types=[".pdf"], file_count="multiple"
+                                label="Upload Documents (PDF, DOCX, HTML, TXT)",
+                                file_types=supported_extensions(),
+                                file_count="multiple",
                             )
                             process_button = gr.Button("Process & Store Documents")
                             process_output = gr.Textbox(label="Processing Status", interactive=False)
@@ -91,8 +94,9 @@ class Frontend:
                             with gr.Accordion("Click to view retrieved context", open=False):
                                 context_display = gr.Textbox(label="Context", lines=20, interactive=False)
 
+                    # The response is streamed into the textbox as the model generates it
                     chat_button.click(
-                        self.chatbot_interface.chat_with_bot,
+                        self.chatbot_interface.chat_with_bot_stream,
                         inputs=[query_input],
                         outputs=[context_display, response_output],
                     )
@@ -149,7 +153,7 @@ class Frontend:
                         This is a Retrieval-Augmented Generation (RAG) demo application.
                         
                         **How it works:**
-                        1. **Upload Documents:** Add your PDF documents to build a vector database.
+                        1. **Upload Documents:** Add your PDF, Word, HTML or text documents to build a vector database.
                         2. **Process & Store:** The application extracts embeddings and stores them.
                         3. **Ask Questions:** The LLM retrieves relevant context from the vector store and answers.
                         
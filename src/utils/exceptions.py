@@ -0,0 +1,4 @@
+class SingleFlightTimeoutError(TimeoutError):
+    """Raised when a coalesced call does not complete within the timeout of its key."""
+
+    pass
@@ -0,0 +1,32 @@
+import hashlib
+
+
+def hash_file(file_path: str, block_size: int = 1 << 20) -> str:
+    """
+    Compute the SHA-256 digest of a file's content.
+
+    Args:
+        file_path (str): The path to the file.
+        block_size (int): Number of bytes read at a time.
+
+    Returns:
+        str: The hexadecimal digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text: str) -> str:
+    """
+    Compute the SHA-256 digest of a chunk of text.
+
+    Args:
+        text (str): The text to hash.
+
+    Returns:
+        str: The hexadecimal digest of the text.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
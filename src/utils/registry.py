@@ -0,0 +1,92 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+# Shared, lazily built heavy resources (models, clients), one per configuration
+_instances: Dict[Hashable, Any] = {}
+_lock = threading.Lock()
+
+
+def get_shared(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """
+    Return the shared instance registered under a key, building it on first use.
+
+    Args:
+        key (Hashable): Identifies the resource and its configuration.
+        factory (Callable[[], Any]): Builds the resource.
+
+    Returns:
+        Any: The shared instance.
+    """
+    instance = _instances.get(key)
+    if instance is None:
+        with _lock:
+            instance = _instances.get(key)
+            if instance is None:
+                instance = factory()
+                _instances[key] = instance
+    return instance
+
+
+def get_embedding_generator(model_name: str = "") -> Any:
+    """
+    Return the process-wide EmbeddingGenerator of a model, loading the model once.
+
+    Args:
+        model_name (str): Name of the Sentence Transformers model, or "" for the default model.
+
+    Returns:
+        EmbeddingGenerator: The shared embedding generator.
+    """
+    # Imported lazily to keep this module free of heavy and circular imports
+    from embeddings.config import DEFAULT_MODEL_NAME
+    from embeddings.embedding_generator import EmbeddingGenerator
+
+    model_name = model_name or DEFAULT_MODEL_NAME
+    return get_shared(("embedding_generator", model_name), lambda: EmbeddingGenerator(model_name))
+
+
+def get_vector_manager(index_name: str = "", namespace: str = "") -> Any:
+    """
+    Return the process-wide VectorManager of an index namespace, connecting to the store once.
+
+    Args:
+        index_name (str): Name of the index, or "" for the default index.
+        namespace (str): Namespace of the vectors, or "" for the default namespace.
+
+    Returns:
+        VectorManager: The shared vector manager.
+    """
+    from vector_database.config import DEFAULT_INDEX_NAME, NAMESPACE
+    from vector_database.vector_manager import VectorManager
+
+    index_name = index_name or DEFAULT_INDEX_NAME
+    namespace = namespace or NAMESPACE
+    return get_shared(
+        ("vector_manager", index_name, namespace),
+        lambda: VectorManager("", index_name=index_name, namespace=namespace),
+    )
+
+
+def get_reranker(model_name: str = "") -> Any:
+    """
+    Return the process-wide CrossEncoderReranker of a model, loading the model once.
+
+    Args:
+        model_name (str): Name of the cross-encoder, or "" for the default model.
+
+    Returns:
+        CrossEncoderReranker: The shared reranker.
+    """
+    from retriever.config import RERANK_MODEL
+    from retriever.reranker import CrossEncoderReranker
+
+    model_name = model_name or RERANK_MODEL
+    return get_shared(("reranker", model_name), lambda: CrossEncoderReranker(model_name))
+
+
+def reset_registry() -> None:
+    """
+    Forget every shared instance.
+    """
+    with _lock:
+        _instances.clear()
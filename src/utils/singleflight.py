@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+from utils.exceptions import SingleFlightTimeoutError
+from utils.tracing import metrics
+
+T = TypeVar("T")
+
+
+def _count(name: str, role: str) -> None:
+    metrics.increment(
+        "singleflight_calls_total",
+        help_text="Calls run (leader), joined (follower) or timed out.",
+        operation=name,
+        role=role,
+    )
+
+
+class _Call:
+    """
+    A computation in flight, shared by the threads asking for the same key.
+    """
+
+    def __init__(self, deadline: Optional[float]):
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls for the same key into one computation, across threads.
+
+    The first caller of a key (the leader) runs the function; callers arriving while it runs (followers)
+    wait for it and get its result, or its exception. A key's flight has a timeout, counted from its
+    start: followers stop waiting at the deadline with SingleFlightTimeoutError, and later callers
+    start a new flight instead of joining one that is stuck. The leader itself runs to completion.
+    """
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        """
+        Args:
+            name (str): Name of the coalesced operation, labelling its metrics.
+            timeout (Optional[float]): Default seconds a flight may take, or None to wait without limit.
+        """
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, function: Callable[[], T], timeout: Optional[float] = None) -> T:
+        """
+        Return the result of `function`, shared with the concurrent calls of the same key.
+
+        Args:
+            key (Hashable): Identifies the computation; calls with equal keys are coalesced.
+            function (Callable[[], T]): Computes the result.
+            timeout (Optional[float]): Seconds the flight of this key may take, `self.timeout` when None.
+
+        Returns:
+            T: The result of the flight. It is shared, so callers must not modify it.
+
+        Raises:
+            SingleFlightTimeoutError: If the flight joined does not complete within its timeout.
+            Exception: Whatever the function of the flight raised.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        with self._lock:
+            now = time.monotonic()
+            call = self._calls.get(key)
+            leader = call is None or (call.deadline is not None and call.deadline <= now)
+            if call is None or leader:
+                call = _Call(now + timeout if timeout else None)
+                self._calls[key] = call
+        _count(self.name, "leader" if leader else "follower")
+
+        if leader:
+            try:
+                call.result = function()
+                return call.result
+            except BaseException as e:
+                call.error = e
+                raise
+            finally:
+                with self._lock:
+                    if self._calls.get(key) is call:
+                        del self._calls[key]
+                call.done.set()
+
+        remaining = None if call.deadline is None else max(0.0, call.deadline - time.monotonic())
+        if not call.done.wait(remaining):
+            _count(self.name, "timeout")
+            raise SingleFlightTimeoutError(f"{self.name} for {key!r} did not complete within {timeout} seconds")
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+
+class _AsyncCall:
+    """
+    A task in flight, shared by the coroutines asking for the same key.
+    """
+
+    def __init__(self, task: "asyncio.Future[Any]", deadline: Optional[float]):
+        self.task = task
+        self.deadline = deadline
+        self.waiters = 0
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent awaits for the same key into one task, on one event loop.
+
+    Like SingleFlight, except that the shared work runs as a task that no single caller owns: a caller
+    that is cancelled or times out stops waiting without cancelling it for the others, and the task is
+    cancelled once no caller waits for it anymore. A flight past its deadline is thus cancelled once
+    its callers time out.
+    """
+
+    def __init__(self, name: str, timeout: Optional[float] = None):
+        """
+        Args:
+            name (str): Name of the coalesced operation, labelling its metrics.
+            timeout (Optional[float]): Default seconds a flight may take, or None to wait without limit.
+        """
+        self.name = name
+        self.timeout = timeout
+        self._calls: Dict[Hashable, _AsyncCall] = {}
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        """
+        Await the result of `factory()`, shared with the concurrent awaits of the same key.
+
+        Args:
+            key (Hashable): Identifies the computation; awaits with equal keys are coalesced.
+            factory (Callable[[], Awaitable[T]]): Starts the computation; only called by the leader.
+            timeout (Optional[float]): Seconds the flight of this key may take, `self.timeout` when None.
+
+        Returns:
+            T: The result of the flight. It is shared, so callers must not modify it.
+
+        Raises:
+            SingleFlightTimeoutError: If the flight does not complete within its timeout.
+            Exception: Whatever the computation of the flight raised.
+        """
+        waiter, _ = self.join(key, factory, timeout)
+        return await waiter
+
+    def join(
+        self, key: Hashable, factory: Callable[[], Awaitable[T]], timeout: Optional[float] = None
+    ) -> Tuple[Awaitable[T], bool]:
+        """
+        Join the flight of a key, starting it if there is none, without waiting for it.
+
+        Lets the leader follow its computation by other means, such as a stream of partial results,
+        while it waits. The returned awaitable must be awaited, or wrapped in a task and cancelled.
+
+        Args:
+            key (Hashable): Identifies the computation; awaits with equal keys are coalesced.
+            factory (Callable[[], Awaitable[T]]): Starts the computation; only called by the leader.
+            timeout (Optional[float]): Seconds the flight of this key may take, `self.timeout` when None.
+
+        Returns:
+            Tuple[Awaitable[T], bool]: The awaitable result of the flight, as `do` returns it, and whether
+            this caller started the flight.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        now = time.monotonic()
+        call = self._calls.get(key)
+        leader = call is None or call.task.done() or (call.deadline is not None and call.deadline <= now)
+        if call is None or leader:
+            started = _AsyncCall(asyncio.ensure_future(factory()), now + timeout if timeout else None)
+
+            def forget(_: "asyncio.Future[Any]") -> None:
+                self._forget(key, started)
+
+            self._calls[key] = call = started
+            started.task.add_done_callback(forget)
+        _count(self.name, "leader" if leader else "follower")
+        return self._wait(key, call, timeout), leader
+
+    async def _wait(self, key: Hashable, call: _AsyncCall, timeout: Optional[float]) -> Any:
+        call.waiters += 1
+        try:
+            remaining = None if call.deadline is None else max(0.0, call.deadline - time.monotonic())
+            return await asyncio.wait_for(asyncio.shield(call.task), remaining)
+        except asyncio.TimeoutError:
+            if call.task.done() and not call.task.cancelled():
+                # The computation itself raised the timeout
+                raise
+            _count(self.name, "timeout")
+            raise SingleFlightTimeoutError(f"{self.name} for {key!r} did not complete within {timeout} seconds")
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+                self._forget(key, call)
+
+    def _forget(self, key: Hashable, call: _AsyncCall) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
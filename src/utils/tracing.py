@@ -0,0 +1,237 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import logging
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+# Header carrying the trace ID across the HTTP hop between services
+TRACE_HEADER = "X-Trace-Id"
+
+# Upper bounds of the latency histogram buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+tracing_logger = logging.getLogger("tracing")
+
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def new_trace_id() -> str:
+    """
+    Generate a random trace ID.
+    """
+    return uuid.uuid4().hex
+
+
+def get_trace_id() -> Optional[str]:
+    """
+    Return the trace ID of the current context, or None outside of a trace.
+    """
+    return _trace_id.get()
+
+
+@contextmanager
+def trace_context(trace_id: Optional[str] = None) -> Iterator[str]:
+    """
+    Run a block under a trace ID, so that every span recorded inside it is attributed to that trace.
+
+    Args:
+        trace_id (Optional[str]): The trace to join, for example one received from another service.
+            A new trace is started when it is None.
+
+    Yields:
+        str: The trace ID.
+    """
+    trace_id = trace_id or new_trace_id()
+    token = _trace_id.set(trace_id)
+    try:
+        yield trace_id
+    finally:
+        _trace_id.reset(token)
+
+
+class Histogram:
+    """
+    Thread-safe cumulative histogram in the Prometheus style.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[list, float, int]:
+        """
+        Return the cumulative bucket counts (the last one being +Inf), the sum and the count.
+        """
+        with self._lock:
+            cumulative, total = [], 0
+            for count in self.counts:
+                total += count
+                cumulative.append(total)
+            return cumulative, self.sum, self.count
+
+
+class MetricsRegistry:
+    """
+    In-process store of labelled histograms and counters, rendered in the Prometheus text format.
+    """
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels: str) -> None:
+        """
+        Record a value in the histogram `name` with the given labels.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+        histogram.observe(value)
+
+    def increment(self, name: str, amount: float = 1.0, help_text: str = "", **labels: str) -> None:
+        """
+        Add `amount` to the counter `name` with the given labels.
+        """
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._help.setdefault(name, help_text)
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def get_histogram(self, name: str, **labels: str) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(name, {}).get(tuple(sorted(labels.items())))
+
+    def get_counter(self, name: str, **labels: str) -> float:
+        with self._lock:
+            return self._counters.get(name, {}).get(tuple(sorted(labels.items())), 0.0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._help.clear()
+
+    @staticmethod
+    def _format_labels(labels: Labels) -> str:
+        if not labels:
+            return ""
+        pairs = []
+        for name, value in labels:
+            value = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+            pairs.append(f'{name}="{value}"')
+        return "{" + ",".join(pairs) + "}"
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+        """
+        with self._lock:
+            histograms = {name: dict(series) for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            help_texts = dict(self._help)
+
+        lines = []
+        for name in sorted(histograms):
+            lines.append(f"# HELP {name} {help_texts.get(name) or name}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in sorted(histograms[name].items()):
+                cumulative, total, count = histogram.snapshot()
+                bounds = [f"{bound:g}" for bound in histogram.buckets] + ["+Inf"]
+                for bound, bucket_count in zip(bounds, cumulative):
+                    lines.append(f"{name}_bucket{self._format_labels(labels + (('le', bound),))} {bucket_count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {total:.6f}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {count}")
+        for name in sorted(counters):
+            lines.append(f"# HELP {name} {help_texts.get(name) or name}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in sorted(counters[name].items()):
+                lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of the current process
+metrics = MetricsRegistry()
+
+
+class Span:
+    """
+    Time a stage of a request and record its duration in the `span_duration_seconds` histogram.
+
+    Usable as a context manager or as a decorator of sync and async functions. Spans read the
+    current trace ID but never modify the context, so they can be held open across generator yields.
+
+    Example:
+        with Span("retriever.embed"):
+            embedding = model.encode(query)
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trace_id: Optional[str] = None
+        self.start = 0.0
+        self.duration = 0.0
+
+    def __enter__(self) -> "Span":
+        self.trace_id = get_trace_id()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.duration = time.perf_counter() - self.start
+        metrics.observe("span_duration_seconds", self.duration, "Duration of traced stages.", span=self.name)
+        if exc_type is not None and not issubclass(exc_type, GeneratorExit):
+            metrics.increment("span_errors_total", help_text="Traced stages that raised.", span=self.name)
+        tracing_logger.debug(
+            "trace=%s span=%s duration_ms=%.2f error=%s",
+            self.trace_id,
+            self.name,
+            self.duration * 1000,
+            exc_type.__name__ if exc_type else None,
+        )
+
+    def __call__(self, func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with Span(self.name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(self.name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
+def span(name: str) -> Span:
+    """
+    Shorthand for `Span(name)`, e.g. `with span("llm.generate"): ...` or `@span("retriever.retrieve")`.
+    """
+    return Span(name)
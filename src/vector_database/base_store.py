@@ -0,0 +1,69 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Union
+from vector_database.bulk_writer import BatchResult
+
+
+class VectorStore(ABC):
+    """Abstract base class for vector store backends."""
+
+    @abstractmethod
+    def create_index(self) -> None:
+        """
+        Create the index if it does not exist yet.
+        """
+        pass
+
+    @abstractmethod
+    def delete_index(self) -> None:
+        """
+        Delete the index and every vector it holds.
+        """
+        pass
+
+    @abstractmethod
+    def upsert_vectors(self, vectors: Iterable[Dict[str, Any]]) -> List[BatchResult]:
+        """
+        Insert or update vectors.
+
+        Args:
+            vectors (Iterable[Dict[str, Any]]): Dictionaries with 'id', 'values' and optional 'metadata' keys.
+
+        Returns:
+            List[BatchResult]: The outcome of every write batch.
+        """
+        pass
+
+    @abstractmethod
+    def query_vectors(self, query_vector: List[float], top_k: int = 5) -> List[Dict[str, Union[str, float]]]:
+        """
+        Return the `top_k` vectors most similar to the query vector.
+
+        Args:
+            query_vector (List[float]): The vector to query for similarity.
+            top_k (int): Number of most similar vectors to retrieve.
+
+        Returns:
+            List[Dict[str, Union[str, float]]]: Matches with 'id', 'score', 'metadata' and 'values' keys,
+            best first.
+        """
+        pass
+
+    @abstractmethod
+    def fetch_vectors(self, vector_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Fetch vectors by their IDs. Unknown IDs are left out of the result.
+        """
+        pass
+
+    @abstractmethod
+    def delete_vectors(self, vector_ids: List[str]) -> None:
+        """
+        Delete vectors by their IDs. Unknown IDs are ignored.
+        """
+        pass
+
+    def flush(self) -> None:
+        """
+        Persist pending changes. Remote backends write through and need not override it.
+        """
+        pass
@@ -0,0 +1,224 @@
+import os
+import re
+import threading
+from array import array
+from collections import Counter
+from typing import Dict, List, Tuple
+import numpy as np
+from vector_database.config import BM25_B, BM25_COMPACT_RATIO, BM25_K1
+from vector_database.exceptions import VectorStoreError
+
+# Words, and identifiers such as product codes or clause numbers kept whole ("ab-1234", "12.3.4")
+_TOKEN = re.compile(r"[^\W_]+(?:[._/-][^\W_]+)*")
+_PART = re.compile(r"[^\W_]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split a text into lowercase terms. Compound identifiers yield the whole identifier and its parts.
+    """
+    terms = []
+    for token in _TOKEN.findall(text.lower()):
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(_PART.findall(token))
+    return terms
+
+
+class BM25Index:
+    """
+    Incremental inverted index scoring documents with Okapi BM25.
+
+    The postings of each term are two compact arrays, the document rows (int32) and the term
+    frequencies (uint16), so adding a document appends to them. Deleted documents are only marked
+    dead until they exceed BM25_COMPACT_RATIO of the rows, then the postings are rewritten. Document
+    frequencies are counted over live rows at query time, and a query scores all the documents
+    containing its terms at once with NumPy.
+    """
+
+    def __init__(self, k1: float = BM25_K1, b: float = BM25_B):
+        """
+        Args:
+            k1 (float): Term frequency saturation.
+            b (float): Strength of the document length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self.clear()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.ids: List[str] = []
+            self._rows: Dict[str, int] = {}
+            self._lengths = array("i")
+            self._alive = bytearray()
+            self._total_length = 0
+            self._terms: Dict[str, Tuple[array, array]] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def add(self, key: str, text: str) -> None:
+        """
+        Index a document, replacing the previous version of the same key.
+
+        Args:
+            key (str): The vector ID of the document.
+            text (str): The text of the document.
+        """
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(key)
+            row = len(self.ids)
+            self.ids.append(key)
+            self._rows[key] = row
+            length = sum(counts.values())
+            self._lengths.append(length)
+            self._alive.append(1)
+            self._total_length += length
+            for term, count in counts.items():
+                postings = self._terms.get(term)
+                if postings is None:
+                    postings = self._terms[term] = (array("i"), array("H"))
+                postings[0].append(row)
+                postings[1].append(min(count, 0xFFFF))
+
+    def remove(self, keys: List[str]) -> None:
+        """
+        Delete documents. Unknown keys are ignored.
+        """
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+            if len(self.ids) - len(self._rows) > BM25_COMPACT_RATIO * max(len(self.ids), 1):
+                self._compact()
+
+    def _remove(self, key: str) -> None:
+        row = self._rows.pop(key, None)
+        if row is not None:
+            self._alive[row] = 0
+            self._total_length -= self._lengths[row]
+
+    def _compact(self) -> None:
+        """
+        Drop the rows of deleted documents from every posting list.
+        """
+        alive = np.frombuffer(bytes(self._alive), dtype=np.uint8).astype(bool)
+        new_rows = np.cumsum(alive) - 1
+        terms: Dict[str, Tuple[array, array]] = {}
+        for term, (rows, frequencies) in self._terms.items():
+            rows_np = np.frombuffer(rows, dtype=np.int32)
+            keep = alive[rows_np]
+            if keep.any():
+                terms[term] = (
+                    array("i", new_rows[rows_np[keep]].astype(np.int32).tobytes()),
+                    array("H", np.frombuffer(frequencies, dtype=np.uint16)[keep].tobytes()),
+                )
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)[alive]
+        self.ids = [key for key, keep in zip(self.ids, alive.tolist()) if keep]
+        self._rows = {key: row for row, key in enumerate(self.ids)}
+        self._lengths = array("i", lengths.tobytes())
+        self._alive = bytearray(b"\x01" * len(self.ids))
+        self._terms = terms
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Return the documents with the highest BM25 scores for a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int): Number of documents to return.
+
+        Returns:
+            List[Tuple[str, float]]: Keys and scores, best first. Documents sharing no term with the
+            query are not returned.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            num_documents = len(self._rows)
+            if not num_documents or top_k <= 0:
+                return []
+            alive = np.frombuffer(self._alive, dtype=np.uint8)
+            lengths = np.frombuffer(self._lengths, dtype=np.int32)
+            average_length = max(self._total_length / num_documents, 1e-9)
+            all_rows, all_scores = [], []
+            for term in terms:
+                postings = self._terms.get(term)
+                if postings is None:
+                    continue
+                rows = np.frombuffer(postings[0], dtype=np.int32)
+                live = alive[rows].astype(bool)
+                rows = rows[live]
+                if not len(rows):
+                    continue
+                frequencies = np.frombuffer(postings[1], dtype=np.uint16)[live].astype(np.float32)
+                idf = np.log1p((num_documents - len(rows) + 0.5) / (len(rows) + 0.5))
+                norms = self.k1 * (1.0 - self.b + self.b * lengths[rows] / average_length)
+                all_rows.append(rows)
+                all_scores.append(idf * frequencies * (self.k1 + 1.0) / (frequencies + norms))
+            if not all_rows:
+                return []
+            rows = np.concatenate(all_rows)
+            scores = np.bincount(rows, weights=np.concatenate(all_scores), minlength=len(self.ids))
+            candidates = np.unique(rows)
+            scores = scores[candidates]
+            if top_k < len(candidates):
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+                candidates, scores = candidates[best], scores[best]
+            order = np.argsort(-scores, kind="stable")
+            return [(self.ids[row], float(score)) for row, score in zip(candidates[order].tolist(), scores[order])]
+
+    def save(self, path: str) -> None:
+        """
+        Atomically write the index to a .npz file, with the postings of all terms in contiguous arrays.
+        """
+        with self._lock:
+            if len(self.ids) > len(self._rows):
+                self._compact()
+            terms = list(self._terms)
+            offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+            offsets[1:] = np.cumsum([len(self._terms[term][0]) for term in terms])
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp.npz"
+            np.savez(
+                tmp_path,
+                ids=np.array(self.ids, dtype=str),
+                lengths=np.frombuffer(self._lengths, dtype=np.int32),
+                terms=np.array(terms, dtype=str),
+                offsets=offsets,
+                rows=np.frombuffer(b"".join(self._terms[term][0].tobytes() for term in terms), dtype=np.int32),
+                frequencies=np.frombuffer(b"".join(self._terms[term][1].tobytes() for term in terms), dtype=np.uint16),
+            )
+            os.replace(tmp_path, path)
+
+    def load(self, path: str) -> None:
+        """
+        Replace the index with the one saved in a .npz file. A missing file yields an empty index.
+
+        Raises:
+            VectorStoreError: If the file cannot be read.
+        """
+        with self._lock:
+            self.clear()
+            if not os.path.isfile(path):
+                return
+            try:
+                with np.load(path) as data:
+                    ids, lengths, terms = data["ids"].tolist(), data["lengths"], data["terms"].tolist()
+                    offsets, rows, frequencies = data["offsets"], data["rows"], data["frequencies"]
+            except Exception as e:
+                raise VectorStoreError(f"Failed to load BM25 index '{path}': {e}")
+            self.ids = ids
+            self._rows = {key: row for row, key in enumerate(ids)}
+            self._lengths = array("i", lengths.astype(np.int32).tobytes())
+            self._alive = bytearray(b"\x01" * len(ids))
+            self._total_length = int(lengths.sum())
+            for term, start, end in zip(terms, offsets[:-1].tolist(), offsets[1:].tolist()):
+                self._terms[term] = (
+                    array("i", rows[start:end].astype(np.int32).tobytes()),
+                    array("H", frequencies[start:end].astype(np.uint16).tobytes()),
+                )
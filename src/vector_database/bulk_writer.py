@@ -0,0 +1,161 @@
+import json
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from vector_database.config import (
+    NAMESPACE,
+    UPSERT_BACKOFF_SECONDS,
+    UPSERT_BATCH_SIZE,
+    UPSERT_MAX_BATCH_BYTES,
+    UPSERT_MAX_RETRIES,
+    UPSERT_MAX_WORKERS,
+)
+
+
+@dataclass
+class BatchResult:
+    """
+    Outcome of the upsert of a single batch.
+    """
+
+    batch_index: int
+    size: int
+    payload_bytes: int
+    attempts: int
+    success: bool
+    elapsed: float
+    error: Optional[str] = None
+
+
+class BulkUpsertWriter:
+    """
+    Writes vectors to an index in bounded batches, several batches at a time, retrying failed batches.
+
+    The index can be any object exposing `upsert(vectors=..., namespace=...)`, such as a Pinecone index.
+    """
+
+    def __init__(
+        self,
+        index: Any,
+        namespace: str = NAMESPACE,
+        batch_size: int = UPSERT_BATCH_SIZE,
+        max_batch_bytes: int = UPSERT_MAX_BATCH_BYTES,
+        max_workers: int = UPSERT_MAX_WORKERS,
+        max_retries: int = UPSERT_MAX_RETRIES,
+        backoff_seconds: float = UPSERT_BACKOFF_SECONDS,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initialize the writer.
+
+        Args:
+            index (Any): The index to write to.
+            namespace (str): Namespace under which the vectors are stored.
+            batch_size (int): Maximum number of vectors per upsert request.
+            max_batch_bytes (int): Maximum estimated JSON payload size of an upsert request.
+            max_workers (int): Maximum number of upsert requests in flight.
+            max_retries (int): Number of retries of a failed batch before giving up.
+            backoff_seconds (float): Base delay of the exponential backoff between retries.
+            sleep (Callable[[float], None]): Function used to wait between retries.
+        """
+        if batch_size < 1 or max_workers < 1:
+            raise ValueError("batch_size and max_workers must be at least 1.")
+        self.index = index
+        self.namespace = namespace
+        self.batch_size = batch_size
+        self.max_batch_bytes = max_batch_bytes
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.sleep = sleep
+
+    @staticmethod
+    def estimate_size(vector: Dict[str, Any]) -> int:
+        """
+        Estimate the size of a vector once serialized in an upsert request.
+
+        Args:
+            vector (Dict[str, Any]): The vector entry.
+
+        Returns:
+            int: The size of its compact JSON encoding, in bytes.
+        """
+        return len(json.dumps(vector, separators=(",", ":"), default=str).encode("utf-8"))
+
+    def iter_batches(self, vectors: Iterable[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+        """
+        Group vectors into batches bounded by count and by payload size.
+
+        A vector larger than the payload limit on its own is sent alone.
+
+        Args:
+            vectors (Iterable[Dict[str, Any]]): The vectors to group.
+
+        Yields:
+            List[Dict[str, Any]]: Consecutive batches of vectors.
+        """
+        for batch, _ in self._iter_sized_batches(vectors):
+            yield batch
+
+    def _iter_sized_batches(self, vectors: Iterable[Dict[str, Any]]) -> Iterator[Tuple[List[Dict[str, Any]], int]]:
+        """
+        Group vectors like `iter_batches`, yielding each batch with its estimated payload size, so that
+        the size of every vector is computed once.
+        """
+        batch: List[Dict[str, Any]] = []
+        batch_bytes = 0
+        for vector in vectors:
+            size = self.estimate_size(vector)
+            if batch and (len(batch) >= self.batch_size or batch_bytes + size > self.max_batch_bytes):
+                yield batch, batch_bytes
+                batch, batch_bytes = [], 0
+            batch.append(vector)
+            batch_bytes += size
+        if batch:
+            yield batch, batch_bytes
+
+    def _upsert_batch(self, batch_index: int, batch: List[Dict[str, Any]], payload_bytes: int) -> BatchResult:
+        """
+        Upsert one batch, retrying with exponential backoff and jitter.
+        """
+        start = time.perf_counter()
+        error = None
+        for attempt in range(1, self.max_retries + 2):
+            try:
+                self.index.upsert(vectors=batch, namespace=self.namespace)
+                return BatchResult(
+                    batch_index, len(batch), payload_bytes, attempt, True, time.perf_counter() - start, None
+                )
+            except Exception as e:
+                error = str(e)
+                if attempt <= self.max_retries:
+                    delay = self.backoff_seconds * (2 ** (attempt - 1))
+                    self.sleep(delay * random.uniform(0.5, 1.5))
+        return BatchResult(
+            batch_index, len(batch), payload_bytes, self.max_retries + 1, False, time.perf_counter() - start, error
+        )
+
+    def write(self, vectors: Iterable[Dict[str, Any]]) -> List[BatchResult]:
+        """
+        Upsert vectors batch by batch with at most `max_workers` requests in flight.
+
+        The input is consumed lazily, so a generator of vectors is never fully materialized.
+
+        Args:
+            vectors (Iterable[Dict[str, Any]]): The vectors to upsert.
+
+        Returns:
+            List[BatchResult]: One result per batch, ordered by batch index.
+        """
+        results: List[BatchResult] = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: Set[Future] = set()
+            for batch_index, (batch, payload_bytes) in enumerate(self._iter_sized_batches(vectors)):
+                if len(pending) >= self.max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    results.extend(future.result() for future in done)
+                pending.add(executor.submit(self._upsert_batch, batch_index, batch, payload_bytes))
+            results.extend(future.result() for future in pending)
+        return sorted(results, key=lambda result: result.batch_index)
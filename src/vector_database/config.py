@@ -4,6 +4,9 @@ from vector_database.exceptions import APIKeyError
 from embeddings.config import DEFAULT_DIMENSIONS_EMBD
 from env_variables import ENV
 
+# Stays None when no key can be read, so that offline tools can import the package
+api_key = None
+
 try:
     # Retrieve the API key
     api_key = get_api_key()
@@ -28,3 +31,23 @@ PINECONE_ENVIRONMENT = "us-east-1"
 DEFAULT_INDEX_NAME = "vector-index-complex"
 DEFAULT_DIMENSIONS = DEFAULT_DIMENSIONS_EMBD
 NAMESPACE = "cluster-primo"
+MANIFEST_DIR = "data/manifests"  # Where the per-index manifests of indexed files are stored
+UPSERT_BATCH_SIZE = 100  # Maximum number of vectors per upsert request
+UPSERT_MAX_BATCH_BYTES = 2 * 1024 * 1024  # Maximum estimated payload size of an upsert request
+UPSERT_MAX_WORKERS = 4  # Maximum number of upsert requests in flight
+UPSERT_MAX_RETRIES = 3  # Retries of a failed upsert batch
+UPSERT_BACKOFF_SECONDS = 0.5  # Base delay of the exponential backoff between retries
+STREAM_QUEUE_SIZE = 4  # Batches buffered between two stages of the streaming indexer
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "pinecone")  # "pinecone" or "local"
+LOCAL_STORE_DIR = "data/local_index"  # Where the local backend persists its vectors
+LOCAL_INDEX_TYPE = "exact"  # "exact" brute-force search, or "ivf" approximate search for large corpora
+IVF_MIN_VECTORS = 10000  # Below this size the IVF index falls back to exact search
+IVF_NLIST = 0  # Number of IVF clusters, 0 for about 4 * sqrt(number of vectors)
+IVF_NPROBE = 8  # Number of IVF clusters scanned per query
+LOCAL_VECTOR_PRECISION = os.getenv("LOCAL_VECTOR_PRECISION", "float32")  # "float32", "float16", "int8" or "binary"
+BINARY_RESCORE_FACTOR = 8  # Binary precision: Hamming candidates per requested result, rescored with float16 vectors
+INT8_RANGE_MARGIN = 0.05  # Int8 precision: fraction of each calibrated range added on both sides
+BM25_ENABLED = True  # Maintain a BM25 inverted index of the chunk texts for lexical and hybrid retrieval
+BM25_K1 = 1.2  # BM25 term frequency saturation
+BM25_B = 0.75  # BM25 document length normalization
+BM25_COMPACT_RATIO = 0.25  # Fraction of deleted documents above which the BM25 postings are rewritten
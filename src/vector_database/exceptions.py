@@ -1,4 +1,10 @@
-class PineconeError(Exception):
+class VectorStoreError(Exception):
+    """Custom exception for vector store errors, whatever the backend."""
+
+    pass
+
+
+class PineconeError(VectorStoreError):
     """Custom exception for Pinecone-related errors."""
 
     pass
@@ -0,0 +1,499 @@
+import itertools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+import numpy as np
+from embeddings.quantization import (
+    PRECISIONS,
+    ScalarQuantizer,
+    binary_width,
+    float_scores,
+    hamming_distances,
+    pack_binary,
+)
+from vector_database.base_store import VectorStore
+from vector_database.bulk_writer import BatchResult
+from vector_database.config import (
+    BINARY_RESCORE_FACTOR,
+    INT8_RANGE_MARGIN,
+    IVF_MIN_VECTORS,
+    IVF_NLIST,
+    IVF_NPROBE,
+    LOCAL_INDEX_TYPE,
+    LOCAL_VECTOR_PRECISION,
+)
+from vector_database.exceptions import VectorStoreError
+
+# Number of vectors written or assigned to clusters at once
+_WRITE_BATCH = 1024
+
+# Files written by `save`, removed by `delete_index`
+_STORE_FILES = ("vectors.npy", "rescore.npy", "quantizer.npy", "assignments.npy", "centroids.npy", "entries.json")
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Return the indices of the `top_k` highest scores, best first.
+
+    Uses argpartition so only the selected scores are sorted.
+    """
+    if top_k >= scores.shape[0]:
+        return np.argsort(-scores, kind="stable")
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Scale every row to unit length so that dot products are cosine similarities.
+    """
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process vector store holding unit-normalized vectors in a contiguous matrix.
+
+    Queries are exact cosine top-k computed with one matrix-vector product and argpartition.
+    With `index_type="ivf"`, corpora of at least `ivf_min_vectors` vectors are clustered with
+    spherical k-means and a query only scans the `nprobe` closest clusters. When a `path` is
+    given, the store persists there on `flush()` and reloads memory-mapped on startup.
+
+    The scanned matrix is stored in the configured precision: "float32", "float16" (2x smaller),
+    "int8" codes with a per-dimension scale (4x smaller), or "binary" sign bits (32x smaller). Binary
+    queries rank the whole matrix by Hamming distance and rescore the `rescore_factor * top_k` closest
+    codes with a float16 copy of the vectors. That copy is kept too, so a binary store is about 1.9x
+    smaller than float32 in total, slightly larger than a float16 one: binary trades memory for a faster
+    scan. After a reload the copy stays memory-mapped on disk until the next write loads it into RAM.
+    """
+
+    def __init__(
+        self,
+        dimensions: int,
+        path: Optional[str] = None,
+        index_type: str = LOCAL_INDEX_TYPE,
+        nlist: int = IVF_NLIST,
+        nprobe: int = IVF_NPROBE,
+        ivf_min_vectors: int = IVF_MIN_VECTORS,
+        precision: str = LOCAL_VECTOR_PRECISION,
+        rescore_factor: int = BINARY_RESCORE_FACTOR,
+    ):
+        """
+        Initialize the store, loading its persisted state if any.
+
+        Args:
+            dimensions (int): Dimensionality of the stored vectors.
+            path (Optional[str]): Directory where the store is persisted, or None to keep it in memory only.
+            index_type (str): "exact" or "ivf".
+            nlist (int): Number of IVF clusters, 0 to derive it from the corpus size.
+            nprobe (int): Number of IVF clusters scanned per query.
+            ivf_min_vectors (int): Minimum corpus size for which the IVF index is used.
+            precision (str): "float32", "float16", "int8" or "binary" storage of the vectors.
+            rescore_factor (int): Binary precision only: candidates rescored per requested result.
+        """
+        if index_type not in ("exact", "ivf"):
+            raise VectorStoreError(f"Unknown local index type '{index_type}'.")
+        if precision not in PRECISIONS:
+            raise VectorStoreError(f"Unknown vector precision '{precision}', expected one of {', '.join(PRECISIONS)}.")
+        self.dimensions = dimensions
+        self.path = path
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_vectors = ivf_min_vectors
+        self.precision = precision
+        self.rescore_factor = max(1, rescore_factor)
+        self._lock = threading.RLock()
+        self._reset()
+        if path and os.path.isfile(os.path.join(path, "vectors.npy")):
+            self.load()
+
+    def _code_layout(self) -> Tuple[int, np.dtype]:
+        """
+        Return the row width and type of the scanned matrix in the configured precision.
+        """
+        if self.precision == "binary":
+            return binary_width(self.dimensions), np.dtype(np.uint8)
+        return self.dimensions, np.dtype(self.precision)
+
+    def _reset(self) -> None:
+        width, dtype = self._code_layout()
+        self._vectors = np.empty((0, width), dtype=dtype)
+        self._rescore: Optional[np.ndarray] = None
+        if self.precision == "binary":
+            self._rescore = np.empty((0, self.dimensions), dtype=np.float16)
+        self._quantizer: Optional[ScalarQuantizer] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self.ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._metadata: List[Dict[str, Any]] = []
+        self._centroids: Optional[np.ndarray] = None
+        self._trained_size = 0
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def index_bytes(self) -> int:
+        """
+        Bytes of the stored vectors: the scanned matrix and, in binary precision, the rescore copy.
+        """
+        return self.scan_bytes + self.rescore_bytes
+
+    @property
+    def scan_bytes(self) -> int:
+        """
+        Bytes of the matrix scanned by queries, in the configured precision.
+        """
+        return self._vectors[: self._size].nbytes
+
+    @property
+    def rescore_bytes(self) -> int:
+        """
+        Bytes of the float16 copy used to rescore binary candidates, 0 in the other precisions.
+        """
+        return 0 if self._rescore is None else self._rescore[: self._size].nbytes
+
+    @property
+    def _rescore_copy(self) -> np.ndarray:
+        """
+        The float16 copy of the vectors, which only binary stores keep.
+        """
+        if self._rescore is None:
+            raise VectorStoreError(f"A {self.precision} store has no rescore copy.")
+        return self._rescore
+
+    @property
+    def _int8_quantizer(self) -> ScalarQuantizer:
+        """
+        The quantizer of the int8 codes, fitted on the first write.
+        """
+        if self._quantizer is None:
+            raise VectorStoreError("The int8 quantizer is not fitted yet.")
+        return self._quantizer
+
+    def create_index(self) -> None:
+        # The index lives in memory and is created on demand
+        pass
+
+    def delete_index(self) -> None:
+        with self._lock:
+            self._reset()
+            if self.path:
+                for name in _STORE_FILES:
+                    file_path = os.path.join(self.path, name)
+                    if os.path.isfile(file_path):
+                        os.remove(file_path)
+
+    def _writable(self) -> None:
+        """
+        Copy memory-mapped arrays into RAM before the first modification.
+        """
+        if isinstance(self._vectors, np.memmap):
+            self._vectors = np.array(self._vectors)
+            self._assignments = np.array(self._assignments)
+        if isinstance(self._rescore, np.memmap):
+            self._rescore = np.array(self._rescore)
+
+    def _reserve(self, extra: int) -> None:
+        """
+        Grow the matrix capacity geometrically so appends are amortized O(1).
+        """
+        needed = self._size + extra
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 64)
+        vectors = np.empty((capacity, self._vectors.shape[1]), dtype=self._vectors.dtype)
+        vectors[: self._size] = self._vectors[: self._size]
+        assignments = np.full(capacity, -1, dtype=np.int32)
+        assignments[: self._size] = self._assignments[: self._size]
+        self._vectors, self._assignments = vectors, assignments
+        if self._rescore is not None:
+            rescore = np.empty((capacity, self.dimensions), dtype=np.float16)
+            rescore[: self._size] = self._rescore[: self._size]
+            self._rescore = rescore
+
+    def _store(self, rows: np.ndarray, values: np.ndarray) -> None:
+        """
+        Write normalized float32 vectors into the given rows, encoded in the configured precision.
+        """
+        if self.precision == "binary":
+            self._vectors[rows] = pack_binary(values)
+            self._rescore_copy[rows] = values
+        elif self.precision == "int8":
+            if self._quantizer is None:
+                self._quantizer = ScalarQuantizer.fit(values, INT8_RANGE_MARGIN)
+            elif not self._quantizer.covers(values):
+                # Widen the ranges and re-encode the stored codes so that no component is clipped
+                previous = self._quantizer
+                self._quantizer = previous.extended(values, INT8_RANGE_MARGIN)
+                for start in range(0, self._size, _WRITE_BATCH * 16):
+                    block = self._vectors[start : min(start + _WRITE_BATCH * 16, self._size)]
+                    self._vectors[start : start + block.shape[0]] = self._quantizer.encode(previous.decode(block))
+            self._vectors[rows] = self._quantizer.encode(values)
+        else:
+            self._vectors[rows] = values
+
+    def _float_rows(self, rows: Union[slice, np.ndarray]) -> np.ndarray:
+        """
+        Return the stored vectors of the given rows as float32.
+        """
+        if self.precision == "binary":
+            return self._rescore_copy[rows].astype(np.float32)
+        if self.precision == "int8":
+            return self._int8_quantizer.decode(self._vectors[rows])
+        return self._vectors[rows].astype(np.float32, copy=False)
+
+    def _scores(self, rows: Optional[np.ndarray], query: np.ndarray) -> np.ndarray:
+        """
+        Score the given rows, or all rows if None, against a normalized query.
+        """
+        codes = self._vectors[: self._size] if rows is None else self._vectors[rows]
+        if self.precision == "int8":
+            return self._int8_quantizer.scores(codes, query)
+        return float_scores(codes, query)
+
+    def _binary_search(
+        self, rows: Optional[np.ndarray], query: np.ndarray, top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Shortlist the rows closest to the query in Hamming distance, then rank them by float16 cosine.
+        """
+        codes = self._vectors[: self._size] if rows is None else self._vectors[rows]
+        distances = hamming_distances(codes, pack_binary(query))
+        shortlist = top_k_indices(-distances, min(codes.shape[0], self.rescore_factor * top_k))
+        if rows is not None:
+            shortlist = rows[shortlist]
+        scores = float_scores(self._rescore_copy[shortlist], query)
+        best = top_k_indices(scores, top_k)
+        return shortlist[best], scores[best]
+
+    def upsert_vectors(self, vectors: Iterable[Dict[str, Any]]) -> List[BatchResult]:
+        results = []
+        iterator = iter(vectors)
+        for batch_index in itertools.count():
+            batch = list(itertools.islice(iterator, _WRITE_BATCH))
+            if not batch:
+                break
+            start = time.perf_counter()
+            values = np.asarray([vector["values"] for vector in batch], dtype=np.float32)
+            if values.ndim != 2 or values.shape[1] != self.dimensions:
+                raise VectorStoreError(f"Expected vectors of dimension {self.dimensions}, got {values.shape[1:]}.")
+            values = normalize_rows(values)
+
+            with self._lock:
+                self._writable()
+                self._reserve(len(batch))
+                rows = np.empty(len(batch), dtype=np.int64)
+                for position, vector in enumerate(batch):
+                    row = self._rows.get(vector["id"])
+                    if row is None:
+                        row = self._size
+                        self._rows[vector["id"]] = row
+                        self.ids.append(vector["id"])
+                        self._metadata.append({})
+                        self._size += 1
+                    self._metadata[row] = dict(vector.get("metadata") or {})
+                    rows[position] = row
+                self._store(rows, values)
+                if self._centroids is not None:
+                    self._assignments[rows] = np.argmax(values @ self._centroids.T, axis=1)
+                self._dirty = True
+            results.append(
+                BatchResult(batch_index, len(batch), values.nbytes, 1, True, time.perf_counter() - start, None)
+            )
+        return results
+
+    def _train_ivf(self) -> np.ndarray:
+        """
+        Cluster the vectors with spherical k-means and assign every vector to its closest centroid.
+
+        Returns:
+            np.ndarray: The unit-normalized centroids, one per row.
+        """
+        nlist = self.nlist or max(1, int(4 * np.sqrt(self._size)))
+        nlist = min(nlist, self._size)
+        rng = np.random.default_rng(0)
+        sample = self._float_rows(rng.choice(self._size, size=min(self._size, 256 * nlist), replace=False))
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        for _ in range(10):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(sample.shape[0], size=int(empty.sum()))]
+            centroids = normalize_rows(sums)
+
+        self._writable()
+        for start in range(0, self._size, _WRITE_BATCH * 16):
+            block = self._float_rows(slice(start, min(start + _WRITE_BATCH * 16, self._size)))
+            self._assignments[start : start + block.shape[0]] = np.argmax(block @ centroids.T, axis=1)
+        self._centroids = centroids
+        self._trained_size = self._size
+        self._dirty = True
+        return centroids
+
+    def _candidate_rows(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Return the rows of the IVF clusters closest to the query, or None for an exact scan.
+        """
+        if self.index_type != "ivf" or self._size < self.ivf_min_vectors:
+            return None
+        centroids = self._centroids
+        if centroids is None or self._size > 2 * self._trained_size:
+            centroids = self._train_ivf()
+        probes = top_k_indices(centroids @ query, min(self.nprobe, centroids.shape[0]))
+        return np.flatnonzero(np.isin(self._assignments[: self._size], probes))
+
+    def query_vectors(self, query_vector: List[float], top_k: int = 5) -> List[Dict[str, Union[str, float]]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        if query.shape != (self.dimensions,):
+            raise VectorStoreError(f"Expected a query of dimension {self.dimensions}, got {query.shape}.")
+        query = normalize_rows(query[None, :])[0]
+
+        with self._lock:
+            if self._size == 0 or top_k <= 0:
+                return []
+            candidates = self._candidate_rows(query)
+            if self.precision == "binary":
+                rows, row_scores = self._binary_search(candidates, query, top_k)
+            else:
+                scores = self._scores(candidates, query)
+                best = top_k_indices(scores, top_k)
+                rows = best if candidates is None else candidates[best]
+                row_scores = scores[best]
+            values = self._float_rows(rows).tolist()
+            return [
+                {
+                    "id": self.ids[row],
+                    "score": float(score),
+                    "metadata": self._metadata[row],
+                    "values": row_values,
+                }
+                for row, score, row_values in zip(rows.tolist(), row_scores.tolist(), values)
+            ]
+
+    def fetch_vectors(self, vector_ids: List[str]) -> Dict[str, Dict]:
+        with self._lock:
+            found = [vector_id for vector_id in vector_ids if vector_id in self._rows]
+            if not found:
+                return {}
+            rows = np.array([self._rows[vector_id] for vector_id in found], dtype=np.int64)
+            values = self._float_rows(rows).tolist()
+            return {
+                vector_id: {"id": vector_id, "values": row_values, "metadata": self._metadata[row]}
+                for vector_id, row, row_values in zip(found, rows.tolist(), values)
+            }
+
+    def delete_vectors(self, vector_ids: List[str]) -> None:
+        with self._lock:
+            self._writable()
+            for vector_id in vector_ids:
+                row = self._rows.pop(vector_id, None)
+                if row is None:
+                    continue
+                # Move the last row into the freed slot to keep the matrix contiguous
+                last = self._size - 1
+                if row != last:
+                    self._vectors[row] = self._vectors[last]
+                    if self._rescore is not None:
+                        self._rescore[row] = self._rescore[last]
+                    self._assignments[row] = self._assignments[last]
+                    self._metadata[row] = self._metadata[last]
+                    self.ids[row] = self.ids[last]
+                    self._rows[self.ids[row]] = row
+                self._metadata.pop()
+                self.ids.pop()
+                self._size -= 1
+                self._dirty = True
+
+    def flush(self) -> None:
+        with self._lock:
+            if self.path and self._dirty:
+                self.save(self.path)
+
+    def save(self, path: str) -> None:
+        """
+        Write the store to a directory. Arrays are saved as .npy files so they can be memory-mapped.
+
+        Args:
+            path (str): The directory to write to.
+        """
+        with self._lock:
+            os.makedirs(path, exist_ok=True)
+            arrays = {"vectors": self._vectors[: self._size], "assignments": self._assignments[: self._size]}
+            if self._centroids is not None:
+                arrays["centroids"] = self._centroids
+            if self._rescore is not None:
+                arrays["rescore"] = self._rescore[: self._size]
+            if self._quantizer is not None:
+                arrays["quantizer"] = self._quantizer.to_array()
+            for name, array in arrays.items():
+                tmp_path = os.path.join(path, f"{name}.tmp.npy")
+                np.save(tmp_path, np.ascontiguousarray(array))
+                os.replace(tmp_path, os.path.join(path, f"{name}.npy"))
+            for name in ("centroids", "rescore", "quantizer"):
+                if name not in arrays and os.path.isfile(os.path.join(path, f"{name}.npy")):
+                    os.remove(os.path.join(path, f"{name}.npy"))
+
+            entries = {
+                "ids": self.ids,
+                "metadata": self._metadata,
+                "trained_size": self._trained_size,
+                "precision": self.precision,
+            }
+            tmp_path = os.path.join(path, "entries.json.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, os.path.join(path, "entries.json"))
+            self._dirty = False
+
+    def load(self) -> None:
+        """
+        Load the store from its directory, memory-mapping the vector matrices.
+
+        Raises:
+            VectorStoreError: If the store has no directory, its files cannot be read, or they hold vectors of
+                another dimension or precision.
+        """
+        path = self.path
+        if path is None:
+            raise VectorStoreError("The local vector store has no directory to load from.")
+        with self._lock:
+            try:
+                vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+                with open(os.path.join(path, "entries.json"), "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                raise VectorStoreError(f"Failed to load local vector store from '{path}': {e}")
+            precision = entries.get("precision", "float32")
+            if precision != self.precision:
+                raise VectorStoreError(
+                    f"Stored vectors have precision '{precision}', not '{self.precision}'. Rebuild the index."
+                )
+            if vectors.ndim != 2 or (vectors.shape[0] and vectors.shape[1] != self._code_layout()[0]):
+                raise VectorStoreError(f"Stored vectors do not have dimension {self.dimensions}.")
+
+            self._reset()
+            self._vectors = vectors
+            if precision == "binary":
+                self._rescore = np.load(os.path.join(path, "rescore.npy"), mmap_mode="r")
+            elif precision == "int8" and vectors.shape[0]:
+                self._quantizer = ScalarQuantizer.from_array(np.load(os.path.join(path, "quantizer.npy")))
+            self._size = vectors.shape[0]
+            self._assignments = np.load(os.path.join(path, "assignments.npy"), mmap_mode="r")
+            self.ids = entries["ids"]
+            self._rows = {vector_id: row for row, vector_id in enumerate(self.ids)}
+            self._metadata = entries["metadata"]
+            centroids_path = os.path.join(path, "centroids.npy")
+            if os.path.isfile(centroids_path):
+                self._centroids = np.load(centroids_path)
+                self._trained_size = entries.get("trained_size", self._size)
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+
+def make_vector_id(source: str, chunk_hash: str) -> str:
+    """
+    Build a deterministic vector ID from the chunk's source file and content hash.
+
+    The same chunk of the same file always maps to the same ID, so re-indexing
+    overwrites vectors instead of duplicating them.
+
+    Args:
+        source (str): The path of the file the chunk comes from.
+        chunk_hash (str): The content hash of the chunk.
+
+    Returns:
+        str: The vector ID.
+    """
+    return hashlib.sha256(f"{source}\x00{chunk_hash}".encode("utf-8")).hexdigest()[:32]
+
+
+class IndexManifest:
+    """
+    Persistent record of the files stored in a vector index.
+
+    For every indexed file the manifest keeps its content hash and the IDs of the
+    vectors built from its chunks, which lets the indexer skip unchanged files and
+    delete the stale chunks of changed or removed ones. It also keeps the IDs of the
+    vectors that duplicate the chunks skipped by deduplication, so that the file is
+    indexed again if those vectors are deleted.
+    """
+
+    def __init__(self, manifest_dir: str, index_name: str, namespace: str):
+        """
+        Load the manifest of an index namespace, or start an empty one.
+
+        Args:
+            manifest_dir (str): Directory where manifests are stored.
+            index_name (str): Name of the vector index.
+            namespace (str): Namespace of the vectors within the index.
+        """
+        self.path = os.path.join(manifest_dir, f"{index_name}__{namespace}.json")
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.load()
+
+    def load(self) -> None:
+        """
+        Read the manifest from disk. A missing file yields an empty manifest.
+        """
+        if not os.path.isfile(self.path):
+            self.files = {}
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            self.files = json.load(f).get("files", {})
+
+    def save(self) -> None:
+        """
+        Atomically write the manifest to disk.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def get_file_hash(self, file_path: str) -> Optional[str]:
+        """
+        Return the content hash recorded for a file, or None if it was never indexed.
+        """
+        entry = self.files.get(file_path)
+        return entry["file_hash"] if entry else None
+
+    def get_chunk_ids(self, file_path: str) -> List[str]:
+        """
+        Return the vector IDs recorded for a file.
+        """
+        entry = self.files.get(file_path)
+        return list(entry["chunk_ids"]) if entry else []
+
+    def get_duplicate_of(self, file_path: str) -> List[str]:
+        """
+        Return the IDs of the vectors duplicating chunks of a file that were skipped when it was indexed.
+        """
+        entry = self.files.get(file_path)
+        return list(entry.get("duplicate_of", [])) if entry else []
+
+    def update_file(
+        self, file_path: str, file_hash: str, chunk_ids: List[str], duplicate_of: Optional[List[str]] = None
+    ) -> None:
+        """
+        Record the content hash and vector IDs of an indexed file, and the vectors its skipped duplicate
+        chunks rely on.
+        """
+        self.files[file_path] = {"file_hash": file_hash, "chunk_ids": list(chunk_ids)}
+        if duplicate_of:
+            self.files[file_path]["duplicate_of"] = list(duplicate_of)
+
+    def remove_file(self, file_path: str) -> None:
+        """
+        Forget a file.
+        """
+        self.files.pop(file_path, None)
+
+    def clear(self) -> None:
+        """
+        Forget every file and remove the manifest from disk.
+        """
+        self.files = {}
+        if os.path.isfile(self.path):
+            os.remove(self.path)
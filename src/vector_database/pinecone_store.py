@@ -0,0 +1,77 @@
+from typing import Any, Dict, Iterable, List, Union
+from vector_database.base_store import VectorStore
+from vector_database.bulk_writer import BatchResult, BulkUpsertWriter
+from vector_database.pinecone_client import PineconeClient
+from vector_database.exceptions import PineconeError
+
+
+class PineconeVectorStore(VectorStore):
+    """
+    Vector store backed by a Pinecone serverless index.
+    """
+
+    def __init__(self, index_name: str, dimensions: int, namespace: str, **writer_options):
+        """
+        Connect to Pinecone and create the index if it does not exist.
+
+        Args:
+            index_name (str): Name of the index to be created or used.
+            dimensions (int): Dimensionality of the stored vectors.
+            namespace (str): Namespace under which the vectors are organized.
+            **writer_options: Overrides of the BulkUpsertWriter settings (batch_size, max_workers, ...).
+
+        Raises:
+            PineconeError: If initialization or index creation fails.
+        """
+        self.index_name = index_name
+        self.dimensions = dimensions
+        self.namespace = namespace
+        self.writer_options = writer_options
+        try:
+            self.client = PineconeClient()
+            self.create_index()
+        except Exception as e:
+            raise PineconeError(f"Failed to initialize vector index '{index_name}': {e}")
+
+    def create_index(self) -> None:
+        self.client.create_index(index_name=self.index_name, dimensions=self.dimensions)
+        self.index = self.client.client.Index(self.index_name)
+
+    def delete_index(self) -> None:
+        try:
+            self.client.client.delete_index(self.index_name)
+            print(f"Index '{self.index_name}' deleted successfully!")
+        except Exception as e:
+            raise PineconeError(f"Failed to delete index '{self.index_name}': {e}")
+
+    def upsert_vectors(self, vectors: Iterable[Dict[str, Any]]) -> List[BatchResult]:
+        """
+        Send the vectors in bounded batches through a BulkUpsertWriter, several batches at a time,
+        retrying each failed batch with backoff before reporting it.
+        """
+        try:
+            writer = BulkUpsertWriter(self.index, namespace=self.namespace, **self.writer_options)
+            return writer.write(vectors)
+        except Exception as e:
+            raise PineconeError(f"Failed to upsert vectors: {e}")
+
+    def query_vectors(self, query_vector: List[float], top_k: int = 5) -> List[Dict[str, Union[str, float]]]:
+        try:
+            return self.index.query(
+                vector=query_vector, namespace=self.namespace, top_k=top_k, include_metadata=True, include_values=True
+            )["matches"]
+        except Exception as e:
+            raise PineconeError(f"Failed to query vectors: {e}")
+
+    def fetch_vectors(self, vector_ids: List[str]) -> Dict[str, Dict]:
+        try:
+            response = self.index.fetch(ids=vector_ids, namespace=self.namespace)
+            return response["vectors"]
+        except Exception as e:
+            raise PineconeError(f"Failed to fetch vectors: {e}")
+
+    def delete_vectors(self, vector_ids: List[str]) -> None:
+        try:
+            self.index.delete(ids=vector_ids, namespace=self.namespace)
+        except Exception as e:
+            raise PineconeError(f"Failed to delete {len(vector_ids)} vectors: {e}")
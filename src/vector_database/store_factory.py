@@ -0,0 +1,34 @@
+import os
+from vector_database.base_store import VectorStore
+from vector_database.config import LOCAL_STORE_DIR, VECTOR_STORE_BACKEND
+from vector_database.exceptions import VectorStoreError
+
+
+def create_vector_store(
+    index_name: str, dimensions: int, namespace: str, backend: str = VECTOR_STORE_BACKEND
+) -> VectorStore:
+    """
+    Build the vector store backend selected in the configuration.
+
+    Args:
+        index_name (str): Name of the index to be created or used.
+        dimensions (int): Dimensionality of the stored vectors.
+        namespace (str): Namespace under which the vectors are organized.
+        backend (str): "pinecone" or "local".
+
+    Returns:
+        VectorStore: The vector store.
+
+    Raises:
+        VectorStoreError: If the backend is unknown.
+    """
+    if backend == "pinecone":
+        # Imported lazily so the local backend works without Pinecone credentials
+        from vector_database.pinecone_store import PineconeVectorStore
+
+        return PineconeVectorStore(index_name=index_name, dimensions=dimensions, namespace=namespace)
+    if backend == "local":
+        from vector_database.local_store import LocalVectorStore
+
+        return LocalVectorStore(dimensions=dimensions, path=os.path.join(LOCAL_STORE_DIR, index_name, namespace))
+    raise VectorStoreError(f"Unknown vector store backend '{backend}'.")
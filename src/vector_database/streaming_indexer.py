@@ -0,0 +1,162 @@
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from embeddings.config import DEFAULT_BATCH_SIZE
+from vector_database.bulk_writer import BatchResult
+from vector_database.config import STREAM_QUEUE_SIZE
+
+_END = object()
+
+
+@dataclass
+class StreamReport:
+    """
+    Summary of a streaming indexing run.
+    """
+
+    chunks: int = 0
+    embedding_batches: int = 0
+    upsert_batches: List[BatchResult] = field(default_factory=list)
+
+
+class StreamingIndexer:
+    """
+    Indexes a stream of chunks with chunking, embedding and upsert running concurrently.
+
+    The stages are connected by bounded queues: a producer thread pulls chunks from the source
+    iterator (which lazily parses files page by page) and groups them into embedding batches,
+    an embedding thread turns each batch into vector entries, and the calling thread hands the
+    vectors to the writer as they arrive. At most `queue_size` batches wait between two stages,
+    so memory stays flat whatever the size of the corpus.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], np.ndarray],
+        write_fn: Callable[[Iterable[Dict[str, Any]]], List[BatchResult]],
+        embed_batch_size: int = DEFAULT_BATCH_SIZE,
+        queue_size: int = STREAM_QUEUE_SIZE,
+    ):
+        """
+        Initialize the indexer.
+
+        Args:
+            embed_fn (Callable[[List[str]], np.ndarray]): Turns a batch of texts into embeddings.
+            write_fn (Callable[[Iterable[Dict[str, Any]]], List[BatchResult]]): Consumes vector entries lazily
+                and writes them to the store, e.g. VectorManager.upsert_vectors.
+            embed_batch_size (int): Number of chunks embedded at once.
+            queue_size (int): Maximum number of batches buffered between two stages.
+        """
+        self.embed_fn = embed_fn
+        self.write_fn = write_fn
+        self.embed_batch_size = embed_batch_size
+        self.queue_size = queue_size
+
+    def run(self, chunks: Iterable[Tuple[str, Any]]) -> StreamReport:
+        """
+        Embed and store a stream of chunks.
+
+        Args:
+            chunks (Iterable[Tuple[str, Any]]): Pairs of vector ID and LangChain Document.
+
+        Returns:
+            StreamReport: Counts of processed chunks and the outcome of every upsert batch.
+
+        Raises:
+            Exception: The first error raised by any stage, after all stages have stopped.
+        """
+        report = StreamReport()
+        chunk_batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        vector_batches: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        errors: List[BaseException] = []
+
+        def put(target: queue.Queue, item: Any) -> bool:
+            # Block while the next stage is busy, but give up as soon as another stage failed
+            while not stop.is_set():
+                try:
+                    target.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(source: queue.Queue) -> Any:
+            # Block until the previous stage delivers, and end the stream if another stage failed
+            while not stop.is_set():
+                try:
+                    return source.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def fail(error: BaseException) -> None:
+            errors.append(error)
+            stop.set()
+
+        def produce() -> None:
+            try:
+                batch: List[Tuple[str, Any]] = []
+                for item in chunks:
+                    batch.append(item)
+                    if len(batch) >= self.embed_batch_size:
+                        if not put(chunk_batches, batch):
+                            return
+                        batch = []
+                if batch and not put(chunk_batches, batch):
+                    return
+                put(chunk_batches, _END)
+            except BaseException as e:
+                fail(e)
+
+        def embed() -> None:
+            try:
+                while True:
+                    batch = get(chunk_batches)
+                    if batch is _END:
+                        break
+                    embeddings = self.embed_fn([doc.page_content for _, doc in batch])
+                    vectors = [
+                        {
+                            "id": vector_id,
+                            "values": embedding.tolist(),
+                            "metadata": {**doc.metadata, "text": doc.page_content},
+                        }
+                        for (vector_id, doc), embedding in zip(batch, embeddings)
+                    ]
+                    report.chunks += len(batch)
+                    report.embedding_batches += 1
+                    if not put(vector_batches, vectors):
+                        return
+                put(vector_batches, _END)
+            except BaseException as e:
+                fail(e)
+
+        def vectors() -> Iterator[Dict[str, Any]]:
+            while True:
+                batch = get(vector_batches)
+                if batch is _END:
+                    return
+                yield from batch
+
+        producer = threading.Thread(target=produce, name="index-chunker", daemon=True)
+        embedder = threading.Thread(target=embed, name="index-embedder", daemon=True)
+        producer.start()
+        embedder.start()
+        write_error: Optional[BaseException] = None
+        try:
+            report.upsert_batches = self.write_fn(vectors())
+        except BaseException as e:
+            write_error = e
+        finally:
+            stop.set()
+            producer.join()
+            embedder.join()
+
+        if errors:
+            raise errors[0]
+        if write_error is not None:
+            raise write_error
+        return report
@@ -1,15 +1,44 @@
-from typing import List, Dict, Union
-from vector_database.pinecone_client import PineconeClient
-from embeddings.chunks import DocumentChunker
-from embeddings.embedding_generator import EmbeddingGenerator
-from vector_database.config import DEFAULT_INDEX_NAME, DEFAULT_DIMENSIONS, NAMESPACE
-from vector_database.exceptions import PineconeError
-import uuid
+import itertools
+import os
+from typing import Any, Iterable, Iterator, List, Dict, Optional, Set, Tuple, Union
+from pathlib import Path
+import numpy as np
+from vector_database.base_store import VectorStore
+from vector_database.bm25_index import BM25Index
+from vector_database.bulk_writer import BatchResult
+from vector_database.store_factory import create_vector_store
+from vector_database.streaming_indexer import StreamingIndexer
+from vector_database.manifest import IndexManifest, make_vector_id
+from embeddings.chunks import DocumentChunker, list_documents
+from embeddings.config import (
+    CHUNK_OVERLAP,
+    CHUNK_SIZE,
+    CHUNK_STRATEGY,
+    DEDUP_ENABLED,
+    DIM_REDUCTION,
+    PCA_FIT_SAMPLE_SIZE,
+    REDUCED_DIMENSIONS,
+)
+from embeddings.dedup import ChunkDeduplicator, DedupReport
+from embeddings.dim_reduction import PCAProjection, create_projection
+from embeddings.token_chunker import TokenChunker
+from utils.hashing import hash_file, hash_text
+from utils.registry import get_embedding_generator
+from vector_database.config import (
+    BM25_ENABLED,
+    DEFAULT_INDEX_NAME,
+    DEFAULT_DIMENSIONS,
+    NAMESPACE,
+    MANIFEST_DIR,
+    VECTOR_STORE_BACKEND,
+)
+from vector_database.exceptions import VectorStoreError
 
 
 class VectorManager:
     """
-    Manages vector operations in Pinecone, including creation, insertion, retrieval, and deletion.
+    Manages vector operations, including creation, insertion, retrieval, and deletion,
+    on the vector store backend selected in the configuration (Pinecone or local).
     """
 
     def __init__(
@@ -18,47 +47,242 @@ class VectorManager:
         index_name: str = DEFAULT_INDEX_NAME,
         dimensions: int = DEFAULT_DIMENSIONS,
         namespace: str = NAMESPACE,
+        manifest_dir: str = MANIFEST_DIR,
+        backend: str = VECTOR_STORE_BACKEND,
+        store: Optional[VectorStore] = None,
+        reduction: str = DIM_REDUCTION,
+        reduced_dimensions: int = REDUCED_DIMENSIONS,
     ):
         """
-        Initialize and configure a vector index on Pinecone.
+        Initialize and configure a vector index.
 
         Args:
             directory_documents (str, optional): A directory path containing documents (if any).
             index_name (str): Name of the index to be created or used.
-            dimensions (int): Dimensionality of the stored vectors.
+            dimensions (int): Dimensionality of the embeddings.
             namespace (str): Namespace under which the vectors are organized.
+            manifest_dir (str): Directory holding the manifest of indexed files.
+            backend (str): Vector store backend, "pinecone" or "local".
+            store (Optional[VectorStore]): An already built vector store, which overrides `backend`.
+            reduction (str): Dimensionality reduction of the embeddings before they are stored: "none",
+                "pca" fitted on the corpus, or "truncate" for Matryoshka models.
+            reduced_dimensions (int): Dimensionality of the stored vectors when a reduction is used. The index
+                is created with this dimension.
 
         Raises:
-            PineconeError: If initialization or index creation fails.
+            VectorStoreError: If initialization or index creation fails.
         """
         self.index_name = index_name
-        self.dimensions = dimensions
+        self.embedding_dimensions = dimensions
         self.namespace = namespace
+        self.manifest = IndexManifest(manifest_dir, index_name, namespace)
+        # The same projection is applied to stored and query embeddings; a PCA projection is fitted and
+        # persisted on the first indexing, and loaded again whenever its file changes
+        self.reduction = reduction
+        self.reduced_dimensions = reduced_dimensions
+        self.projection_path = f"{os.path.splitext(self.manifest.path)[0]}.projection.npz"
+        self.projection = create_projection(reduction, dimensions, reduced_dimensions)
+        self._projection_mtime: Optional[int] = None
+        self._refresh_projection()
+        self.dimensions = dimensions if self.projection is None else self.projection.output_dimensions
+        self.store = (
+            store if store is not None else create_vector_store(index_name, self.dimensions, namespace, backend)
+        )
+        # Incremented on every write, so caches of query results can tell when the index changed
+        self.version = 0
+        # Fingerprints of the indexed chunks, loaded on first use
+        self.dedup_path = f"{os.path.splitext(self.manifest.path)[0]}.dedup.npz"
+        self._deduplicator: Optional[ChunkDeduplicator] = None
+        self.last_dedup_report: Optional[DedupReport] = None
+        # BM25 index of the stored chunk texts, loaded on first use
+        self.lexical_index_path = f"{os.path.splitext(self.manifest.path)[0]}.bm25.npz"
+        self._lexical_index: Optional[BM25Index] = None
 
+    @property
+    def deduplicator(self) -> Optional[ChunkDeduplicator]:
+        """
+        The fingerprints of the indexed chunks, or None when deduplication is disabled.
+        """
+        if DEDUP_ENABLED and self._deduplicator is None:
+            self._deduplicator = ChunkDeduplicator()
+            self._deduplicator.load(self.dedup_path)
+        return self._deduplicator
+
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        """
+        The BM25 index of the stored chunk texts, or None when it is disabled.
+        """
+        if BM25_ENABLED and self._lexical_index is None:
+            self._lexical_index = BM25Index()
+            self._lexical_index.load(self.lexical_index_path)
+        return self._lexical_index
+
+    def lexical_search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank the stored chunks by BM25 score for a query.
+
+        Args:
+            query (str): The query text.
+            top_k (int): Number of chunks to return.
+
+        Returns:
+            List[Tuple[str, float]]: Vector IDs and BM25 scores, best first; empty when the index is disabled.
+        """
+        if self.lexical_index is None:
+            return []
+        return self.lexical_index.search(query, top_k)
+
+    def project(self, embeddings: np.ndarray) -> np.ndarray:
+        """
+        Reduce embeddings to the dimensionality of the index.
+
+        Args:
+            embeddings (np.ndarray): Embeddings of the model, one per row.
+
+        Returns:
+            np.ndarray: The embeddings as stored in the index, unchanged when no reduction is configured.
+
+        Raises:
+            VectorStoreError: If the PCA projection is not fitted yet, i.e. nothing was indexed.
+        """
+        if self.projection is None:
+            return embeddings
+        self._refresh_projection()
+        if not self.projection.fitted:
+            raise VectorStoreError("The PCA projection is not fitted yet: index documents first.")
+        return self.projection.transform(embeddings)
+
+    def _refresh_projection(self) -> None:
+        """
+        Load the PCA projection from its file when it changed, e.g. when another process such as the indexing
+        UI fitted it, or refitted it, after this one started.
+        """
+        if not isinstance(self.projection, PCAProjection):
+            return
         try:
-            # Initialize Pinecone client and create the index if not existing
-            self.client = PineconeClient()
-            self.client.create_index(index_name=index_name, dimensions=dimensions)
-            self.index = self.client.client.Index(index_name)
+            mtime = os.stat(self.projection_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime != self._projection_mtime:
+            self.projection.load(self.projection_path)
+            self._projection_mtime = mtime
+
+    def _fit_projection(
+        self, chunks: Iterator[Tuple[str, Any]], embedding_generator: Any
+    ) -> Tuple[Iterator[Tuple[str, Any]], Dict[str, np.ndarray]]:
+        """
+        Fit the PCA projection on the embeddings of the first PCA_FIT_SAMPLE_SIZE chunks to index, and persist it.
+
+        Returns:
+            Tuple[Iterator[Tuple[str, Any]], Dict[str, np.ndarray]]: The chunks to index, the sample included,
+            and the embeddings of the sample by text, for the indexing to reuse.
+        """
+        projection = self.projection
+        if not isinstance(projection, PCAProjection):
+            return chunks, {}
+        sample = list(itertools.islice(chunks, PCA_FIT_SAMPLE_SIZE))
+        chunks = itertools.chain(sample, chunks)
+        if not sample:
+            return chunks, {}
+        texts = [doc.page_content for _, doc in sample]
+        embeddings = np.asarray(embedding_generator.generate_embeddings(texts=texts))
+        projection.fit(embeddings)
+        projection.save(self.projection_path)
+        self._projection_mtime = os.stat(self.projection_path).st_mtime_ns
+        print(
+            f"Fitted a PCA projection from {self.embedding_dimensions} to {self.dimensions} dimensions on "
+            f"{len(texts)} chunks ({projection.retained_energy:.1%} of the squared norm kept)."
+        )
+        return chunks, dict(zip(texts, embeddings))
+
+    def refit_projection(self, directory_documents: str) -> None:
+        """
+        Fit the PCA projection again on the documents of a directory, and index them again with it.
+
+        The projection is fitted once, so it does not follow a corpus that drifts. The stored vectors are
+        already reduced and cannot be projected again, so the index is deleted and every document is
+        embedded again, from the embedding cache when it is enabled.
+
+        Args:
+            directory_documents (str): The directory containing the documents to index.
+
+        Raises:
+            VectorStoreError: If the index cannot be deleted or rebuilt.
+        """
+        self.delete_index()
+        self.create_index()
+        self.embed_store_db(directory_documents)
+
+    def create_index(self) -> None:
+        """
+        Create the index if it does not exist yet.
+
+        Raises:
+            VectorStoreError: If the index creation fails.
+        """
+        try:
+            self.store.create_index()
+        except VectorStoreError:
+            raise
         except Exception as e:
-            raise PineconeError(f"Failed to initialize vector index '{index_name}': {e}")
+            raise VectorStoreError(f"Failed to create index '{self.index_name}': {e}")
 
-    def upsert_vectors(self, vectors: List[Dict[str, Union[str, List[float]]]]) -> None:
+    def upsert_vectors(self, vectors: Iterable[Dict[str, Union[str, List[float]]]]) -> List[BatchResult]:
         """
-        Insert or update vectors in the configured Pinecone index.
+        Insert or update vectors in the configured index.
+
+        Vectors with a 'text' metadata are also added to the BM25 index as they are written, and the
+        BM25 index is saved once they are all stored. If the upsert fails, the postings added in memory
+        are forgotten, and the BM25 index is loaded again from its file when next used.
 
         Args:
-            vectors (List[Dict[str, Union[str, List[float]]]]): A list of dictionaries,
+            vectors (Iterable[Dict[str, Union[str, List[float]]]]): A list or a lazy iterable of dictionaries,
                 each containing 'id' and 'values' keys, where 'values' is the vector.
 
+        Returns:
+            List[BatchResult]: The outcome of every write batch.
+
         Raises:
-            PineconeError: If the upsert operation fails.
+            VectorStoreError: If the upsert operation fails, or if a batch still fails after its retries.
         """
         try:
-            self.index.upsert(vectors=vectors, namespace=self.namespace)
-            print("Added vectors to the index successfully!")
-        except Exception as e:
-            raise PineconeError(f"Failed to upsert vectors: {e}")
+            results = self._upsert_vectors(vectors)
+        except Exception:
+            # Forget the postings of vectors that may not have been stored
+            self._lexical_index = None
+            raise
+        if self._lexical_index is not None:
+            self._lexical_index.save(self.lexical_index_path)
+        return results
+
+    def _upsert_vectors(self, vectors: Iterable[Dict[str, Union[str, List[float]]]]) -> List[BatchResult]:
+        """
+        Upsert vectors and add their texts to the BM25 index, without saving it.
+        """
+        lexical_index = self.lexical_index
+        if lexical_index is not None:
+            vectors = self._index_texts(vectors, lexical_index)
+        try:
+            results = self.store.upsert_vectors(vectors)
+        finally:
+            self.version += 1
+        failed = [result for result in results if not result.success]
+        if failed:
+            raise VectorStoreError(
+                f"Failed to upsert {sum(result.size for result in failed)} vectors in {len(failed)} of "
+                f"{len(results)} batches: {failed[0].error}"
+            )
+        print(f"Added {sum(result.size for result in results)} vectors to the index in {len(results)} batches!")
+        return results
+
+    @staticmethod
+    def _index_texts(vectors: Iterable[Dict[str, Any]], lexical_index: BM25Index) -> Iterator[Dict[str, Any]]:
+        for vector in vectors:
+            text = (vector.get("metadata") or {}).get("text")
+            if text is not None:
+                lexical_index.add(vector["id"], text)
+            yield vector
 
     def query_vectors(self, query_vector: List[float], top_k: int = 5) -> List[Dict[str, Union[str, float]]]:
         """
@@ -73,14 +297,9 @@ class VectorManager:
             the vector's 'id', 'score', and optionally metadata and values.
 
         Raises:
-            PineconeError: If the query operation fails.
+            VectorStoreError: If the query operation fails.
         """
-        try:
-            return self.index.query(
-                vector=query_vector, namespace=self.namespace, top_k=top_k, include_metadata=True, include_values=True
-            )["matches"]
-        except Exception as e:
-            raise PineconeError(f"Failed to query vectors: {e}")
+        return self.store.query_vectors(query_vector=query_vector, top_k=top_k)
 
     def fetch_vectors(self, vector_ids: List[str]) -> Dict[str, Dict]:
         """
@@ -93,13 +312,9 @@ class VectorManager:
             Dict[str, Dict]: A dictionary mapping vector IDs to their details.
 
         Raises:
-            PineconeError: If the fetch operation fails.
+            VectorStoreError: If the fetch operation fails.
         """
-        try:
-            response = self.index.fetch(ids=vector_ids, namespace=self.namespace)
-            return response["vectors"]
-        except Exception as e:
-            raise PineconeError(f"Failed to fetch vectors: {e}")
+        return self.store.fetch_vectors(vector_ids)
 
     def delete_vector(self, vector_id: str) -> None:
         """
@@ -109,62 +324,259 @@ class VectorManager:
             vector_id (str): The ID of the vector to delete.
 
         Raises:
-            PineconeError: If the deletion operation fails.
+            VectorStoreError: If the deletion operation fails.
         """
-        try:
-            self.index.delete(ids=[vector_id], namespace=self.namespace)
-        except Exception as e:
-            raise PineconeError(f"Failed to delete vector '{vector_id}': {e}")
+        self.delete_vectors([vector_id])
+
+    def delete_vectors(self, vector_ids: List[str]) -> None:
+        """
+        Delete several vectors from the index based on their IDs.
+
+        Args:
+            vector_ids (List[str]): The IDs of the vectors to delete.
+
+        Raises:
+            VectorStoreError: If the deletion operation fails.
+        """
+        self._delete_vectors(vector_ids)
+        if self.deduplicator is not None and vector_ids:
+            self.deduplicator.save(self.dedup_path)
+        if self.lexical_index is not None and vector_ids:
+            self.lexical_index.save(self.lexical_index_path)
+
+    def _delete_vectors(self, vector_ids: List[str]) -> None:
+        """
+        Delete vectors and forget their fingerprints and BM25 postings, without saving them.
+        """
+        if vector_ids:
+            try:
+                self.store.delete_vectors(vector_ids)
+            finally:
+                self.version += 1
+            if self.deduplicator is not None:
+                self.deduplicator.remove(vector_ids)
+            if self.lexical_index is not None:
+                self.lexical_index.remove(vector_ids)
 
     def delete_index(self) -> None:
         """
-        Delete the entire index from Pinecone.
+        Delete the entire index and forget the indexed files.
 
         Raises:
-            PineconeError: If the index deletion fails.
+            VectorStoreError: If the index deletion fails.
         """
         try:
-            self.client.client.delete_index(self.index_name)
-            print(f"Index '{self.index_name}' deleted successfully!")
-        except Exception as e:
-            raise PineconeError(f"Failed to delete index '{self.index_name}': {e}")
+            self.store.delete_index()
+        finally:
+            self.version += 1
+        self.manifest.clear()
+        # A new corpus gets a new PCA projection
+        if self.reduction == "pca":
+            self.projection = create_projection(self.reduction, self.embedding_dimensions, self.reduced_dimensions)
+        self._projection_mtime = None
+        if os.path.isfile(self.projection_path):
+            os.remove(self.projection_path)
+        if self._deduplicator is not None:
+            self._deduplicator.clear()
+        if self._lexical_index is not None:
+            self._lexical_index.clear()
+        for path in (self.dedup_path, self.lexical_index_path):
+            if os.path.isfile(path):
+                os.remove(path)
+
+    @staticmethod
+    def list_documents(directory_documents: str) -> List[str]:
+        """
+        List the files of a directory in a format supported by the ingestion pipeline.
+
+        Args:
+            directory_documents (str): The directory containing documents.
+
+        Returns:
+            List[str]: The sorted paths of the visible supported files.
+        """
+        return list_documents(directory_documents)
 
     def embed_store_db(self, directory_documents: str) -> None:
         """
-        Process documents by chunking them, generating embeddings using the existing EmbeddingGenerator,
-        and storing them in Pinecone. This method manually handles the embeddings and metadata insertion.
+        Incrementally index the documents of a directory.
+
+        Files whose content hash matches the manifest are skipped. New or changed files are
+        chunked, only chunks that are not already stored are embedded, and the chunks a
+        changed file no longer contains are deleted. Files that disappeared from the
+        directory have all their chunks deleted. Vector IDs are derived from the source
+        file and the chunk content, so re-indexing never duplicates vectors.
+
+        Files of every supported format are loaded by the DataIngestionPipeline, whose parse
+        cache is keyed by the content hashes computed here, and the chunking, embedding and
+        upsert stages run concurrently through a StreamingIndexer, so memory does not grow
+        with the corpus.
+
+        New chunks that duplicate an indexed chunk, exactly or nearly (MinHash/LSH over word
+        shingles), are neither embedded nor stored; they are counted in `last_dedup_report`.
+        If the chunk a duplicate relied on is deleted later, its file is indexed again.
+
+        The texts of the stored chunks are kept in a BM25 index for lexical retrieval. When that index
+        is missing, e.g. for an index built before it existed, every file is chunked again to fill it,
+        without embedding the chunks that are already stored.
+
+        With a dimensionality reduction, embeddings are projected before they are stored. A PCA
+        projection is fitted on the embeddings of the first chunks of the first indexing, which are
+        stored without being embedded again, and reused afterwards; see `refit_projection`.
 
         Args:
             directory_documents (str): The directory containing documents to be processed.
 
         Raises:
-            PineconeError: If there's an issue during the embedding or indexing process.
+            VectorStoreError: If there's an issue during the embedding or indexing process.
         """
         try:
-            # 1. Chunk documents
-            chunker = DocumentChunker(directory=directory_documents, chunk_size=1000, chunk_overlap=200)
-            documents = chunker.chunk_data()  # documents should be a list of Document objects
-
-            # 2. Extract the texts to embed
-            texts = [doc.page_content for doc in documents]
-
-            # 3. Generate embeddings for all texts
-            embeddings = EmbeddingGenerator().generate_embeddings(texts=texts)
-
-            # 4. Prepare the vectors for upsert to Pinecone
-            vectors = []
-            for doc, embedding in zip(documents, embeddings):
-                vector_id = str(uuid.uuid4())
-                # Include the document text in the metadata
-                vector_entry = {
-                    "id": vector_id,
-                    "values": embedding.tolist(),
-                    "metadata": {**doc.metadata, "text": doc.page_content},
-                }
-                vectors.append(vector_entry)
-
-            # 5. Upsert the vectors into Pinecone
-            self.upsert_vectors(vectors=vectors)
+            # 1. Delete the chunks of files that disappeared, then compare the directory against the manifest
+            file_hashes = {path: hash_file(path) for path in self.list_documents(directory_documents)}
+            removed = [
+                path
+                for path in self.manifest.files
+                if path not in file_hashes and Path(path).is_relative_to(directory_documents)
+            ]
+            deleted_ids: Set[str] = set()
+            for path in removed:
+                deleted_ids.update(self.manifest.get_chunk_ids(path))
+                self._delete_vectors(self.manifest.get_chunk_ids(path))
+                self.manifest.remove_file(path)
+            self._requeue_dependents(deleted_ids)
+            changed = [path for path, digest in file_hashes.items() if self.manifest.get_file_hash(path) != digest]
+            lexical_index = self.lexical_index
+            if lexical_index is not None and self.manifest.files and not os.path.isfile(self.lexical_index_path):
+                changed = list(file_hashes)
+
+            if not changed:
+                self._save_state()
+                print(f"Index is up to date ({len(removed)} removed files).")
+                return
+
+            # 2. Lazily chunk only the new or changed files, keeping the chunks that are not stored yet
+            # and do not duplicate an indexed chunk. Token chunks are sized to the embedding model.
+            embedding_generator = get_embedding_generator()
+            token_chunker = None
+            if CHUNK_STRATEGY == "token":
+                token_chunker = TokenChunker.from_model(getattr(embedding_generator, "model", None))
+            chunker = DocumentChunker(
+                directory=directory_documents,
+                chunk_size=CHUNK_SIZE,
+                chunk_overlap=CHUNK_OVERLAP,
+                content_hashes=file_hashes,
+                token_chunker=token_chunker,
+            )
+            deduplicator = self.deduplicator
+            if deduplicator is not None:
+                # Chunks a changed file keeps are fingerprinted again as they are chunked; the others are about
+                # to be deleted, and must not make its edited chunks look like duplicates
+                for path in changed:
+                    deduplicator.remove(self.manifest.get_chunk_ids(path))
+            dedup_report = DedupReport()
+            chunk_ids_by_file: Dict[str, Dict[str, None]] = {path: {} for path in changed}
+            duplicate_of_by_file: Dict[str, Dict[str, None]] = {}
+            known_ids_by_file: Dict[str, Set[str]] = {}
+
+            def new_chunks() -> Iterator[Tuple[str, Any]]:
+                for doc in chunker.iter_chunks(changed):
+                    source = str(Path(doc.metadata.get("source", "")))
+                    vector_id = make_vector_id(source, hash_text(doc.page_content))
+                    chunk_ids = chunk_ids_by_file.setdefault(source, {})
+                    if vector_id in chunk_ids:
+                        continue
+                    if source not in known_ids_by_file:
+                        known_ids_by_file[source] = set(self.manifest.get_chunk_ids(source))
+                    if vector_id in known_ids_by_file[source]:
+                        chunk_ids[vector_id] = None
+                        if deduplicator is not None:
+                            deduplicator.add(vector_id, doc.page_content)
+                        if lexical_index is not None and vector_id not in lexical_index:
+                            lexical_index.add(vector_id, doc.page_content)
+                        continue
+                    if deduplicator is not None:
+                        match = deduplicator.check(vector_id, doc.page_content)
+                        dedup_report.record(match)
+                        if match is not None:
+                            duplicate_of_by_file.setdefault(source, {})[match.duplicate_of] = None
+                            continue
+                    chunk_ids[vector_id] = None
+                    yield vector_id, doc
+
+            # A PCA projection is fitted on the first chunks, whose embeddings are then stored as they are
+            chunks = new_chunks()
+            sample: Dict[str, np.ndarray] = {}
+            self._refresh_projection()
+            if self.projection is not None and not self.projection.fitted:
+                chunks, sample = self._fit_projection(chunks, embedding_generator)
+
+            def embed(texts: List[str]) -> np.ndarray:
+                embeddings: List[Optional[np.ndarray]] = [sample.pop(text, None) for text in texts]
+                missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+                if missing:
+                    computed = embedding_generator.generate_embeddings(texts=[texts[position] for position in missing])
+                    for position, embedding in zip(missing, computed):
+                        embeddings[position] = embedding
+                return self.project(np.stack([embedding for embedding in embeddings if embedding is not None]))
+
+            # 3. Chunk, embed and upsert as overlapping stages with bounded buffers
+            indexer = StreamingIndexer(embed_fn=embed, write_fn=self._upsert_vectors)
+            report = indexer.run(chunks)
+
+            # 4. Delete stale chunks of changed files and record the new state
+            deleted_ids = set()
+            for source, chunk_ids in chunk_ids_by_file.items():
+                stale_ids = [
+                    vector_id for vector_id in self.manifest.get_chunk_ids(source) if vector_id not in chunk_ids
+                ]
+                deleted_ids.update(stale_ids)
+                self._delete_vectors(stale_ids)
+                self.manifest.update_file(
+                    source, file_hashes.get(source, ""), list(chunk_ids), list(duplicate_of_by_file.get(source, {}))
+                )
+            requeued = self._requeue_dependents(deleted_ids)
+            self._save_state()
+            self.last_dedup_report = dedup_report
+            print(
+                f"Indexed {len(changed)} changed files: {report.chunks} new chunks embedded, "
+                f"{len(dedup_report.skipped)} duplicate chunks skipped "
+                f"({dedup_report.exact} exact, {dedup_report.near} near-duplicates)."
+            )
 
         except Exception as e:
-            raise PineconeError(f"Failed during embedding and storage process: {e}")
+            # Forget the fingerprints and postings of chunks that may not have been stored
+            self._deduplicator = None
+            self._lexical_index = None
+            raise VectorStoreError(f"Failed during embedding and storage process: {e}")
+
+        # Files whose skipped duplicates relied on deleted chunks are indexed again
+        if any(Path(path).is_relative_to(directory_documents) for path in requeued):
+            self.embed_store_db(directory_documents)
+
+    def _requeue_dependents(self, deleted_ids: Set[str]) -> List[str]:
+        """
+        Mark as changed the files whose skipped duplicate chunks rely on deleted vectors.
+
+        Returns:
+            List[str]: The marked files.
+        """
+        if not deleted_ids:
+            return []
+        requeued = []
+        for path in list(self.manifest.files):
+            duplicate_of = self.manifest.get_duplicate_of(path)
+            if deleted_ids.intersection(duplicate_of):
+                self.manifest.update_file(path, "", self.manifest.get_chunk_ids(path), duplicate_of)
+                requeued.append(path)
+        return requeued
+
+    def _save_state(self) -> None:
+        """
+        Persist the manifest, the chunk fingerprints and the store.
+        """
+        self.manifest.save()
+        if self._deduplicator is not None:
+            self._deduplicator.save(self.dedup_path)
+        if self._lexical_index is not None:
+            self._lexical_index.save(self.lexical_index_path)
+        self.store.flush()
@@ -0,0 +1,138 @@
+import asyncio
+import zlib
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import numpy as np
+
+
+class FakeIndex:
+    """
+    In-memory stand-in for a Pinecone index, used to test the vector layer offline.
+    """
+
+    def __init__(self):
+        self.namespaces: Dict[str, Dict[str, dict]] = {}
+        self.upsert_calls: List[int] = []
+
+    def upsert(self, vectors: List[dict], namespace: str = "") -> dict:
+        store = self.namespaces.setdefault(namespace, {})
+        for vector in vectors:
+            store[vector["id"]] = dict(vector)
+        self.upsert_calls.append(len(vectors))
+        return {"upserted_count": len(vectors)}
+
+    def delete(self, ids: List[str], namespace: str = "") -> None:
+        store = self.namespaces.setdefault(namespace, {})
+        for vector_id in ids:
+            store.pop(vector_id, None)
+
+    def fetch(self, ids: List[str], namespace: str = "") -> dict:
+        store = self.namespaces.get(namespace, {})
+        return {"vectors": {vector_id: store[vector_id] for vector_id in ids if vector_id in store}}
+
+    def query(self, vector: List[float], namespace: str = "", top_k: int = 5, **kwargs) -> dict:
+        store = self.namespaces.get(namespace, {})
+        scored = [{**entry, "score": sum(a * b for a, b in zip(vector, entry["values"]))} for entry in store.values()]
+        scored.sort(key=lambda match: match["score"], reverse=True)
+        return {"matches": scored[:top_k]}
+
+
+class FakeGroqClient:
+    """
+    Stand-in for the Groq client whose chat completions stream a fixed list of tokens.
+    If `fail_after` is set, the stream raises after that many tokens.
+    """
+
+    def __init__(self, tokens: List[str], fail_after: Optional[int] = None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.calls: List[dict] = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _chunks(self) -> Iterator[SimpleNamespace]:
+        for position, token in enumerate(self.tokens):
+            if self.fail_after is not None and position >= self.fail_after:
+                raise RuntimeError("stream interrupted")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        # Final chunk carries no content, like the real API
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))])
+
+    def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            return self._chunks()
+        message = SimpleNamespace(content="".join(self.tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class FakeAsyncGroqClient:
+    """
+    Stand-in for the async Groq client. Each completion takes `delay` seconds, and the
+    peak number of completions in flight is recorded in `peak_in_flight`.
+    Calls to `close` are counted in `closed`.
+    """
+
+    def __init__(self, tokens: List[str], delay: float = 0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.closed_streams = 0
+        self.closed = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def _chunks(self) -> AsyncIterator[SimpleNamespace]:
+        try:
+            for token in self.tokens:
+                await asyncio.sleep(self.delay)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=token))])
+        finally:
+            self.closed_streams += 1
+
+    async def create(self, **kwargs):
+        if kwargs.get("stream"):
+            return _FakeAsyncStream(self._chunks())
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        message = SimpleNamespace(content="".join(self.tokens))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def close(self) -> None:
+        self.closed += 1
+
+
+class _FakeAsyncStream:
+    """
+    Async iterator with the `close` coroutine of the Groq AsyncStream.
+    """
+
+    def __init__(self, chunks: AsyncIterator[SimpleNamespace]):
+        self.chunks = chunks
+
+    def __aiter__(self) -> AsyncIterator[SimpleNamespace]:
+        return self.chunks
+
+    async def close(self) -> None:
+        await self.chunks.aclose()
+
+
+class FakeEmbedder:
+    """
+    Embeds texts as bags of hashed words, so that texts sharing most words are similar.
+    """
+
+    def __init__(self, dimensions: int = 64):
+        self.dimensions = dimensions
+        self.calls = 0
+
+    def generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        self.calls += 1
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.split():
+                embeddings[row, zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        return embeddings
@@ -1,10 +1,36 @@
+import asyncio
+import gzip
+import json
+import httpx
+import pytest
 from fastapi.testclient import TestClient
 from src.api.main import app
+from api import routes
+from api.exceptions import ResponseCacheError
+from api.response_cache import InMemoryResponseStore, ResponseCache, SQLiteResponseStore, build_response_cache
+from llm_integration.exceptions import LLMTimeoutError
+from api.config import MAX_REQUEST_BODY_BYTES
+from ui.api_client import APIClient, AsyncAPIClient, iter_sse_events
+from ui.config import API_CONNECT_TIMEOUT, API_READ_TIMEOUT
+from utils.exceptions import SingleFlightTimeoutError
+from utils.singleflight import AsyncSingleFlight
+from utils.tracing import metrics
+from tests.fakes import FakeEmbedder
 
 # Create a test client
 client = TestClient(app)
 
 
+@pytest.fixture(autouse=True)
+def empty_response_cache():
+    """
+    Start every test with an empty response cache, so that responses do not leak between tests.
+    """
+    if routes.response_cache is not None:
+        routes.response_cache.clear()
+    yield
+
+
 def test_health_check():
     """
     Test the health check endpoint.
@@ -67,3 +93,415 @@ def test_generate_response_invalid_data():
     payload = {"query": "What are the benefits of the OptimRiskMaximizer method?", "documents": "This is not a list"}
     response = client.post("/api/generate-response", json=payload)
     assert response.status_code == 422, "Invalid data types should return status code 422 (Unprocessable Entity)"
+
+
+def test_retrieve_batch(mocker):
+    """
+    Test the retrieve-batch endpoint returns one result per query in request order.
+    """
+    outcomes = [
+        {"query": "first", "results": [{"id": "doc1", "score": 0.9, "text": "content"}], "error": None},
+        {"query": "second", "results": [], "error": "Failed to retrieve documents: timeout"},
+    ]
+    retrieve_many = mocker.patch.object(routes.retriever, "retrieve_many", return_value=outcomes)
+
+    response = client.post("/api/retrieve-batch", json={"queries": ["first", "second"], "top_k": 3})
+    assert response.status_code == 200
+    retrieve_many.assert_called_once_with(["first", "second"], top_k=3)
+    results = response.json()["results"]
+    assert [result["query"] for result in results] == ["first", "second"]
+    assert results[0]["documents"] == [{"id": "doc1", "score": 0.9, "text": "content"}]
+    assert results[1]["error"] == "Failed to retrieve documents: timeout"
+
+
+def test_generate_response_stream(mocker):
+    """
+    Test the streaming endpoint sends each token as a server-sent event followed by a done event.
+    """
+
+    async def tokens(**kwargs):
+        for token in ["Hello", " world"]:
+            yield token
+
+    mocker.patch.object(routes.llm_integration, "astream_response", side_effect=tokens)
+    payload = {"query": "Hi?", "documents": [{"text": "content"}], "temperature": 0.5, "max_tokens": 50}
+
+    response = client.post("/api/generate-response/stream", json=payload)
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = list(iter_sse_events(response.text.splitlines()))
+    assert events == [("message", {"token": "Hello"}), ("message", {"token": " world"}), ("done", {})]
+
+
+def test_generate_response_stream_error(mocker):
+    """
+    Test a failure during generation is reported as an error event.
+    """
+
+    async def failing_stream(**kwargs):
+        yield "partial"
+        raise RuntimeError("model unavailable")
+
+    mocker.patch.object(routes.llm_integration, "astream_response", side_effect=failing_stream)
+    payload = {"query": "Hi?", "documents": [], "temperature": 0.5, "max_tokens": 50}
+
+    response = client.post("/api/generate-response/stream", json=payload)
+    events = list(iter_sse_events(response.text.splitlines()))
+    assert events[0] == ("message", {"token": "partial"})
+    assert events[-1][0] == "error"
+    assert "model unavailable" in events[-1][1]["detail"]
+
+
+def test_generate_response_async(mocker):
+    """
+    Test the generate-response endpoint awaits the async LLM client.
+    """
+    agenerate = mocker.patch.object(
+        routes.llm_integration, "agenerate_response", new=mocker.AsyncMock(return_value="An answer")
+    )
+    payload = {"query": "Hi?", "documents": [{"text": "content"}], "temperature": 0.5, "max_tokens": 50}
+
+    response = client.post("/api/generate-response", json=payload)
+    assert response.status_code == 200
+    assert response.json() == {"response": "An answer"}
+    agenerate.assert_awaited_once()
+
+
+def test_generate_response_timeout(mocker):
+    """
+    Test an LLM timeout is reported as 504 Gateway Timeout.
+    """
+    mocker.patch.object(
+        routes.llm_integration, "agenerate_response", new=mocker.AsyncMock(side_effect=LLMTimeoutError("too slow"))
+    )
+    payload = {"query": "Hi?", "documents": [], "temperature": 0.5, "max_tokens": 50}
+
+    response = client.post("/api/generate-response", json=payload)
+    assert response.status_code == 504
+
+
+def test_run_until_disconnected_cancels_work(mocker):
+    """
+    Test pending work is cancelled once the client disconnects.
+    """
+    mocker.patch.object(routes, "DISCONNECT_POLL_SECONDS", 0.01)
+    raw_request = mocker.MagicMock()
+    raw_request.is_disconnected = mocker.AsyncMock(side_effect=[False, True])
+    cancelled = []
+
+    async def slow_generation():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def run():
+        with pytest.raises(routes.ClientDisconnectedError):
+            await routes.run_until_disconnected(raw_request, slow_generation())
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == [True]
+
+
+def test_api_client_stream_response(mocker):
+    """
+    Test the API client yields the streamed tokens and raises on an error event.
+    """
+    lines = ['data: {"token": "a"}', "", 'data: {"token": "b"}', "", "event: error", 'data: {"detail": "boom"}', ""]
+    response = mocker.MagicMock(status_code=200)
+    response.iter_lines.return_value = iter(lines)
+    response.__enter__.return_value = response
+    api_client = APIClient(base_url="http://backend/api")
+    post = mocker.patch.object(api_client.session, "post", return_value=response)
+
+    stream = api_client.stream_response("q", [{"text": "t"}], 0.5, 50, trace_id="trace1")
+    assert next(stream) == "a"
+    assert post.call_args.kwargs["headers"]["X-Trace-Id"] == "trace1"
+    assert next(stream) == "b"
+    with pytest.raises(ValueError, match="boom"):
+        next(stream)
+
+
+def test_api_client_session_policy():
+    """
+    Test the API client shares one pooled session that retries retryable statuses with backoff.
+    """
+    api_client = APIClient(base_url="http://backend/api", pool_size=4, max_retries=2)
+    retry = api_client.session.get_adapter("http://backend/api").max_retries
+    assert retry.total == 2 and retry.read == 0
+    assert set(retry.status_forcelist) == {502, 503}
+    assert api_client.timeout == (API_CONNECT_TIMEOUT, API_READ_TIMEOUT)
+
+
+def test_async_api_client_retries_and_compresses():
+    """
+    Test the async client retries a 503 with backoff and sends large payloads gzipped.
+    """
+    requests_seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests_seen.append(request)
+        if len(requests_seen) == 1:
+            return httpx.Response(503)
+        payload = json.loads(gzip.decompress(request.content))
+        return httpx.Response(200, json={"response": f"{len(payload['documents'])} documents"})
+
+    async def run():
+        async with AsyncAPIClient(
+            "http://backend/api",
+            backoff_factor=0.0,
+            backoff_jitter=0.0,
+            compress=True,
+            transport=httpx.MockTransport(handler),
+        ) as api_client:
+            return await api_client.generate_response("q", [{"text": "x" * 2000}] * 3, 0.5, 50)
+
+    assert asyncio.run(run()) == "3 documents"
+    assert len(requests_seen) == 2
+    assert requests_seen[-1].headers["content-encoding"] == "gzip"
+
+
+def test_gzip_request_body(mocker):
+    """
+    Test the API accepts gzip-compressed bodies and rejects ones that decompress beyond the limit.
+    """
+    mocker.patch.object(routes.retriever, "retrieve_many", return_value=[])
+    body = gzip.compress(json.dumps({"queries": [], "top_k": 3}).encode())
+    headers = {"Content-Type": "application/json", "Content-Encoding": "gzip"}
+
+    response = client.post("/api/retrieve-batch", content=body, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"results": []}
+
+    bomb = gzip.compress(b"[" + b" " * (MAX_REQUEST_BODY_BYTES + 1) + b"]")
+    response = client.post("/api/retrieve-batch", content=bomb, headers=headers)
+    assert response.status_code == 413
+
+
+def test_trace_id_and_metrics():
+    """
+    Test the API echoes the incoming trace ID and exposes request latencies on /metrics.
+    """
+    response = client.get("/api/health", headers={"X-Trace-Id": "abc123"})
+    assert response.headers["X-Trace-Id"] == "abc123"
+    assert len(client.get("/api/health").headers["X-Trace-Id"]) == 32
+
+    text = client.get("/metrics").text
+    assert "# TYPE http_request_duration_seconds histogram" in text
+    assert 'http_request_duration_seconds_count{method="GET",path="/api/health",status="200"}' in text
+
+
+def test_response_cache_exact_and_semantic_hits(tmp_path):
+    """
+    Test exact hits ignore formatting and document order, generation parameters are part of the key,
+    and paraphrases only hit semantically above the threshold, for both stores.
+    """
+    docs = [{"text": "Clause 4 covers refunds."}, {"text": "Refunds take 30 days."}]
+    for store in (InMemoryResponseStore(), SQLiteResponseStore(str(tmp_path / "responses.sqlite"))):
+        embedder = FakeEmbedder()
+        cache = ResponseCache(store, semantic=True, similarity_threshold=0.8, embedder=embedder)
+        assert cache.get("How long do refunds take?", docs, "llama", 0.3, 100) is None
+        cache.set("How long do refunds take?", docs, "llama", 0.3, 100, "30 days.")
+
+        assert cache.get("  how long do REFUNDS take ", docs[::-1], "llama", 0.3, 100) == "30 days."
+        assert cache.get("How long do refunds take?", docs, "llama", 0.7, 100) is None
+        assert cache.get("How long do refunds take?", docs, "llama", 0.3, 200) is None
+        assert cache.get("How long do refunds take?", docs[:1], "llama", 0.3, 100) is None
+        assert cache.get("how long do refunds usually take", docs, "llama", 0.3, 100) == "30 days."
+        assert cache.get("who signed the contract", docs, "llama", 0.3, 100) is None
+        assert cache.stats()["hits"] == 2 and cache.stats()["semantic_hits"] == 1
+        assert cache.stats()["misses"] == 5
+        # The source and span of the documents are part of the scope
+        cited = [dict(docs[0], source="a.pdf", start_index=0, end_index=24), docs[1]]
+        shifted = [dict(cited[0], start_index=100, end_index=124), docs[1]]
+        cache.set("Where are refunds covered?", cited, "llama", 0.3, 100, "In a.pdf.")
+        assert cache.get("Where are refunds covered?", cited, "llama", 0.3, 100) == "In a.pdf."
+        assert cache.get("Where are refunds covered?", shifted, "llama", 0.3, 100) is None
+        assert cache.get("Where are refunds covered?", docs, "llama", 0.3, 100) is None
+
+    # The SQLite store keeps its responses across restarts
+    reopened = ResponseCache(SQLiteResponseStore(str(tmp_path / "responses.sqlite")))
+    assert reopened.get("how long do refunds take", docs, "llama", 0.3, 100) == "30 days."
+    with pytest.raises(ResponseCacheError):
+        build_response_cache("redis")
+
+
+def test_response_stores_evict_lru_and_expired():
+    """
+    Test both stores evict the least recently used response beyond their size, and expired ones.
+    """
+    now = [0.0]
+    stores = [
+        InMemoryResponseStore(maxsize=2, ttl=10.0, clock=lambda: now[0]),
+        SQLiteResponseStore(":memory:", maxsize=2, ttl=10.0, clock=lambda: now[0]),
+    ]
+    for store in stores:
+        now[0] = 0.0
+        cache = ResponseCache(store)
+        for query in ["a", "b"]:
+            cache.set(query, [], "llama", 0.3, 100, f"answer {query}")
+            now[0] += 1.0
+        assert cache.get("a", [], "llama", 0.3, 100) == "answer a"
+        now[0] += 1.0
+        cache.set("c", [], "llama", 0.3, 100, "answer c")
+        assert cache.get("b", [], "llama", 0.3, 100) is None
+        assert len(store) == 2
+
+        now[0] += 10.0
+        assert cache.get("a", [], "llama", 0.3, 100) is None
+        assert cache.get("c", [], "llama", 0.3, 100) is None
+
+
+def test_sqlite_response_store_batches_access_times():
+    """
+    Test hits of the SQLite store only read the database until `access_batch` access times are pending.
+    """
+    now = [0.0]
+    store = SQLiteResponseStore(":memory:", maxsize=10, clock=lambda: now[0], access_batch=3)
+    cache = ResponseCache(store)
+    cache.set("a", [], "llama", 0.3, 100, "answer a")
+    cache.set("b", [], "llama", 0.3, 100, "answer b")
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+
+    now[0] = 1.0
+    assert cache.get("a", [], "llama", 0.3, 100) == "answer a"
+    assert cache.get("b", [], "llama", 0.3, 100) == "answer b"
+    assert not [statement for statement in statements if not statement.startswith("SELECT")]
+
+    cache.set("c", [], "llama", 0.3, 100, "answer c")
+    accesses = store._conn.execute("SELECT last_access FROM responses ORDER BY key").fetchall()
+    assert accesses == [(1.0,), (1.0,), (1.0,)]
+
+    now[0] = 2.0
+    for query in ["a", "b", "c"]:
+        cache.get(query, [], "llama", 0.3, 100)
+    accesses = store._conn.execute("SELECT last_access FROM responses ORDER BY key").fetchall()
+    assert accesses == [(2.0,), (2.0,), (2.0,)]
+
+
+def test_generate_response_served_from_cache(mocker):
+    """
+    Test a repeated question is answered from the response cache without calling the LLM, on both endpoints.
+    """
+    agenerate = mocker.patch.object(
+        routes.llm_integration, "agenerate_response", new=mocker.AsyncMock(return_value="An answer")
+    )
+    astream = mocker.patch.object(routes.llm_integration, "astream_response")
+    payload = {"query": "Hi?", "documents": [{"text": "content"}], "temperature": 0.5, "max_tokens": 50}
+    metrics.reset()
+
+    assert client.post("/api/generate-response", json=payload).json() == {"response": "An answer"}
+    repeated = dict(payload, query="hi")
+    assert client.post("/api/generate-response", json=repeated).json() == {"response": "An answer"}
+    response = client.post("/api/generate-response/stream", json=repeated)
+    events = list(iter_sse_events(response.text.splitlines()))
+    assert events == [("message", {"token": "An answer"}), ("done", {})]
+
+    agenerate.assert_awaited_once()
+    astream.assert_not_called()
+    assert metrics.get_counter("response_cache_lookups_total", result="exact") == 2
+    assert metrics.get_counter("response_cache_lookups_total", result="miss") == 1
+
+
+def test_concurrent_identical_generations_share_one_call(mocker):
+    """
+    Test concurrent identical requests wait for one LLM call and all get its response, or its error.
+    """
+    outcome = {"response": "An answer"}
+
+    async def slow_generation(**kwargs):
+        await asyncio.sleep(0.1)
+        if isinstance(outcome["response"], Exception):
+            raise outcome["response"]
+        return outcome["response"]
+
+    agenerate = mocker.patch.object(
+        routes.llm_integration, "agenerate_response", new=mocker.AsyncMock(side_effect=slow_generation)
+    )
+    payload = {"query": "Hi?", "documents": [{"text": "content"}], "temperature": 0.5, "max_tokens": 50}
+
+    async def post_concurrently(count: int):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+            return await asyncio.gather(
+                *(async_client.post("/api/generate-response", json=payload) for _ in range(count))
+            )
+
+    responses = asyncio.run(post_concurrently(5))
+    assert [response.json() for response in responses] == [{"response": "An answer"}] * 5
+    assert agenerate.await_count == 1
+
+    routes.response_cache.clear()
+    outcome["response"] = RuntimeError("model unavailable")
+    responses = asyncio.run(post_concurrently(3))
+    assert [response.status_code for response in responses] == [500] * 3
+    assert all("model unavailable" in response.json()["detail"] for response in responses)
+    assert agenerate.await_count == 2
+
+
+def test_async_single_flight_cancellation_and_timeout():
+    """
+    Test a cancelled caller leaves the shared task to the others, the task is cancelled with its last
+    caller, and callers stop waiting at the deadline of the flight.
+    """
+
+    async def run():
+        flights = AsyncSingleFlight("test", timeout=0.2)
+        started = []
+
+        async def work(value):
+            started.append(value)
+            await asyncio.sleep(0.05)
+            return value
+
+        first = asyncio.ensure_future(flights.do("key", lambda: work("shared")))
+        second = asyncio.ensure_future(flights.do("key", lambda: work("unused")))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == "shared"
+        assert started == ["shared"]
+
+        cancelled = []
+
+        async def hang():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+
+        with pytest.raises(SingleFlightTimeoutError):
+            await asyncio.gather(flights.do("slow", hang), flights.do("slow", hang))
+        await asyncio.sleep(0)
+        assert cancelled == [True]
+
+    asyncio.run(run())
+
+
+def test_concurrent_identical_streams_share_one_call(mocker):
+    """
+    Test concurrent identical streaming requests share one LLM stream: one client gets the tokens,
+    the others the complete response as a single token.
+    """
+
+    async def slow_tokens(**kwargs):
+        for token in ["Hel", "lo"]:
+            await asyncio.sleep(0.05)
+            yield token
+
+    astream = mocker.patch.object(routes.llm_integration, "astream_response", side_effect=slow_tokens)
+    payload = {"query": "Hi?", "documents": [{"text": "content"}], "temperature": 0.5, "max_tokens": 50}
+
+    async def stream_concurrently(count: int):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as async_client:
+            return await asyncio.gather(
+                *(async_client.post("/api/generate-response/stream", json=payload) for _ in range(count))
+            )
+
+    responses = asyncio.run(stream_concurrently(4))
+    streams = sorted((list(iter_sse_events(response.text.splitlines())) for response in responses), key=len)
+    assert streams[-1] == [("message", {"token": "Hel"}), ("message", {"token": "lo"}), ("done", {})]
+    assert streams[:-1] == [[("message", {"token": "Hello"}), ("done", {})]] * 3
+    assert astream.call_count == 1
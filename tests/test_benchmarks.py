@@ -0,0 +1,33 @@
+from benchmarks.corpus import generate_corpus, make_queries
+from benchmarks.run_benchmarks import compare_results, run_benchmarks
+
+
+def test_corpus_is_reproducible(tmp_path) -> None:
+    """
+    The same seed produces byte-identical corpora, and distinct queries.
+    """
+    first = generate_corpus(str(tmp_path / "a"), docs_per_format=1, paragraphs_per_doc=3, formats=["txt", "html"])
+    second = generate_corpus(str(tmp_path / "b"), docs_per_format=1, paragraphs_per_doc=3, formats=["txt", "html"])
+    for path_a, path_b in zip(first, second):
+        with open(path_a, "rb") as a, open(path_b, "rb") as b:
+            assert a.read() == b.read()
+    queries = make_queries(20)
+    assert len(set(queries)) == 20
+
+
+def test_run_benchmarks_offline(tmp_path) -> None:
+    """
+    A small run goes through every stage with the fake embedder and LLM, and can be compared to itself.
+    """
+    results = run_benchmarks(docs_per_format=2, paragraphs_per_doc=8, num_queries=5, work_dir=str(tmp_path))
+    stages = results["stages"]
+
+    # Every synthetic PDF, DOCX, HTML and TXT file must be readable by the ingestion pipeline
+    assert stages["ingestion"]["documents"] == 8 and stages["ingestion"]["failed"] == 0
+    assert stages["embedding"]["embeddings"] == stages["chunking"]["chunks"] == stages["indexing"]["vectors"]
+    assert set(stages["retrieval"]["latency"]) == {"p50_ms", "p95_ms", "p99_ms", "mean_ms", "max_ms"}
+    assert stages["generation"]["requests"] == 5
+    assert results["peak_rss_mb"] > 0
+
+    comparison = compare_results(results, results)
+    assert comparison["embedding.embeddings_per_s"]["change_pct"] == 0.0
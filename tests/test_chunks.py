@@ -1,4 +1,12 @@
+import random
+import shutil
+from benchmarks.corpus import make_paragraphs, write_pdf
+from benchmarks.fakes import FakeSentenceTransformer
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline
+from data_ingestion.parse_cache import ParseCache
 from embeddings.chunks import DocumentChunker
+from embeddings.token_chunker import RegexTokenizer, TokenChunker
+from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
 def test_chunk_data():
@@ -16,3 +24,93 @@ def test_chunk_data():
     # Test that the length of each chunk is within the expected range
     for chunk in chunks:
         assert 40 <= len(chunk) <= 50  # Because of overlap, chunks might slightly vary
+
+
+def test_chunk_data_reads_every_supported_format(tmp_path):
+    """
+    Every supported format of a directory is chunked, and PDF chunks carry their page range.
+    """
+    for name in ["document1.txt", "document3.docx", "document4.html", "notes.xyz"]:
+        shutil.copy(f"src/data/raw/{name.replace('notes.xyz', 'document1.txt')}", tmp_path / name)
+    write_pdf(str(tmp_path / "report.pdf"), make_paragraphs(random.Random(0), 40))
+
+    pipeline = DataIngestionPipeline(parse_cache=ParseCache(str(tmp_path / ".cache")))
+    chunker = DocumentChunker(directory=str(tmp_path), chunk_size=500, chunk_overlap=50, pipeline=pipeline)
+    chunks = chunker.chunk_data()
+
+    expected = ["document1.txt", "document3.docx", "document4.html", "report.pdf"]
+    assert {chunk.metadata["source"] for chunk in chunks} == {str(tmp_path / name) for name in expected}
+    pdf_chunks = [chunk for chunk in chunks if chunk.metadata["file_type"] == "pdf"]
+    assert pdf_chunks[0].metadata["page_start"] == 1
+    assert pdf_chunks[-1].metadata["page_end"] == pdf_chunks[-1].metadata["num_pages"] > 1
+    assert all(chunk.metadata["page_start"] <= chunk.metadata["page_end"] for chunk in pdf_chunks)
+    assert all("page_offsets" not in chunk.metadata for chunk in chunks)
+
+
+def test_token_chunker_fits_the_model_window():
+    """
+    Token chunks never exceed the model's max_seq_length, prefer sentence ends, overlap, and cover the text.
+    """
+    model = FakeSentenceTransformer(max_seq_length=64)
+    chunker = TokenChunker.from_model(model, overlap_tokens=16)
+    assert (chunker.max_tokens, chunker.overlap_tokens) == (62, 16)
+
+    rng = random.Random(0)
+    texts = [" ".join(make_paragraphs(rng, 10)) for _ in range(5)] + ["", "word " * 500]
+    all_spans = chunker.split_many(texts)
+    assert all_spans[-2] == []
+
+    for text, spans in zip(texts, all_spans):
+        if not spans:
+            continue
+        chunks = [text[start:end] for start, end, _ in spans]
+        lengths = [len(ids) for ids in model.tokenizer(chunks)["input_ids"]]
+        assert max(lengths) <= 64
+        assert [length - 2 for length in lengths] == [count for _, _, count in spans]
+        assert spans[0][0] == 0 and spans[-1][1] == len(text.rstrip())
+        assert all(next_start < end for (_, end, _), (next_start, _, _) in zip(spans, spans[1:]))
+        assert all(start < next_start for (start, _, _), (next_start, _, _) in zip(spans, spans[1:]))
+    sentence_ends = [text.endswith(".") for text in chunker.split_text(texts[0])]
+    assert sum(sentence_ends) >= len(sentence_ends) - 1
+
+
+def test_document_chunker_with_token_chunker():
+    """
+    DocumentChunker splits documents in bulk with a token chunker and passes chunk offsets along.
+    """
+    chunker = DocumentChunker(directory="", token_chunker=TokenChunker(RegexTokenizer(), max_tokens=20))
+    text = "First sentence is here. " * 10
+    documents = [
+        {"text": text, "metadata": {"file_path": "a.txt"}},
+        {"text": "Short.", "metadata": {"file_path": "b.txt"}},
+    ]
+    chunks = chunker.split_documents(documents)
+
+    assert chunks[-1].page_content == "Short." and chunks[-1].metadata["source"] == "b.txt"
+    for chunk in chunks[:-1]:
+        metadata = chunk.metadata
+        assert text[metadata["start_index"] : metadata["end_index"]] == chunk.page_content
+        assert metadata["token_count"] <= 20 and metadata["source"] == "a.txt"
+
+
+def test_document_chunker_locates_stripped_character_chunks():
+    """
+    Character chunks are located in the text after the splitter strips their whitespace, and chunks the
+    splitter rejoined with other whitespace are kept without offsets.
+    """
+    chunker = DocumentChunker(directory="", chunk_size=40, chunk_overlap=10)
+    text = " \nbeta\n \n  beta  delta\t delta deltaalpha\t"
+    chunks = chunker.split_documents([{"text": text, "metadata": {"file_path": "a.txt"}}])
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert text[chunk.metadata["start_index"] : chunk.metadata["end_index"]] == chunk.page_content
+
+    chunker.text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=12, chunk_overlap=0, separators=[" "], keep_separator=False
+    )
+    chunks = chunker.split_documents([{"text": "one  two three", "metadata": {"file_path": "a.txt"}}])
+
+    assert [chunk.page_content for chunk in chunks] == ["one two", "three"]
+    assert "start_index" not in chunks[0].metadata and chunks[0].metadata["source"] == "a.txt"
+    assert (chunks[1].metadata["start_index"], chunks[1].metadata["end_index"]) == (9, 14)
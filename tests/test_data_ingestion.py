@@ -0,0 +1,160 @@
+import random
+import shutil
+import time
+from typing import Any, Dict
+from data_ingestion.base_loader import BaseDocumentLoader
+from data_ingestion import ingestion_pipeline
+from data_ingestion.ingestion_pipeline import DataIngestionPipeline, register_loader
+from data_ingestion.parse_cache import ParseCache
+from data_ingestion.pdf_loader import PDFDocumentLoader, page_range
+from data_ingestion.preprocessor import TextPreprocessor
+from benchmarks.corpus import make_paragraphs, write_pdf
+from benchmarks.preprocessor_benchmark import legacy_process
+
+RAW_FILES = [
+    "src/data/raw/document1.txt",
+    "src/data/raw/document2.pdf",
+    "src/data/raw/document3.docx",
+    "src/data/raw/document4.html",
+]
+
+
+class SlowLoader(BaseDocumentLoader):
+    """Loader that never finishes in time."""
+
+    def load(self, file_path: str) -> Dict[str, Any]:
+        time.sleep(30)
+        return {"text": "", "metadata": {}}
+
+
+def test_ingest_parallel_matches_serial_ingest():
+    """
+    The parallel mode loads every supported file like the serial mode does.
+    """
+    pipeline = DataIngestionPipeline(parse_cache=None)
+    serial = pipeline.ingest(RAW_FILES)
+    results = list(pipeline.ingest_parallel(RAW_FILES, max_workers=2))
+
+    assert all(result.ok for result in results)
+    by_path = {result.file_path: result.document for result in results}
+    assert [by_path[path] for path in RAW_FILES] == serial
+
+
+def test_ingest_parallel_reports_failures():
+    """
+    Unsupported, unreadable and slow files each get a structured error record.
+    """
+    pipeline = DataIngestionPipeline(parse_cache=None)
+    pipeline.loaders[".slow"] = SlowLoader()
+    file_paths = ["notes.xyz", "missing.pdf", "big.slow", "src/data/raw/document1.txt"]
+
+    start = time.monotonic()
+    results = {result.file_path: result for result in pipeline.ingest_parallel(file_paths, max_workers=2, timeout=1)}
+    assert time.monotonic() - start < 10
+
+    assert results["notes.xyz"].error_type == "UnsupportedFileTypeError"
+    assert results["missing.pdf"].error_type == "OSError"
+    assert results["big.slow"].error_type == "TimeoutError"
+    assert results["src/data/raw/document1.txt"].ok
+
+
+def test_preprocessor_matches_legacy_output():
+    """
+    process, iter_process over arbitrary splits and process_batch all give the output of the legacy regex pipeline.
+    """
+    rng = random.Random(0)
+    alphabet = "ab Z9 .,!?'\"-_@#$%&*()[]{}<>/\\|~^`+=;:\t\n\r\x0b\x0c\x1c\x85\xa0\u2028\u3000éžſ€–“数"
+    preprocessor = TextPreprocessor()
+    texts = ["", " ", "\n\t ", "a @ b", "  hello,   world!  "]
+    texts += ["".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80))) for _ in range(300)]
+
+    for text in texts:
+        expected = legacy_process(text)
+        assert preprocessor.process(text) == expected
+        cuts = sorted(rng.randint(0, len(text)) for _ in range(rng.randint(0, 6)))
+        pieces = [text[start:end] for start, end in zip([0] + cuts, cuts + [len(text)])]
+        assert "".join(preprocessor.iter_process(pieces)) == expected
+    assert preprocessor.process_batch(texts) == [legacy_process(text) for text in texts]
+
+
+def test_pdf_loader_pages_and_offsets(tmp_path):
+    """
+    The PDF loader keeps where each page starts, streams pages lazily, and splits pages across workers
+    without changing its output.
+    """
+    file_path = str(tmp_path / "report.pdf")
+    write_pdf(file_path, make_paragraphs(random.Random(0), 60))
+
+    document = PDFDocumentLoader().load(file_path)
+    pages = list(PDFDocumentLoader().iter_pages(file_path))
+    text, metadata = document["text"], document["metadata"]
+
+    assert metadata["num_pages"] == len(pages) > 3
+    assert [page["metadata"]["page_number"] for page in pages] == list(range(1, len(pages) + 1))
+    assert metadata["page_offsets"][0] == 0 and metadata["page_offsets"] == sorted(metadata["page_offsets"])
+    for page_number, (page, start) in enumerate(zip(pages, metadata["page_offsets"]), start=1):
+        assert text[start : start + len(page["text"])] == page["text"]
+        assert page_range(metadata["page_offsets"], start, start + len(page["text"])) == (page_number, page_number)
+    start = metadata["page_offsets"][1] - 10
+    assert page_range(metadata["page_offsets"], start, start + 20) == (1, 2)
+
+    parallel = PDFDocumentLoader(max_workers=2, parallel_min_pages=1, pages_per_task=1)
+    assert parallel.load(file_path) == document
+    assert list(parallel.iter_pages(file_path)) == pages
+
+
+def test_loader_selected_by_sniffed_mime_type(tmp_path):
+    """
+    Files without a known extension are loaded by the loader matching their content.
+    """
+    pipeline = DataIngestionPipeline(parse_cache=ParseCache(str(tmp_path / "cache")))
+    for source in RAW_FILES:
+        upload = tmp_path / f"upload_{RAW_FILES.index(source)}"
+        shutil.copy(source, upload)
+        assert pipeline.get_loader(str(upload)) is pipeline.get_loader(source)
+        assert pipeline.load(str(upload))["text"] == pipeline.load(source)["text"]
+
+
+def test_register_loader_and_parse_cache(tmp_path, monkeypatch):
+    """
+    Registered loaders handle new formats, and a file content is parsed once whatever its path.
+    """
+    calls = []
+
+    class MarkdownLoader(BaseDocumentLoader):
+        def load(self, file_path: str) -> Dict[str, Any]:
+            calls.append(file_path)
+            return {"text": open(file_path, encoding="utf-8").read(), "metadata": {"file_path": file_path}}
+
+    monkeypatch.setattr(ingestion_pipeline, "_LOADER_FACTORIES", dict(ingestion_pipeline._LOADER_FACTORIES))
+    register_loader([".MD"], MarkdownLoader)
+    assert ".md" in ingestion_pipeline.supported_extensions()
+
+    cache = ParseCache(str(tmp_path / "cache"))
+    pipeline = DataIngestionPipeline(parse_cache=cache)
+    first, second = tmp_path / "a.md", tmp_path / "b.md"
+    first.write_text("# Notes", encoding="utf-8")
+    shutil.copy(first, second)
+
+    assert pipeline.load(str(first)) == {"text": "# Notes", "metadata": {"file_path": str(first)}}
+    assert pipeline.load(str(first))["metadata"]["file_path"] == str(first)
+    assert pipeline.load(str(second))["metadata"]["file_path"] == str(second)
+    assert calls == [str(first)]
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_ingest_parallel_uses_parse_cache(tmp_path, monkeypatch):
+    """
+    The parallel mode caches the documents its workers load, and does not submit cached files again.
+    """
+    cache = ParseCache(str(tmp_path / "cache"))
+    pipeline = DataIngestionPipeline(parse_cache=cache)
+    first = {result.file_path: result.document for result in pipeline.ingest_parallel(RAW_FILES, max_workers=2)}
+    assert (cache.hits, cache.misses) == (0, len(RAW_FILES))
+
+    monkeypatch.setattr(ingestion_pipeline.multiprocessing, "Pool", None)
+    second = list(pipeline.ingest_parallel(RAW_FILES, max_workers=2))
+
+    assert (cache.hits, cache.misses) == (len(RAW_FILES), len(RAW_FILES))
+    assert all(result.ok for result in second)
+    assert {result.file_path: result.document for result in second} == first
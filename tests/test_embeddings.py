@@ -1,10 +1,15 @@
+import numpy as np
 import pytest
+from src.embeddings.cache import EmbeddingCache
+from src.embeddings.dedup import ChunkDeduplicator
 from src.embeddings.embedding_generator import EmbeddingGenerator
+from src.embeddings.quantization import ScalarQuantizer, hamming_distances, pack_binary
+from embeddings.exceptions import EmbeddingError
 
 
 def test_generate_embeddings():
     # Initialize the embedding generator
-    generator = EmbeddingGenerator()
+    generator = EmbeddingGenerator(cache=None)
 
     # Test case: Valid input
     texts = ["This is a test sentence.", "Another test sentence."]
@@ -15,3 +20,143 @@ def test_generate_embeddings():
     # Test case: Empty input
     with pytest.raises(ValueError):
         generator.generate_embeddings([])
+
+
+class FakeSentenceTransformer:
+    """
+    Deterministic stand-in for a SentenceTransformer model that records what it encodes.
+    """
+
+    def __init__(self, model_name: str):
+        self.encoded: list = []
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        return np.array([[len(text), text.count(" "), 1.0] for text in texts], dtype=np.float32)
+
+
+def test_embedding_cache_only_encodes_misses(mocker, tmp_path):
+    """
+    Cached texts are never sent to the model again, and the cache reports hits and bytes saved.
+    """
+    mocker.patch("src.embeddings.embedding_generator.SentenceTransformer", FakeSentenceTransformer)
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    generator = EmbeddingGenerator(cache=cache)
+
+    first = generator.generate_embeddings(["a b", "c", "a b"])
+    assert generator.model.encoded == ["a b", "c"]
+
+    second = generator.generate_embeddings(["c", "d e f"])
+    assert generator.model.encoded == ["a b", "c", "d e f"]
+    np.testing.assert_array_equal(second[0], first[1])
+    assert second.dtype == np.float32
+
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 4
+    assert stats["bytes_saved"] == 3 * 4
+    assert stats["entries"] == 3
+
+    # The cache persists across instances, and entries are scoped to the model name
+    reopened = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    assert reopened.get_many(generator.model_name, ["a b"])[0] is not None
+    assert reopened.get_many("other-model", ["a b"])[0] is None
+
+
+def test_float16_embeddings_are_cached_at_half_size(mocker, tmp_path):
+    """
+    A float16 generator returns and caches float16 embeddings, and reads float32 entries of the same model.
+    """
+    mocker.patch("src.embeddings.embedding_generator.SentenceTransformer", FakeSentenceTransformer)
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"))
+    EmbeddingGenerator(cache=cache).generate_embeddings(["a b"])
+    generator = EmbeddingGenerator(cache=cache, precision="float16")
+
+    embeddings = generator.generate_embeddings(["a b", "c d e"])
+    assert embeddings.dtype == np.float16
+    np.testing.assert_array_equal(embeddings, [[3, 1, 1], [5, 2, 1]])
+    assert cache.get_many(generator.model_name, ["c d e"])[0].dtype == np.float16
+    assert cache.stats()["size_bytes"] == 3 * 4 + 3 * 2
+
+    with pytest.raises(EmbeddingError):
+        EmbeddingGenerator(precision="int8")
+
+
+def test_quantization_codecs():
+    """
+    Int8 codes decode within half a step of the input, and Hamming distances count differing sign bits.
+    """
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(100, 70)).astype(np.float32)
+    quantizer = ScalarQuantizer.fit(vectors)
+    codes = quantizer.encode(vectors)
+    assert codes.dtype == np.int8
+    assert np.all(np.abs(quantizer.decode(codes) - vectors) <= quantizer.scale / 2 + 1e-6)
+    query = rng.normal(size=70).astype(np.float32)
+    np.testing.assert_allclose(quantizer.scores(codes, query), quantizer.decode(codes) @ query, rtol=1e-4, atol=1e-4)
+
+    wider = quantizer.extended(2 * vectors[:3])
+    assert wider.covers(2 * vectors[:3]) and wider.covers(vectors)
+
+    packed = pack_binary(vectors)
+    assert packed.shape == (100, 16)
+    expected = ((vectors > 0) != (query > 0)).sum(axis=1)
+    np.testing.assert_array_equal(hamming_distances(packed, pack_binary(query)), expected)
+
+
+def test_embedding_cache_evicts_least_recently_used(tmp_path):
+    """
+    The cache stays under its size limit by evicting the least recently used entries.
+    """
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"), max_bytes=3 * 16)
+    vectors = np.ones((1, 4), dtype=np.float32)
+    for text in ["a", "b", "c"]:
+        cache.put_many("model", [text], vectors)
+    cache.get_many("model", ["a"])
+    cache.put_many("model", ["d"], vectors)
+
+    assert cache.stats()["size_bytes"] <= 3 * 16
+    a, b, _, d = cache.get_many("model", ["a", "b", "c", "d"])
+    assert a is not None and d is not None
+    assert b is None
+
+
+def test_embedding_cache_batches_access_times(tmp_path):
+    """
+    Lookups only read the database until `access_batch` access times are pending.
+    """
+    cache = EmbeddingCache(path=str(tmp_path / "cache.sqlite"), access_batch=3)
+    cache.put_many("model", ["a", "b", "c"], np.ones((3, 4), dtype=np.float32))
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    assert all(vector is not None for vector in cache.get_many("model", ["a", "b"]))
+    assert all(statement.startswith("SELECT") for statement in statements)
+    cache.get_many("model", ["c"])
+    assert any(statement.startswith("UPDATE") for statement in statements)
+    assert not cache._accessed
+
+
+def test_deduplicator_finds_exact_and_near_duplicates(tmp_path):
+    """
+    Exact copies and lightly edited chunks are duplicates, unrelated chunks are not, and the index
+    survives a save and load.
+    """
+    rng = np.random.default_rng(0)
+    vocabulary = [f"word{i}" for i in range(500)]
+    texts = [" ".join(rng.choice(vocabulary, 120)) for _ in range(50)]
+    edited = texts[1].split()
+    edited[60] = "edited"
+
+    deduplicator = ChunkDeduplicator(threshold=0.8)
+    assert all(deduplicator.check(f"id{i}", text) is None for i, text in enumerate(texts))
+    assert deduplicator.check("copy", texts[0]).duplicate_of == "id0"
+    match = deduplicator.check("edit", " ".join(edited))
+    assert (match.duplicate_of, match.kind) == ("id1", "near") and match.similarity >= 0.8
+    assert len(deduplicator) == 50
+
+    deduplicator.save(str(tmp_path / "dedup.npz"))
+    reloaded = ChunkDeduplicator(threshold=0.8)
+    reloaded.load(str(tmp_path / "dedup.npz"))
+    assert reloaded.check("edit", " ".join(edited)).duplicate_of == "id1"
+    reloaded.remove(["id1"])
+    assert reloaded.check("edit", " ".join(edited)) is None
@@ -1,5 +1,11 @@
+import asyncio
+import time
 import pytest
 from src.llm_integration.llm_chain import LLMIntegrationWithLLaMA
+from src.llm_integration.context_builder import ContextBuilder
+from llm_integration.exceptions import LLMChainError, LLMTimeoutError
+from tests.fakes import FakeAsyncGroqClient, FakeGroqClient
+from utils.tracing import metrics
 
 
 @pytest.fixture(scope="module")
@@ -44,3 +50,157 @@ def test_generate_response_real_api(setup_llm_chain):
     assert isinstance(response, str), "Response should be a string."
     assert len(response) > 0, "Response should not be empty."
     assert "OptimRiskMaximizer" in response, "Response should mention 'OptimRiskMaximizer'."
+
+
+def test_stream_response_yields_tokens(mocker):
+    """
+    Test that stream_response yields the text fragments of a streamed completion in order.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq", return_value=FakeGroqClient(["The ", "answer", "."]))
+    llm = LLMIntegrationWithLLaMA()
+
+    tokens = list(llm.stream_response("question?", [{"text": "context"}], temperature=0.5, max_tokens=50))
+    assert tokens == ["The ", "answer", "."]
+    call = llm.client.calls[0]
+    assert call["stream"] is True
+    assert "context" in call["messages"][0]["content"]
+
+
+def test_stream_response_wraps_errors(mocker):
+    """
+    Test that a failure in the middle of the stream surfaces as an LLMChainError.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq", return_value=FakeGroqClient(["a", "b"], fail_after=1))
+    llm = LLMIntegrationWithLLaMA()
+
+    stream = llm.stream_response("question?", [], temperature=0.5, max_tokens=50)
+    assert next(stream) == "a"
+    with pytest.raises(LLMChainError):
+        next(stream)
+
+
+def test_agenerate_response_limits_concurrency(mocker):
+    """
+    Test that concurrent async generations share the client and never exceed the concurrency limit.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq")
+    llm = LLMIntegrationWithLLaMA(max_concurrency=3, request_timeout=5.0)
+    fake = FakeAsyncGroqClient(["answer"], delay=0.05)
+    mocker.patch("src.llm_integration.llm_chain.AsyncGroq", return_value=fake)
+
+    async def run_all():
+        return await asyncio.gather(
+            *[llm.agenerate_response(f"q{i}", [], temperature=0.5, max_tokens=50) for i in range(12)]
+        )
+
+    start = time.perf_counter()
+    responses = asyncio.run(run_all())
+    elapsed = time.perf_counter() - start
+
+    assert responses == ["answer"] * 12
+    assert fake.peak_in_flight == 3
+    # 12 calls of 50 ms, three at a time, take about 200 ms instead of 600 ms serially
+    assert elapsed < 0.5
+
+
+def test_agenerate_response_timeout(mocker):
+    """
+    Test that a generation slower than the timeout raises LLMTimeoutError.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq")
+    llm = LLMIntegrationWithLLaMA(request_timeout=0.05)
+    mocker.patch("src.llm_integration.llm_chain.AsyncGroq", return_value=FakeAsyncGroqClient(["late"], delay=1.0))
+
+    with pytest.raises(LLMTimeoutError):
+        asyncio.run(llm.agenerate_response("q", [], temperature=0.5, max_tokens=50))
+
+
+def test_async_client_closed_when_rebound_to_another_loop(mocker):
+    """
+    Test that a call in a new event loop closes the async client created in the previous one.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq")
+    llm = LLMIntegrationWithLLaMA()
+    first, second = FakeAsyncGroqClient(["one"]), FakeAsyncGroqClient(["two"])
+    mocker.patch("src.llm_integration.llm_chain.AsyncGroq", side_effect=[first, second])
+
+    assert asyncio.run(llm.agenerate_response("q", [], temperature=0.5, max_tokens=50)) == "one"
+    assert asyncio.run(llm.agenerate_response("q", [], temperature=0.5, max_tokens=50)) == "two"
+    assert (first.closed, second.closed) == (1, 0)
+
+
+def test_astream_response_releases_slot_when_closed_early(mocker):
+    """
+    Test that closing a stream early closes the upstream stream and frees its concurrency slot.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq")
+    llm = LLMIntegrationWithLLaMA(max_concurrency=1, request_timeout=5.0)
+    fake = FakeAsyncGroqClient(["a", "b", "c"])
+    mocker.patch("src.llm_integration.llm_chain.AsyncGroq", return_value=fake)
+
+    async def read_first_token():
+        stream = llm.astream_response("q", [], temperature=0.5, max_tokens=50)
+        first = await stream.__anext__()
+        await stream.aclose()
+        # With a single slot, a second stream only starts if the first one released it
+        rest = [token async for token in llm.astream_response("q", [], temperature=0.5, max_tokens=50)]
+        return first, rest
+
+    first, rest = asyncio.run(read_first_token())
+    assert first == "a"
+    assert rest == ["a", "b", "c"]
+    assert fake.closed_streams == 2
+
+
+def test_context_builder_merges_deduplicates_and_budgets() -> None:
+    """
+    Overlapping and adjacent chunks of a source are merged, repeated text is dropped, and the context
+    fits the budget left by max_tokens, the last document being truncated.
+    """
+    source = "Alpha beta gamma. Delta epsilon zeta. Eta theta iota. Kappa lambda mu."
+    documents = [
+        {"id": "c2", "score": 0.9, "text": source[18:53], "source": "a.pdf", "start_index": 18, "end_index": 53},
+        {"id": "x", "score": 0.8, "text": "An unrelated passage about margins."},
+        {"id": "c1", "score": 0.7, "text": source[0:30], "source": "a.pdf", "start_index": 0, "end_index": 30},
+        {"id": "c3", "score": 0.6, "text": source[53:], "source": "a.pdf", "start_index": 53, "end_index": len(source)},
+        {"id": "copy", "score": 0.5, "text": "an unrelated   passage about MARGINS."},
+        {"id": "part", "score": 0.4, "text": "Theta iota."},
+        {"id": "far", "score": 0.3, "text": "Nu xi omicron.", "source": "b.pdf", "start_index": 0, "end_index": 14},
+    ]
+    builder = ContextBuilder(context_window=10_000, max_context_tokens=10_000, safety_tokens=0)
+    packed, report = builder.build(documents, max_tokens=500)
+    assert [document["id"] for document in packed] == ["c2", "x", "far"]
+    assert packed[0]["text"] == source and (packed[0]["start_index"], packed[0]["end_index"]) == (0, len(source))
+    assert packed[0]["score"] == 0.9
+    assert (report.merged, report.duplicates, report.dropped, report.kept) == (2, 2, 0, 3)
+    assert report.tokens_saved == report.input_tokens - report.context_tokens > 0
+
+    # Room for the first two documents and the start of a long third one
+    long_text = " ".join(f"word{i}" for i in range(200))
+    documents = [{"text": "first passage"}, {"text": "second passage"}, {"text": long_text}, {"text": "last"}]
+    builder = ContextBuilder(context_window=1_000, max_context_tokens=2_000, safety_tokens=0, min_partial_tokens=10)
+    packed, report = builder.build(documents, max_tokens=900, reserved_tokens=20)
+    assert report.budget == 80 and report.context_tokens <= 80
+    assert long_text.startswith(packed[2]["text"]) and long_text[len(packed[2]["text"])] == " "
+    assert (report.kept, report.truncated, report.dropped) == (3, 1, 1)
+    assert builder.counter.truncate("one two three", 2) == "one two"
+
+
+def test_prompt_is_packed_into_the_context_window(mocker) -> None:
+    """
+    The prompt sent to the model holds the merged documents, and the tokens saved are counted.
+    """
+    mocker.patch("src.llm_integration.llm_chain.Groq", return_value=FakeGroqClient(["ok"]))
+    llm = LLMIntegrationWithLLaMA()
+    documents = [
+        {"text": "Collateral is posted daily.", "source": "a.pdf", "start_index": 0, "end_index": 27},
+        {"text": "Collateral is posted daily."},
+        {"text": " Margin calls follow.", "source": "a.pdf", "start_index": 27, "end_index": 48},
+    ]
+    metrics.reset()
+    assert list(llm.stream_response("question?", documents, temperature=0.5, max_tokens=50)) == ["ok"]
+    prompt = llm.client.calls[0]["messages"][0]["content"]
+    assert prompt.count("Collateral is posted daily.") == 1 and "Document 2" not in prompt
+    assert "Collateral is posted daily. Margin calls follow." in prompt
+    sent = metrics.get_counter("llm_context_tokens_total", stage="sent")
+    assert 0 < sent < metrics.get_counter("llm_context_tokens_total", stage="input")
@@ -1,9 +1,19 @@
 import pytest
+import threading
 import time
+import numpy as np
 from typing import List, Dict, Union
 from src.vector_database.vector_manager import VectorManager
+from src.vector_database.local_store import LocalVectorStore
 from src.embeddings.embedding_generator import EmbeddingGenerator
 from src.retriever.retriever import Retriever
+from src.retriever.reranker import CrossEncoderReranker
+from retriever.exceptions import RetrieverError
+from utils.cache import TTLCache
+from utils.exceptions import SingleFlightTimeoutError
+from utils.registry import get_embedding_generator, reset_registry
+from utils.singleflight import SingleFlight
+from utils.tracing import metrics
 
 
 @pytest.fixture(scope="module")
@@ -19,7 +29,7 @@ def setup_retriever():
         dimensions=768,
         namespace="testing",
     )
-    embedding_generator = EmbeddingGenerator()
+    embedding_generator = EmbeddingGenerator(cache=None)
     retriever = Retriever(manager, embedding_generator)
     yield retriever
     manager.delete_index()
@@ -63,3 +73,324 @@ def test_retrieve(setup_retriever):
             "This is the content of document 1.",
             "This is the content of document 2.",
         ], "Retrieved text does not match any inserted document content."
+
+
+class FakeEmbeddingGenerator:
+    """
+    Embedding generator mapping texts to fixed 3-dim vectors, counting the texts it encodes.
+    """
+
+    def __init__(self):
+        self.encoded: List[str] = []
+
+    def generate_embeddings(self, texts: List[str], **kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[1.0, len(text), 0.5] for text in texts])
+
+
+@pytest.fixture
+def offline_retriever(tmp_path) -> Retriever:
+    """
+    Retriever over a local vector store and a fake embedding model.
+    """
+    manager = VectorManager(
+        directory_documents="",
+        index_name="offline",
+        dimensions=3,
+        manifest_dir=str(tmp_path),
+        store=LocalVectorStore(dimensions=3),
+    )
+    manager.upsert_vectors(
+        [
+            {"id": "doc1", "values": [1.0, 0.0, 0.0], "metadata": {"text": "first"}},
+            {"id": "doc2", "values": [0.0, 1.0, 0.0], "metadata": {"text": "second"}},
+        ]
+    )
+    return Retriever(manager, FakeEmbeddingGenerator())
+
+
+def test_retrieve_caches_embeddings_and_results(offline_retriever: Retriever) -> None:
+    """
+    Repeated queries skip the model and the index until the index changes.
+    """
+    first = offline_retriever.retrieve("short", top_k=1)
+    assert first[0]["id"] == "doc2"
+    assert offline_retriever.retrieve("short", top_k=1) == first
+    assert offline_retriever.embedding_generator.encoded == ["short"]
+    assert offline_retriever.result_cache.stats()["hits"] == 1
+
+    # A write to the index invalidates cached results but keeps the query embedding
+    offline_retriever.vector_manager.upsert_vectors(
+        [{"id": "doc3", "values": [1.0, 5.0, 0.5], "metadata": {"text": "third"}}]
+    )
+    assert offline_retriever.retrieve("short", top_k=1)[0]["id"] == "doc3"
+    assert offline_retriever.embedding_generator.encoded == ["short"]
+
+
+def test_ttl_cache_expires_and_evicts() -> None:
+    """
+    Entries expire after their TTL, and the least recently used entry is evicted first.
+    """
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None and cache.get("a") == 1
+    now[0] = 11
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_registry_builds_shared_instances_once(mocker) -> None:
+    """
+    Every caller gets the same embedding generator, loaded once.
+    """
+    reset_registry()
+    factory = mocker.patch("embeddings.embedding_generator.EmbeddingGenerator", side_effect=lambda name: object())
+    assert get_embedding_generator() is get_embedding_generator()
+    assert factory.call_count == 1
+    reset_registry()
+
+
+def test_retrieve_many_batches_and_isolates_errors(offline_retriever: Retriever, mocker) -> None:
+    """
+    Uncached queries are embedded in one batch, results keep the query order, and errors stay per query.
+    """
+    offline_retriever.retrieve("cached", top_k=1)
+    generate = mocker.spy(offline_retriever.embedding_generator, "generate_embeddings")
+    query_vectors = offline_retriever.vector_manager.query_vectors
+
+    def flaky_query(query_vector, top_k):
+        if query_vector[1] == len("boom"):
+            raise ConnectionError("index unavailable")
+        return query_vectors(query_vector=query_vector, top_k=top_k)
+
+    mocker.patch.object(offline_retriever.vector_manager, "query_vectors", side_effect=flaky_query)
+
+    outcomes = offline_retriever.retrieve_many(["x", "cached", "boom", "a much longer query", "x"], top_k=1)
+    assert [outcome["query"] for outcome in outcomes] == ["x", "cached", "boom", "a much longer query", "x"]
+    assert generate.call_count == 1
+    assert generate.call_args.kwargs["texts"] == ["x", "boom", "a much longer query"]
+    assert outcomes[2]["results"] == [] and "index unavailable" in outcomes[2]["error"]
+    assert [outcome["results"][0]["id"] for i, outcome in enumerate(outcomes) if i != 2] == [
+        "doc1",
+        "doc2",
+        "doc2",
+        "doc1",
+    ]
+    assert all(outcome["error"] is None for i, outcome in enumerate(outcomes) if i != 2)
+
+
+def test_retrieve_records_stage_spans(offline_retriever: Retriever) -> None:
+    """
+    A retrieval times its embedding, query and formatting stages.
+    """
+    metrics.reset()
+    offline_retriever.retrieve("short", top_k=1)
+    for stage in ("retriever.retrieve", "retriever.embed", "retriever.query", "retriever.format"):
+        assert metrics.get_histogram("span_duration_seconds", span=stage).count == 1
+
+
+def test_hybrid_retrieval_finds_exact_terms(offline_retriever: Retriever) -> None:
+    """
+    Hybrid mode fuses the BM25 ranking in, so a chunk naming a rare identifier is found even when its
+    embedding is far from the query.
+    """
+    manager = offline_retriever.vector_manager
+    manager.upsert_vectors(
+        [{"id": "doc3", "values": [0.0, 0.0, 1.0], "metadata": {"text": "the OptimRiskMaximizer model"}}]
+    )
+    query = "what is OptimRiskMaximizer"
+    assert "doc3" not in [document["id"] for document in offline_retriever.retrieve(query, top_k=2)]
+
+    hybrid = Retriever(manager, FakeEmbeddingGenerator(), mode="hybrid", hybrid_candidates=1)
+    results = hybrid.retrieve(query, top_k=2)
+    # doc3 ties with the best dense match, ranked first by BM25 as doc2 is by the vectors
+    assert {document["id"] for document in results} == {"doc2", "doc3"}
+    assert {document["text"] for document in results} == {"second", "the OptimRiskMaximizer model"}
+    with pytest.raises(RetrieverError):
+        Retriever(manager, FakeEmbeddingGenerator(), mode="sparse")
+
+
+class FakeCrossEncoder:
+    """
+    Cross-encoder scoring a pair by the query words found in the text, taking 10 ms of a fake clock per pair.
+    """
+
+    def __init__(self):
+        self.now = 0.0
+        self.batches: List[int] = []
+
+    def clock(self) -> float:
+        return self.now
+
+    def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+        self.batches.append(len(pairs))
+        self.now += 0.01 * len(pairs)
+        return np.array([sum(word in text.split() for word in query.split()) for query, text in pairs], dtype=float)
+
+
+def test_reranker_orders_caches_and_respects_budget() -> None:
+    """
+    Candidates are reordered by cross-encoder score in batches, pair scores are reused, and batches
+    stop once the latency budget is spent, leaving the rest in retrieval order.
+    """
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, batch_size=4, latency_budget_ms=None, clock=model.clock)
+    documents = [{"id": f"doc{i}", "score": 1.0 - i / 10, "text": f"chunk {i}"} for i in range(10)]
+    documents[7]["text"] = "margin call policy"
+    reranked = reranker.rerank("margin call", documents, top_k=3)
+    assert [document["id"] for document in reranked] == ["doc7", "doc0", "doc1"]
+    assert reranked[0]["score"] == 2.0 and model.batches == [4, 4, 2]
+
+    assert reranker.rerank("margin call", documents[:5], top_k=2)[0]["id"] == "doc0"
+    assert model.batches == [4, 4, 2]
+
+    # 10 ms per pair: one pair measures the cost, then a 35 ms budget leaves room for 2 more
+    budgeted = CrossEncoderReranker(model=model, batch_size=4, latency_budget_ms=35, clock=model.clock)
+    model.batches.clear()
+    reranked = budgeted.rerank("margin call", documents[5:])
+    assert model.batches == [1, 2] and budgeted.pair_seconds == pytest.approx(0.01)
+    assert [document["id"] for document in reranked] == ["doc7", "doc5", "doc6", "doc8", "doc9"]
+    assert reranked[3]["score"] == documents[8]["score"]
+
+
+def test_retrieve_reranks_more_candidates(offline_retriever: Retriever) -> None:
+    """
+    With a reranker, the retriever fetches `rerank_candidates` matches and keeps the best reranked ones.
+    """
+    model = FakeCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, latency_budget_ms=None, clock=model.clock)
+    retriever = Retriever(
+        offline_retriever.vector_manager, FakeEmbeddingGenerator(), reranker=reranker, rerank_candidates=2
+    )
+    metrics.reset()
+    assert [document["id"] for document in retriever.retrieve("first", top_k=1)] == ["doc1"]
+    assert offline_retriever.retrieve("first", top_k=1)[0]["id"] == "doc2"
+    retriever.result_cache.clear()
+    assert retriever.retrieve_many(["first"], top_k=1)[0]["results"][0]["text"] == "first"
+    assert metrics.get_histogram("span_duration_seconds", span="retriever.rerank").count == 2
+
+
+def test_retrieve_many_reranks_one_query_at_a_time(offline_retriever: Retriever) -> None:
+    """
+    The concurrent searches of several queries share the cross-encoder one rerank at a time.
+    """
+
+    class SlowCrossEncoder(FakeCrossEncoder):
+        def __init__(self):
+            super().__init__()
+            self.running = 0
+            self.max_running = 0
+
+        def predict(self, pairs, batch_size: int = 32, **kwargs) -> np.ndarray:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+            time.sleep(0.05)
+            self.running -= 1
+            return super().predict(pairs, batch_size, **kwargs)
+
+    model = SlowCrossEncoder()
+    reranker = CrossEncoderReranker(model=model, latency_budget_ms=None)
+    retriever = Retriever(
+        offline_retriever.vector_manager, FakeEmbeddingGenerator(), reranker=reranker, rerank_candidates=2
+    )
+    outcomes = retriever.retrieve_many(["a", "bb", "ccc", "dddd"], top_k=1, max_workers=4)
+    assert all(outcome["error"] is None and outcome["results"] for outcome in outcomes)
+    assert len(model.batches) == 4 and model.max_running == 1
+
+
+def test_retrieve_keeps_chunk_spans(offline_retriever: Retriever) -> None:
+    """
+    Results carry the source and character span of their chunk when the metadata has them.
+    """
+    offline_retriever.vector_manager.upsert_vectors(
+        [
+            {
+                "id": "doc3",
+                "values": [1.0, 5.0, 0.5],
+                "metadata": {"text": "third", "source": "a.pdf", "start_index": 10, "end_index": 15, "page": 0},
+            }
+        ]
+    )
+    assert offline_retriever.retrieve("short", top_k=2) == [
+        {
+            "id": "doc3",
+            "score": pytest.approx(1.0),
+            "text": "third",
+            "source": "a.pdf",
+            "start_index": 10,
+            "end_index": 15,
+        },
+        {"id": "doc2", "score": pytest.approx(0.97, abs=0.01), "text": "second"},
+    ]
+
+
+def test_concurrent_retrievals_share_one_search(offline_retriever: Retriever, mocker) -> None:
+    """
+    Concurrent retrievals of a query share one embedding and search, and its error.
+    """
+    generate = offline_retriever.embedding_generator.generate_embeddings
+
+    def slow_generate(texts, **kwargs):
+        time.sleep(0.2)
+        if texts == ["boom"]:
+            raise ConnectionError("model unavailable")
+        return generate(texts)
+
+    mocker.patch.object(offline_retriever.embedding_generator, "generate_embeddings", side_effect=slow_generate)
+    metrics.reset()
+
+    def retrieve_all(query: str) -> List[Union[List[dict], Exception]]:
+        outcomes: List[Union[List[dict], Exception]] = []
+
+        def run() -> None:
+            try:
+                outcomes.append(offline_retriever.retrieve(query, top_k=1))
+            except RetrieverError as e:
+                outcomes.append(e)
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    outcomes = retrieve_all("short")
+    assert [outcome[0]["id"] for outcome in outcomes] == ["doc2"] * 6
+    assert offline_retriever.embedding_generator.encoded == ["short"]
+    assert metrics.get_counter("singleflight_calls_total", operation="retriever", role="leader") == 1
+    assert metrics.get_counter("singleflight_calls_total", operation="retriever", role="follower") == 5
+
+    outcomes = retrieve_all("boom")
+    assert all(isinstance(outcome, RetrieverError) and "model unavailable" in str(outcome) for outcome in outcomes)
+    assert metrics.get_counter("singleflight_calls_total", operation="retriever", role="leader") == 2
+    # A failed flight is not remembered: the next call tries again
+    with pytest.raises(RetrieverError):
+        offline_retriever.retrieve("boom", top_k=1)
+    assert metrics.get_counter("singleflight_calls_total", operation="retriever", role="leader") == 3
+
+
+def test_single_flight_timeout() -> None:
+    """
+    Followers stop waiting at the deadline of the flight, and later calls start a new flight.
+    """
+    flights = SingleFlight("test", timeout=0.1)
+    release = threading.Event()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flights.do("key", lambda: release.wait(5) and "slow")))
+    leader.start()
+    time.sleep(0.02)
+
+    start = time.perf_counter()
+    with pytest.raises(SingleFlightTimeoutError):
+        flights.do("key", lambda: "unused")
+    assert time.perf_counter() - start < 0.5
+    assert flights.do("key", lambda: "fresh") == "fresh"
+    assert flights.do("other", lambda: "no limit", timeout=0) == "no limit"
+
+    release.set()
+    leader.join()
+    assert results == ["slow"]
@@ -0,0 +1,68 @@
+import pytest
+from utils.tracing import MetricsRegistry, get_trace_id, metrics, span, trace_context
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    """
+    Start every test with empty process metrics.
+    """
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_span_records_duration_and_errors() -> None:
+    """
+    Spans feed the duration histogram and count the stages that raised.
+    """
+    with span("stage"):
+        pass
+    with pytest.raises(ValueError):
+        with span("stage"):
+            raise ValueError("boom")
+
+    assert metrics.get_histogram("span_duration_seconds", span="stage").count == 2
+    assert metrics.get_counter("span_errors_total", span="stage") == 1
+
+
+def test_span_decorates_functions() -> None:
+    """
+    A span used as a decorator times every call of the function.
+    """
+
+    @span("decorated")
+    def add(a: int, b: int) -> int:
+        return a + b
+
+    assert add(1, 2) == 3
+    assert metrics.get_histogram("span_duration_seconds", span="decorated").count == 1
+
+
+def test_trace_context_nests_and_restores() -> None:
+    """
+    trace_context joins a given trace or starts a new one, and restores the outer trace on exit.
+    """
+    assert get_trace_id() is None
+    with trace_context("outer") as outer:
+        assert outer == "outer"
+        with trace_context() as inner:
+            assert get_trace_id() == inner != "outer"
+        assert get_trace_id() == "outer"
+    assert get_trace_id() is None
+
+
+def test_render_prometheus_histogram() -> None:
+    """
+    Histograms are rendered with cumulative buckets, sum and count.
+    """
+    registry = MetricsRegistry()
+    for value in (0.003, 0.2, 100.0):
+        registry.observe("latency_seconds", value, "Latency.", path="/api/x")
+    text = registry.render()
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{path="/api/x",le="0.005"} 1' in text
+    assert 'latency_seconds_bucket{path="/api/x",le="0.25"} 2' in text
+    assert 'latency_seconds_bucket{path="/api/x",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{path="/api/x"} 3' in text
@@ -1,9 +1,19 @@
+import os
 import pytest
 import time
+import zlib
 import numpy as np
-from typing import Dict, List, Union
+from typing import Dict, Iterator, List, Union
 from langchain.schema import Document
 from src.vector_database.vector_manager import VectorManager
+from src.vector_database.bulk_writer import BulkUpsertWriter
+from src.vector_database.streaming_indexer import StreamingIndexer
+from src.vector_database.local_store import LocalVectorStore
+from src.vector_database.bm25_index import BM25Index, tokenize
+from src.retriever.retriever import Retriever
+from vector_database.exceptions import VectorStoreError
+from utils.registry import get_embedding_generator, reset_registry
+from tests.fakes import FakeIndex
 
 
 class TestVectorManager:
@@ -49,14 +59,14 @@ class TestVectorManager:
         # Assertions to verify that 'vec2' has been deleted
         assert len(fetched_vector) == 0, "'vec2' should have been deleted"
 
-    def test_embed_store_db(self, vector_manager: VectorManager, mocker) -> None:
+    def test_embed_store_db(self, vector_manager: VectorManager, mocker, tmp_path_factory) -> None:
         """
         Test the embed_store_db method by mocking the DocumentChunker and EmbeddingGenerator.
         Ensures documents are embedded and stored without error.
         """
         # Mock the DocumentChunker to return a known chunked document
         mock_doc = Document(page_content="Test content", metadata={"source": "test_file.pdf"})
-        mocker.patch("embeddings.chunks.DocumentChunker.chunk_data", return_value=[mock_doc])
+        mocker.patch("embeddings.chunks.DocumentChunker.iter_chunks", return_value=[mock_doc])
 
         # Mock the EmbeddingGenerator to return a known embedding
         mock_embedding = np.array([[0.1, 0.2, 0.3]])
@@ -64,8 +74,12 @@ class TestVectorManager:
             "embeddings.embedding_generator.EmbeddingGenerator.generate_embeddings", return_value=mock_embedding
         )
 
-        # Call embed_store_db
-        vector_manager.embed_store_db(directory_documents="fake_directory")
+        # Call embed_store_db on a directory holding the mocked file
+        directory = tmp_path_factory.mktemp("raw")
+        source = directory / "test_file.pdf"
+        source.write_bytes(b"%PDF-1.4 test")
+        mock_doc.metadata["source"] = str(source)
+        vector_manager.embed_store_db(directory_documents=str(directory))
 
         # Wait a bit for upsert to complete
         time.sleep(15)
@@ -79,3 +93,465 @@ class TestVectorManager:
 
         # Check that we got at least one match
         assert len(results) > 0, "No vectors returned from query, expected at least one."
+
+
+@pytest.fixture
+def embedded_texts() -> List[str]:
+    """
+    Texts sent to the fake embedding model.
+    """
+    return []
+
+
+@pytest.fixture
+def offline_manager(mocker, tmp_path, embedded_texts) -> Iterator[VectorManager]:
+    """
+    VectorManager backed by a local vector store and a fake embedding model.
+    """
+    mocker.patch("embeddings.embedding_generator.EmbeddingGenerator.__init__", return_value=None)
+
+    def embed(texts, **kwargs):
+        embedded_texts.extend(texts)
+        return np.array([[len(text), 1.0, 0.0] for text in texts])
+
+    mocker.patch("embeddings.embedding_generator.EmbeddingGenerator.generate_embeddings", side_effect=embed)
+
+    def chunk_files(file_paths):
+        for path in file_paths:
+            for line in open(path, encoding="utf-8").read().splitlines():
+                yield Document(page_content=line, metadata={"source": path, "page": 0})
+
+    mocker.patch("embeddings.chunks.DocumentChunker.iter_chunks", side_effect=chunk_files)
+    reset_registry()
+    yield VectorManager(
+        directory_documents="",
+        index_name="offline",
+        dimensions=3,
+        manifest_dir=str(tmp_path / "manifests"),
+        store=LocalVectorStore(dimensions=3, path=str(tmp_path / "index")),
+    )
+    reset_registry()
+
+
+def stored_texts(manager: VectorManager) -> List[str]:
+    return sorted(entry["metadata"]["text"] for entry in manager.fetch_vectors(manager.store.ids).values())
+
+
+def test_embed_store_db_is_incremental(offline_manager: VectorManager, embedded_texts, tmp_path) -> None:
+    """
+    Only new or changed files are embedded, and stale chunks are deleted.
+    """
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "a.pdf").write_text("alpha\nbeta", encoding="utf-8")
+    (raw / "b.pdf").write_text("gamma", encoding="utf-8")
+
+    offline_manager.embed_store_db(str(raw))
+    first_ids = set(offline_manager.store.ids)
+    assert len(first_ids) == 3
+
+    # Re-ingesting an unchanged directory embeds nothing and keeps the same IDs
+    offline_manager.embed_store_db(str(raw))
+    assert embedded_texts == ["alpha", "beta", "gamma"]
+    assert set(offline_manager.store.ids) == first_ids
+
+    # A changed file only embeds its new chunk and drops its stale one
+    (raw / "a.pdf").write_text("alpha\ndelta", encoding="utf-8")
+    offline_manager.embed_store_db(str(raw))
+    assert embedded_texts == ["alpha", "beta", "gamma", "delta"]
+    assert stored_texts(offline_manager) == ["alpha", "delta", "gamma"]
+
+    # A removed file has all its chunks deleted, and the manifest and vectors survive a reload
+    (raw / "b.pdf").unlink()
+    offline_manager.embed_store_db(str(raw))
+    assert stored_texts(offline_manager) == ["alpha", "delta"]
+    offline_manager.manifest.load()
+    assert list(offline_manager.manifest.files) == [str(raw / "a.pdf")]
+    reloaded = LocalVectorStore(dimensions=3, path=str(tmp_path / "index"))
+    assert sorted(reloaded.ids) == sorted(offline_manager.store.ids)
+
+
+def test_embed_store_db_skips_duplicate_chunks(offline_manager: VectorManager, embedded_texts, tmp_path) -> None:
+    """
+    Chunks duplicating indexed chunks are reported and not embedded, and are indexed once the chunk
+    they duplicate is deleted.
+    """
+    report = "risk models estimate the variance of portfolio returns under stress scenarios for every desk"
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "a.pdf").write_text(f"{report}\nunique first line", encoding="utf-8")
+    (raw / "b.pdf").write_text(f"{report}\n{report} today\nunique second line", encoding="utf-8")
+
+    offline_manager.embed_store_db(str(raw))
+    dedup_report = offline_manager.last_dedup_report
+    assert (dedup_report.exact, dedup_report.near) == (1, 1)
+    assert sorted(embedded_texts) == sorted([report, "unique first line", "unique second line"])
+    first_ids = offline_manager.manifest.get_chunk_ids(str(raw / "a.pdf"))
+    assert offline_manager.manifest.get_duplicate_of(str(raw / "b.pdf")) == first_ids[:1]
+
+    (raw / "a.pdf").unlink()
+    offline_manager.embed_store_db(str(raw))
+    assert stored_texts(offline_manager) == sorted([report, "unique second line"])
+    second_ids = offline_manager.manifest.get_chunk_ids(str(raw / "b.pdf"))
+    assert offline_manager.manifest.get_duplicate_of(str(raw / "b.pdf")) == second_ids[:1]
+
+
+def test_embed_store_db_reindexes_edited_file_once(
+    offline_manager: VectorManager, embedded_texts, tmp_path, mocker
+) -> None:
+    """
+    A lightly edited chunk is not taken for a duplicate of the chunk it replaces, so an edit is
+    indexed in a single pass.
+    """
+    report = "risk models estimate the variance of portfolio returns under stress scenarios for every desk"
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "a.pdf").write_text(f"{report}\nunique first line", encoding="utf-8")
+    offline_manager.embed_store_db(str(raw))
+
+    (raw / "a.pdf").write_text(f"{report} today\nunique first line", encoding="utf-8")
+    passes = mocker.spy(offline_manager, "embed_store_db")
+    offline_manager.embed_store_db(str(raw))
+    assert passes.call_count == 1
+    assert offline_manager.last_dedup_report.skipped == []
+    assert embedded_texts[-1] == f"{report} today"
+    assert stored_texts(offline_manager) == sorted([f"{report} today", "unique first line"])
+
+
+def test_embed_store_db_reduces_dimensions(mocker, offline_manager, tmp_path) -> None:
+    """
+    A PCA projection is fitted on the first indexing and persisted, stored vectors and queries are
+    projected alike, and the index dimension follows the reduction.
+    """
+
+    embedded = []
+
+    def embed(texts, **kwargs):
+        embedded.extend(texts)
+        return np.stack([np.random.default_rng(zlib.crc32(text.encode())).normal(size=8) for text in texts])
+
+    mocker.patch("embeddings.embedding_generator.EmbeddingGenerator.generate_embeddings", side_effect=embed)
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    lines = [f"line {i}" for i in range(40)]
+    (raw / "a.pdf").write_text("\n".join(lines), encoding="utf-8")
+    settings = {"dimensions": 8, "manifest_dir": str(tmp_path / "pca"), "reduction": "pca", "reduced_dimensions": 4}
+    manager = VectorManager("", index_name="pca", store=LocalVectorStore(dimensions=4), **settings)
+    # A process that only queries, started before the first indexing
+    querying = VectorManager("", index_name="pca", store=LocalVectorStore(dimensions=4), **settings)
+    with pytest.raises(VectorStoreError):
+        manager.project(embed(["query"]))
+
+    embedded.clear()
+    manager.embed_store_db(str(raw))
+    assert manager.dimensions == 4 and len(manager.store) == 40
+    # The chunks the projection is fitted on are embedded once
+    assert sorted(embedded) == sorted(lines)
+    retriever = Retriever(manager, get_embedding_generator())
+    assert [retriever.retrieve(line, top_k=1)[0]["text"] for line in lines[:5]] == lines[:5]
+
+    reloaded = VectorManager("", index_name="pca", store=LocalVectorStore(dimensions=4), **settings)
+    np.testing.assert_allclose(reloaded.project(embed(lines)), manager.project(embed(lines)))
+    np.testing.assert_allclose(querying.project(embed(lines)), manager.project(embed(lines)))
+    reloaded.delete_index()
+    assert not reloaded.projection.fitted and not os.path.isfile(reloaded.projection_path)
+    (raw / "a.pdf").write_text("\n".join(lines[:20]), encoding="utf-8")
+    reloaded.refit_projection(str(raw))
+    assert reloaded.projection.fitted and len(reloaded.store) == 20
+    # The other processes pick up the new projection
+    np.testing.assert_allclose(querying.project(embed(lines)), reloaded.project(embed(lines)))
+
+    truncated = VectorManager("", dimensions=8, reduction="truncate", reduced_dimensions=2, backend="local")
+    assert truncated.store.dimensions == 2
+    np.testing.assert_array_equal(truncated.project(np.arange(8.0)[None, :]), [[0.0, 1.0]])
+
+
+def test_embed_store_db_fills_lexical_index(offline_manager: VectorManager, embedded_texts, tmp_path) -> None:
+    """
+    Stored chunks are searchable with BM25, deleted ones are not, and a missing BM25 index is rebuilt
+    without embedding the stored chunks again.
+    """
+    raw = tmp_path / "raw"
+    raw.mkdir()
+    (raw / "a.pdf").write_text("clause 12.3.4 on collateral\nmargin calls", encoding="utf-8")
+    (raw / "b.pdf").write_text("netting agreement under clause 7", encoding="utf-8")
+
+    offline_manager.embed_store_db(str(raw))
+    ids = {offline_manager.fetch_vectors([key])[key]["metadata"]["text"]: key for key in offline_manager.store.ids}
+    assert [key for key, _ in offline_manager.lexical_search("12.3.4")] == [ids["clause 12.3.4 on collateral"]]
+    assert {key for key, _ in offline_manager.lexical_search("clause")} == {
+        ids["clause 12.3.4 on collateral"],
+        ids["netting agreement under clause 7"],
+    }
+
+    (raw / "b.pdf").unlink()
+    offline_manager.embed_store_db(str(raw))
+    assert [key for key, _ in offline_manager.lexical_search("clause")] == [ids["clause 12.3.4 on collateral"]]
+
+    # An index built before BM25 existed gets its postings without embedding anything
+    os.remove(offline_manager.lexical_index_path)
+    offline_manager._lexical_index = None
+    embedded = list(embedded_texts)
+    offline_manager.embed_store_db(str(raw))
+    assert embedded_texts == embedded
+    assert {key for key, _ in offline_manager.lexical_search("margin")} == {ids["margin calls"]}
+    assert os.path.isfile(offline_manager.lexical_index_path)
+
+
+def test_upsert_vectors_saves_or_forgets_postings(offline_manager: VectorManager, mocker) -> None:
+    """
+    Direct upserts save the BM25 index once stored, and drop the postings of a failed upsert.
+    """
+    vector = {"id": "a", "values": [1.0, 1.0, 0.0], "metadata": {"text": "margin calls"}}
+    offline_manager.upsert_vectors([vector])
+    assert os.path.isfile(offline_manager.lexical_index_path)
+    offline_manager._lexical_index = None
+    assert [key for key, _ in offline_manager.lexical_search("margin")] == ["a"]
+
+    def fail(vectors):
+        list(vectors)
+        raise VectorStoreError("store unavailable")
+
+    mocker.patch.object(offline_manager.store, "upsert_vectors", side_effect=fail)
+    with pytest.raises(VectorStoreError):
+        offline_manager.upsert_vectors([{"id": "b", "values": [2.0, 1.0, 0.0], "metadata": {"text": "margin netting"}}])
+    assert [key for key, _ in offline_manager.lexical_search("netting")] == []
+    assert [key for key, _ in offline_manager.lexical_search("margin")] == ["a"]
+
+
+def test_bm25_index_scores_removes_and_persists(tmp_path) -> None:
+    """
+    BM25 scores match the reference formula, compound identifiers are searchable whole and by part,
+    and deletes, compaction and a reload keep the ranking.
+    """
+    assert tokenize("See ISO-4217, clause 12.3.4") == [
+        "see",
+        "iso-4217",
+        "iso",
+        "4217",
+        "clause",
+        "12.3.4",
+        "12",
+        "3",
+        "4",
+    ]
+
+    rng = np.random.default_rng(4)
+    vocabulary = [f"w{i}" for i in range(50)]
+    texts = {f"d{i}": " ".join(rng.choice(vocabulary, size=rng.integers(3, 30))) for i in range(300)}
+    index = BM25Index(k1=1.5, b=0.75)
+    for key, text in texts.items():
+        index.add(key, text)
+    index.add("d0", "w1 w2 w3")
+    texts["d0"] = "w1 w2 w3"
+
+    def reference(query: str, documents: Dict[str, str]) -> List[str]:
+        tokens = {key: text.split() for key, text in documents.items()}
+        average_length = sum(map(len, tokens.values())) / len(tokens)
+        scores = {}
+        for key, words in tokens.items():
+            score = 0.0
+            for term in set(query.split()):
+                frequency = words.count(term)
+                df = sum(term in other for other in tokens.values())
+                if frequency:
+                    idf = np.log(1 + (len(tokens) - df + 0.5) / (df + 0.5))
+                    norm = 1.5 * (1 - 0.75 + 0.75 * len(words) / average_length)
+                    score += idf * frequency * 2.5 / (frequency + norm)
+            if score:
+                scores[key] = score
+        return sorted(scores, key=lambda key: -scores[key])
+
+    query = "w1 w7 w42"
+    assert [key for key, _ in index.search(query, top_k=10)] == reference(query, texts)[:10]
+
+    removed = [f"d{i}" for i in range(0, 300, 2)]
+    index.remove(removed + ["unknown"])
+    for key in removed:
+        del texts[key]
+    assert len(index) == 150 and len(index.ids) == 150
+    assert [key for key, _ in index.search(query, top_k=10)] == reference(query, texts)[:10]
+
+    path = str(tmp_path / "index.bm25.npz")
+    index.save(path)
+    reloaded = BM25Index(k1=1.5, b=0.75)
+    reloaded.load(path)
+    assert reloaded.search(query, top_k=10) == index.search(query, top_k=10)
+    assert reloaded.search("unseen", top_k=10) == []
+    (tmp_path / "broken.npz").write_bytes(b"not a zip")
+    with pytest.raises(VectorStoreError):
+        reloaded.load(str(tmp_path / "broken.npz"))
+
+
+def test_local_store_matches_brute_force_and_persists(tmp_path) -> None:
+    """
+    Exact search returns the true cosine top-k, deletes keep the matrix consistent,
+    and the store reloads memory-mapped from disk.
+    """
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(500, 16)).astype(np.float32)
+    store = LocalVectorStore(dimensions=16, path=str(tmp_path))
+    store.upsert_vectors({"id": f"v{i}", "values": row.tolist(), "metadata": {"i": i}} for i, row in enumerate(data))
+    store.delete_vectors([f"v{i}" for i in range(0, 500, 2)])
+    store.upsert_vectors([{"id": "v1", "values": data[3].tolist(), "metadata": {"i": 3}}])
+
+    remaining = np.array([i for i in range(1, 500, 2)])
+    matrix = data[remaining].copy()
+    matrix[0] = data[3]
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = rng.normal(size=16).astype(np.float32)
+    expected = [f"v{remaining[i]}" for i in np.argsort(-(matrix @ (query / np.linalg.norm(query))))[:10]]
+
+    assert [match["id"] for match in store.query_vectors(query.tolist(), top_k=10)] == expected
+    assert store.fetch_vectors(["v1", "v0"])["v1"]["metadata"] == {"i": 3}
+
+    store.flush()
+    reloaded = LocalVectorStore(dimensions=16, path=str(tmp_path))
+    assert isinstance(reloaded._vectors, np.memmap)
+    assert [match["id"] for match in reloaded.query_vectors(query.tolist(), top_k=10)] == expected
+    reloaded.delete_vectors(["v1"])
+    assert len(reloaded) == 249
+
+
+def test_local_store_ivf_recall() -> None:
+    """
+    The IVF index scans a fraction of the corpus and keeps a high recall on clustered data.
+    """
+    rng = np.random.default_rng(2)
+    centers = rng.normal(size=(20, 32))
+    data = (centers[rng.integers(0, 20, size=4000)] + 0.3 * rng.normal(size=(4000, 32))).astype(np.float32)
+    vectors = [{"id": str(i), "values": row} for i, row in enumerate(data)]
+    exact = LocalVectorStore(dimensions=32)
+    exact.upsert_vectors(vectors)
+    ivf = LocalVectorStore(dimensions=32, index_type="ivf", nlist=40, nprobe=8, ivf_min_vectors=1000)
+    ivf.upsert_vectors(vectors)
+
+    hits = 0
+    for query in rng.normal(size=(20, 32)) + centers[:20]:
+        truth = {match["id"] for match in exact.query_vectors(query.tolist(), top_k=10)}
+        hits += len(truth & {match["id"] for match in ivf.query_vectors(query.tolist(), top_k=10)})
+    assert hits / 200 >= 0.9
+
+
+@pytest.mark.parametrize("precision,min_recall", [("float16", 1.0), ("int8", 0.9), ("binary", 0.9)])
+def test_local_store_reduced_precision(tmp_path, precision: str, min_recall: float) -> None:
+    """
+    Reduced-precision stores keep a high recall against exact float32 search, shrink the scanned
+    matrix, and survive deletes and a reload.
+    """
+    rng = np.random.default_rng(3)
+    centers = rng.normal(size=(30, 64))
+    data = (centers[rng.integers(0, 30, size=3000)] + 0.5 * rng.normal(size=(3000, 64))).astype(np.float32)
+    exact = LocalVectorStore(dimensions=64)
+    exact.upsert_vectors({"id": str(i), "values": row} for i, row in enumerate(data))
+    store = LocalVectorStore(dimensions=64, path=str(tmp_path), precision=precision)
+    # Small first batches make the int8 ranges grow and the stored codes get re-encoded
+    for start, end in ((0, 10), (10, 100), (100, 3000)):
+        store.upsert_vectors({"id": str(i), "values": data[i], "metadata": {"i": i}} for i in range(start, end))
+    assert store.scan_bytes * {"float16": 2, "int8": 4, "binary": 32}[precision] == exact.index_bytes
+    # Binary stores also keep a float16 copy of the vectors for rescoring
+    assert store.index_bytes == store.scan_bytes + (exact.index_bytes // 2 if precision == "binary" else 0)
+
+    queries = data[rng.integers(0, 3000, size=20)] + 0.2 * rng.normal(size=(20, 64))
+    hits = 0
+    for query in queries:
+        truth = {match["id"] for match in exact.query_vectors(query.tolist(), top_k=10)}
+        hits += len(truth & {match["id"] for match in store.query_vectors(query.tolist(), top_k=10)})
+    assert hits / 200 >= min_recall
+
+    fetched = store.fetch_vectors(["7"])["7"]
+    np.testing.assert_allclose(fetched["values"], data[7] / np.linalg.norm(data[7]), atol=0.02)
+    assert fetched["metadata"] == {"i": 7}
+
+    store.delete_vectors([str(i) for i in range(0, 3000, 3)])
+    store.flush()
+    reloaded = LocalVectorStore(dimensions=64, path=str(tmp_path), precision=precision)
+    assert len(reloaded) == 2000
+    query = queries[0].tolist()
+    assert reloaded.query_vectors(query, top_k=10) == store.query_vectors(query, top_k=10)
+    with pytest.raises(VectorStoreError):
+        LocalVectorStore(dimensions=64, path=str(tmp_path))
+
+
+class FlakyIndex(FakeIndex):
+    """
+    FakeIndex whose upserts fail a given number of times for batches containing a given vector.
+    """
+
+    def __init__(self, poisoned_id: str, failures: int):
+        super().__init__()
+        self.poisoned_id = poisoned_id
+        self.failures = failures
+
+    def upsert(self, vectors, namespace=""):
+        if self.failures and any(vector["id"] == self.poisoned_id for vector in vectors):
+            self.failures -= 1
+            raise ConnectionError("transient failure")
+        return super().upsert(vectors, namespace)
+
+
+def test_bulk_writer_batches_by_count_and_bytes(mocker) -> None:
+    """
+    Batches never exceed the count limit, oversized payloads start a new batch, and the size of
+    every vector is estimated once.
+    """
+    vectors = [{"id": f"v{i}", "values": [0.5] * 8} for i in range(10)]
+    writer = BulkUpsertWriter(FakeIndex(), batch_size=4, max_batch_bytes=10**6)
+    assert [len(batch) for batch in writer.iter_batches(vectors)] == [4, 4, 2]
+
+    one_vector = BulkUpsertWriter.estimate_size(vectors[0])
+    writer = BulkUpsertWriter(FakeIndex(), batch_size=100, max_batch_bytes=3 * one_vector)
+    assert [len(batch) for batch in writer.iter_batches(vectors)] == [3, 3, 3, 1]
+
+    estimate_size = mocker.spy(BulkUpsertWriter, "estimate_size")
+    results = writer.write(vectors)
+    assert estimate_size.call_count == len(vectors)
+    assert [result.payload_bytes for result in results] == [3 * one_vector] * 3 + [one_vector]
+
+
+def test_bulk_writer_retries_and_reports_per_batch() -> None:
+    """
+    Transient failures are retried, persistent ones are reported without losing the other batches.
+    """
+    vectors = [{"id": f"v{i}", "values": [float(i)]} for i in range(9)]
+
+    index = FlakyIndex(poisoned_id="v4", failures=2)
+    writer = BulkUpsertWriter(index, namespace="ns", batch_size=3, max_workers=2, max_retries=2, sleep=lambda _: None)
+    results = writer.write(iter(vectors))
+    assert [result.success for result in results] == [True, True, True]
+    assert [result.attempts for result in results] == [1, 3, 1]
+    assert len(index.namespaces["ns"]) == 9
+
+    index = FlakyIndex(poisoned_id="v4", failures=10)
+    writer = BulkUpsertWriter(index, namespace="ns", batch_size=3, max_workers=2, max_retries=1, sleep=lambda _: None)
+    results = writer.write(vectors)
+    assert [result.success for result in results] == [True, False, True]
+    assert results[1].error == "transient failure"
+    assert len(index.namespaces["ns"]) == 6
+
+
+def test_streaming_indexer_overlaps_stages_and_propagates_errors() -> None:
+    """
+    Chunks flow through embedding and writing in bounded batches, and a failing stage stops the run.
+    """
+    docs = [(f"id{i}", Document(page_content=f"chunk {i}", metadata={"source": "a.pdf"})) for i in range(25)]
+    written: List[dict] = []
+
+    def write(vectors):
+        written.extend(vectors)
+        return []
+
+    indexer = StreamingIndexer(
+        embed_fn=lambda texts: np.ones((len(texts), 3)), write_fn=write, embed_batch_size=4, queue_size=1
+    )
+    report = indexer.run(iter(docs))
+    assert report.chunks == 25 and report.embedding_batches == 7
+    assert [vector["id"] for vector in written] == [vector_id for vector_id, _ in docs]
+    assert written[0]["metadata"] == {"source": "a.pdf", "text": "chunk 0"}
+
+    def broken_embed(texts):
+        raise RuntimeError("model crashed")
+
+    indexer = StreamingIndexer(embed_fn=broken_embed, write_fn=write, embed_batch_size=4, queue_size=1)
+    with pytest.raises(RuntimeError, match="model crashed"):
+        indexer.run(iter(docs))